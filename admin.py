@@ -1,21 +1,19 @@
 import customtkinter as ctk
-from tkinter import messagebox, simpledialog
+from tkinter import filedialog, messagebox, simpledialog
 import mysql.connector
+import db
+import router
+import system_stats
 import subprocess
+import sys
 import os
 import datetime
 
 # ------------------- Database Functions -------------------
 def connect_db():
-    """Connect to the MySQL database"""
+    """Get a pooled connection to the MySQL database"""
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="new_password",
-            database="online_music_system"
-        )
-        return connection
+        return db.connect_db()
     except mysql.connector.Error as err:
         messagebox.showerror("Database Connection Error", 
                             f"Failed to connect to database: {err}")
@@ -60,47 +58,14 @@ def get_admin_info():
         print(f"Error getting admin info: {e}")
         return None
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 def get_system_stats():
     """Get system statistics for the dashboard"""
     try:
-        connection = connect_db()
-        if not connection:
-            return {
-                "total_users": 0,
-                "total_songs": 0,
-                "total_playlists": 0,
-                "total_downloads": 0
-            }
-            
-        cursor = connection.cursor()
-        
-        # Get user count
-        cursor.execute("SELECT COUNT(*) FROM Users")
-        total_users = cursor.fetchone()[0]
-        
-        # Get song count
-        cursor.execute("SELECT COUNT(*) FROM Songs")
-        total_songs = cursor.fetchone()[0]
-        
-        # Get playlist count
-        cursor.execute("SELECT COUNT(*) FROM Playlists")
-        total_playlists = cursor.fetchone()[0]
-        
-        # Approximate downloads (listening history entries)
-        cursor.execute("SELECT COUNT(*) FROM Listening_History")
-        total_downloads = cursor.fetchone()[0]
-        
-        return {
-            "total_users": total_users,
-            "total_songs": total_songs,
-            "total_playlists": total_playlists,
-            "total_downloads": total_downloads
-        }
-        
+        # Running totals cached for a few seconds, see system_stats.py
+        return system_stats.get_stats()
     except mysql.connector.Error as e:
         print(f"Error getting system stats: {e}")
         return {
@@ -109,10 +74,6 @@ def get_system_stats():
             "total_playlists": 0,
             "total_downloads": 0
         }
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
 
 def get_recent_activities(limit=4):
     """Get recent system activities"""
@@ -229,42 +190,25 @@ def get_recent_activities(limit=4):
         print(f"Error getting recent activities: {e}")
         return []
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 # ------------------- Admin Functions -------------------
-def open_manage_users():
-    """Open the manage users page"""
-    try:
-        subprocess.Popen(["python", "admin_users.py"])
-        root.destroy()
-    except Exception as e:
-        messagebox.showerror("Error", f"Unable to open manage users page: {e}")
+LIBRARY_IMPORT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "library_import.py")
 
-def open_manage_songs():
-    """Open the manage songs page"""
-    try:
-        subprocess.Popen(["python", "admin_songs.py"])
-        root.destroy()
-    except Exception as e:
-        messagebox.showerror("Error", f"Unable to open manage songs page: {e}")
-
-def open_manage_playlists():
-    """Open the manage playlists page"""
-    try:
-        subprocess.Popen(["python", "admin_playlists.py"])
-        root.destroy()
-    except Exception as e:
-        messagebox.showerror("Error", f"Unable to open manage playlists page: {e}")
+def open_import_library():
+    """Import a folder of audio files into the library in the background"""
+    directory = filedialog.askdirectory(title="Select a music folder to import")
+    if not directory:  # User cancelled
+        return
 
-def open_reports():
-    """Open the reports and analytics page"""
     try:
-        subprocess.Popen(["python", "admin_reports.py"])
-        root.destroy()
+        # Runs in its own process; progress is printed to the console
+        subprocess.Popen([sys.executable, LIBRARY_IMPORT_SCRIPT, directory])
+        messagebox.showinfo("Import Started",
+                            f"Importing songs from {directory}.\nRefresh the dashboard when it finishes.")
     except Exception as e:
-        messagebox.showerror("Error", f"Unable to open reports page: {e}")
+        messagebox.showerror("Error", f"Unable to start library import: {e}")
 
 def open_login_page():
     """Logout and open the login page"""
@@ -273,8 +217,7 @@ def open_login_page():
         if os.path.exists("current_admin.txt"):
             os.remove("current_admin.txt")
             
-        subprocess.Popen(["python", "login.py"])
-        root.destroy()
+        router.show_page("login", reset=True)
     except Exception as e:
         messagebox.showerror("Error", f"Unable to logout: {e}")
 
@@ -321,25 +264,24 @@ def refresh_dashboard():
             time_label.pack(side="right", padx=10)
 
 # ------------------- Initialize App -------------------
-try:
+WINDOW_TITLE = "Online Music System - Admin Dashboard"
+WINDOW_SIZE = "1000x600"
+
+def build_page(parent):
+    """Build the admin dashboard inside the app shell"""
+    global root, user_count_label, song_count_label, playlist_count_label, download_count_label, activity_list_frame
+
     # Verify admin privileges
     admin = get_admin_info()
     if not admin:
         # Redirect to login if not admin
         open_login_page()
-        exit()
-
-    # ---------------- Initialize App ----------------
-    ctk.set_appearance_mode("dark")  # Dark mode
-    ctk.set_default_color_theme("blue")  # Default theme
+        return False
 
-    root = ctk.CTk()
-    root.title("Online Music System - Admin Dashboard")
-    root.geometry("1000x600")  # Adjusted to match the image proportions
-    root.resizable(False, False)
+    root = router.root
 
     # ---------------- Main Frame ----------------
-    main_frame = ctk.CTkFrame(root, fg_color="#1E1E2E", corner_radius=15)
+    main_frame = ctk.CTkFrame(parent, fg_color="#1E1E2E", corner_radius=15)
     main_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
     # ---------------- Sidebar Navigation ----------------
@@ -356,24 +298,26 @@ try:
                                 anchor="w", corner_radius=0, height=40)
     dashboard_btn.pack(fill="x", pady=5, padx=10)
 
+    # The user, song, playlist and report management pages are not written
+    # yet, so their menu items are shown disabled
     manage_users_btn = ctk.CTkButton(sidebar, text="👥 Manage Users", font=("Arial", 14), 
                                     fg_color="#111827", hover_color="#1E293B", text_color="#A0A0A0",
-                                    anchor="w", corner_radius=0, height=40, command=open_manage_users)
+                                    anchor="w", corner_radius=0, height=40, state="disabled")
     manage_users_btn.pack(fill="x", pady=5, padx=10)
 
     manage_songs_btn = ctk.CTkButton(sidebar, text="🎵 Manage Songs", font=("Arial", 14), 
                                     fg_color="#111827", hover_color="#1E293B", text_color="#A0A0A0",
-                                    anchor="w", corner_radius=0, height=40, command=open_manage_songs)
+                                    anchor="w", corner_radius=0, height=40, state="disabled")
     manage_songs_btn.pack(fill="x", pady=5, padx=10)
 
     manage_playlists_btn = ctk.CTkButton(sidebar, text="📁 Manage Playlists", font=("Arial", 14), 
                                         fg_color="#111827", hover_color="#1E293B", text_color="#A0A0A0",
-                                        anchor="w", corner_radius=0, height=40, command=open_manage_playlists)
+                                        anchor="w", corner_radius=0, height=40, state="disabled")
     manage_playlists_btn.pack(fill="x", pady=5, padx=10)
 
     reports_btn = ctk.CTkButton(sidebar, text="📈 Reports & Analytics", font=("Arial", 14), 
                               fg_color="#111827", hover_color="#1E293B", text_color="#A0A0A0",
-                              anchor="w", corner_radius=0, height=40, command=open_reports)
+                              anchor="w", corner_radius=0, height=40, state="disabled")
     reports_btn.pack(fill="x", pady=5, padx=10)
 
     logout_btn = ctk.CTkButton(sidebar, text="🚪 Logout", font=("Arial", 14), 
@@ -477,28 +421,35 @@ try:
     buttons_frame = ctk.CTkFrame(actions_frame, fg_color="#131B2E")
     buttons_frame.pack(fill="x")
 
-    # Action buttons with commands
+    # Action buttons; only the library import has a page behind it so far
     manage_users_action = ctk.CTkButton(buttons_frame, text="👥 Manage Users", 
                                        font=("Arial", 14, "bold"), 
                                        fg_color="#B146EC", hover_color="#9333EA", 
                                        text_color="white", height=50, corner_radius=8,
-                                       command=open_manage_users)
+                                       state="disabled")
     manage_users_action.pack(side="left", padx=10, expand=True)
 
     manage_songs_action = ctk.CTkButton(buttons_frame, text="🎵 Manage Songs", 
                                        font=("Arial", 14, "bold"), 
                                        fg_color="#2563EB", hover_color="#1D4ED8", 
                                        text_color="white", height=50, corner_radius=8,
-                                       command=open_manage_songs)
+                                       state="disabled")
     manage_songs_action.pack(side="left", padx=10, expand=True)
 
     manage_playlists_action = ctk.CTkButton(buttons_frame, text="📁 Manage Playlists", 
                                           font=("Arial", 14, "bold"), 
                                           fg_color="#16A34A", hover_color="#15803D", 
                                           text_color="white", height=50, corner_radius=8,
-                                          command=open_manage_playlists)
+                                          state="disabled")
     manage_playlists_action.pack(side="left", padx=10, expand=True)
 
+    import_library_action = ctk.CTkButton(buttons_frame, text="📥 Import Library", 
+                                        font=("Arial", 14, "bold"), 
+                                        fg_color="#EA580C", hover_color="#C2410C", 
+                                        text_color="white", height=50, corner_radius=8,
+                                        command=open_import_library)
+    import_library_action.pack(side="left", padx=10, expand=True)
+
     # ---------------- Recent Activity Section ----------------
     activity_frame = ctk.CTkFrame(content_frame, fg_color="#131B2E")
     activity_frame.pack(fill="both", expand=True, padx=20, pady=(20, 20))
@@ -538,12 +489,8 @@ try:
             time_label = ctk.CTkLabel(activity_item, text=time, font=("Arial", 12), text_color="#B146EC")
             time_label.pack(side="right", padx=10)
 
-    # ---------------- Run Application ----------------
-    root.mainloop()
-    
-except Exception as e:
-    import traceback
-    print(f"Error in admin.py: {e}")
-    traceback.print_exc()
-    messagebox.showerror("Error", f"An error occurred: {e}")
-    input("Press Enter to exit...")  # This keeps console open
\ No newline at end of file
+    return True
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    router.run("admin")
@@ -0,0 +1,216 @@
+import argparse
+import os
+import time
+
+import mysql.connector
+
+import audio_store
+import db
+import migrate_audio
+import song_handles
+
+# ------------------- Object Settings -------------------
+# Every distinct audio payload is one row in Audio_Objects, keyed by the
+# SHA-256 the audio store already names files by. Songs point at it through
+# Songs.audio_key and ref_count says how many do, so identical uploads share
+# one file and the file is only removed when its last song goes.
+DELETE_GRACE = 60 * 60  # Keep unreferenced files touched this recently (seconds)
+
+# ------------------- Schema -------------------
+def create_table(cursor):
+    """Create the Audio_Objects table
+
+    Returns True when the table was newly created and needs rebuild_counts().
+    """
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'Audio_Objects'
+        """,
+        (db.DB_NAME,)
+    )
+    created = cursor.fetchone()[0] == 0
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Audio_Objects (
+        audio_key CHAR(64) PRIMARY KEY,
+        size BIGINT NOT NULL,
+        ref_count INT NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_audio_objects_ref_count (ref_count)
+    )
+    """)
+
+    return created
+
+# ------------------- Reference Counting -------------------
+def add_reference(cursor, audio_key, size, count=1):
+    """Count new songs pointing at an audio object, in the caller's transaction"""
+    add_references(cursor, [(audio_key, size, count)])
+
+def add_references(cursor, objects):
+    """Count new songs for many (audio_key, size, count) objects at once"""
+    if not objects:
+        return
+
+    cursor.executemany(
+        """
+        INSERT INTO Audio_Objects (audio_key, size, ref_count) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE ref_count = ref_count + VALUES(ref_count)
+        """,
+        list(objects)
+    )
+
+def _recently_touched(audio_key):
+    """Check whether a stored file was written or re-uploaded within DELETE_GRACE"""
+    try:
+        return time.time() - os.path.getmtime(audio_store.path_for(audio_key)) < DELETE_GRACE
+    except OSError:
+        return False
+
+def delete_song(song_id):
+    """Delete a song and drop its reference, removing the audio once nothing uses it
+
+    Returns True if the song existed.
+    """
+    with db.pooled_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT audio_key FROM Songs WHERE song_id = %s FOR UPDATE", (song_id,))
+            row = cursor.fetchone()
+            if row is None:
+                connection.rollback()
+                return False
+
+            audio_key = row[0]
+            cursor.execute("DELETE FROM Songs WHERE song_id = %s", (song_id,))
+
+            # The partitioned history tables have no foreign keys to cascade
+            cursor.execute("DELETE FROM Listening_History WHERE song_id = %s", (song_id,))
+            cursor.execute("DELETE FROM Listening_History_Daily WHERE song_id = %s", (song_id,))
+
+            removable = False
+            if audio_key:
+                cursor.execute(
+                    "UPDATE Audio_Objects SET ref_count = GREATEST(ref_count - 1, 0) WHERE audio_key = %s",
+                    (audio_key,)
+                )
+                cursor.execute("SELECT ref_count FROM Audio_Objects WHERE audio_key = %s", (audio_key,))
+                count = cursor.fetchone()
+
+                # A file just stored again by an upload that has not yet
+                # committed its song is left for the next sweep()
+                if count is not None and count[0] == 0 and not _recently_touched(audio_key):
+                    cursor.execute("DELETE FROM Audio_Objects WHERE audio_key = %s AND ref_count = 0", (audio_key,))
+                    removable = cursor.rowcount > 0
+
+            connection.commit()
+        except mysql.connector.Error:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    song_handles.invalidate(song_id, audio_changed=True)
+    if removable:
+        audio_store.delete_audio(audio_key)
+    return True
+
+# ------------------- Maintenance -------------------
+def rebuild_counts(cursor):
+    """Recompute every reference count from the Songs table"""
+    cursor.execute("UPDATE Audio_Objects SET ref_count = 0")
+    cursor.execute("""
+    INSERT INTO Audio_Objects (audio_key, size, ref_count)
+    SELECT audio_key, MAX(file_size), COUNT(*)
+    FROM Songs
+    WHERE audio_key IS NOT NULL
+    GROUP BY audio_key
+    ON DUPLICATE KEY UPDATE ref_count = VALUES(ref_count)
+    """)
+
+def _stored_files():
+    """Yield (audio_key, path, size) for every file in the audio store"""
+    for dirpath, dirnames, filenames in os.walk(audio_store.STORE_DIR):
+        if "tmp" in dirnames:
+            dirnames.remove("tmp")  # Uploads in progress
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            yield filename, path, os.path.getsize(path)
+
+def sweep(cursor):
+    """Remove unreferenced objects and stray store files, returning bytes freed"""
+    cursor.execute("SELECT audio_key FROM Audio_Objects WHERE ref_count > 0")
+    referenced = {row[0] for row in cursor.fetchall()}
+
+    freed = 0
+    for audio_key, path, size in list(_stored_files()):
+        if audio_key in referenced or _recently_touched(audio_key):
+            continue
+        os.remove(path)
+        freed += size
+
+    cursor.execute("DELETE FROM Audio_Objects WHERE ref_count = 0")
+    return freed
+
+def _storage_used(cursor):
+    """Get the bytes of audio held in Songs.file_data and in the store"""
+    cursor.execute("SELECT COALESCE(SUM(LENGTH(file_data)), 0) FROM Songs WHERE file_data IS NOT NULL")
+    blob_bytes = int(cursor.fetchone()[0])
+    return blob_bytes + sum(size for audio_key, path, size in _stored_files())
+
+def dedupe():
+    """One-shot job folding every copy of the same audio into one object
+
+    Moves any audio still in Songs.file_data into the store (identical
+    payloads land on the same file), recounts references from Songs and
+    sweeps objects nothing points at. Returns the bytes reclaimed.
+    """
+    with db.pooled_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            before = _storage_used(cursor)
+            connection.commit()  # End the read snapshot so the migrated rows are seen
+
+            if db.DB_BACKEND != "sqlite":  # SQLite installs never stored blobs
+                migrate_audio.migrate_blobs()
+
+            rebuild_counts(cursor)
+            sweep(cursor)
+            connection.commit()
+
+            after = _storage_used(cursor)
+
+            cursor.execute("SELECT COUNT(*) FROM Songs WHERE audio_key IS NOT NULL")
+            songs = cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(*) FROM Audio_Objects")
+            objects = cursor.fetchone()[0]
+        except mysql.connector.Error:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    reclaimed = max(before - after, 0)
+    print(f"{songs} songs share {objects} audio objects. "
+          f"Reclaimed {reclaimed / (1024 * 1024):.1f} MB ({before} -> {after} bytes).")
+    return reclaimed
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deduplicate song audio and maintain Audio_Objects reference counts")
+    parser.add_argument("--recount", action="store_true", help="only recompute reference counts from Songs")
+    args = parser.parse_args()
+
+    try:
+        if args.recount:
+            with db.pooled_connection() as connection:
+                cursor = connection.cursor()
+                rebuild_counts(cursor)
+                connection.commit()
+                cursor.close()
+            print("Recounted audio object references.")
+        else:
+            dedupe()
+    except mysql.connector.Error as err:
+        print(f"Error deduplicating audio: {err}")
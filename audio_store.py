@@ -0,0 +1,104 @@
+import hashlib
+import os
+import tempfile
+
+# ------------------- Store Settings -------------------
+# Audio files live outside the database, named by the SHA-256 of their
+# contents and sharded two levels deep (ab/cd/abcd...) so no single
+# directory grows too large
+STORE_DIR = "audio_store"
+CHUNK_SIZE = 1024 * 1024  # 1 MB read/write chunks
+
+# ------------------- Paths -------------------
+def path_for(audio_key):
+    """Get the on-disk path for an audio key"""
+    return os.path.join(STORE_DIR, audio_key[:2], audio_key[2:4], audio_key)
+
+def has_audio(audio_key):
+    """Check whether an audio file exists in the store"""
+    return bool(audio_key) and os.path.exists(path_for(audio_key))
+
+def _temp_dir():
+    """Get the staging directory, on the same filesystem as the store"""
+    temp_dir = os.path.join(STORE_DIR, "tmp")
+    os.makedirs(temp_dir, exist_ok=True)
+    return temp_dir
+
+def _commit_temp_file(temp_path, audio_key):
+    """Move a fully written staging file to its final content-addressed path"""
+    final_path = path_for(audio_key)
+
+    if os.path.exists(final_path):
+        # Identical content is already stored; touch it so a concurrent
+        # cleanup does not remove it before the new song is committed
+        os.remove(temp_path)
+        os.utime(final_path)
+    else:
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(temp_path, final_path)
+
+    return final_path
+
+# ------------------- Writing -------------------
+def put_bytes(data):
+    """Store audio bytes, returning (audio_key, size)"""
+    audio_key = hashlib.sha256(data).hexdigest()
+
+    if not has_audio(audio_key):
+        fd, temp_path = tempfile.mkstemp(dir=_temp_dir())
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        _commit_temp_file(temp_path, audio_key)
+
+    return audio_key, len(data)
+
+def put_chunks(chunks):
+    """Store audio from an iterable of byte chunks, returning (audio_key, size)"""
+    sha256 = hashlib.sha256()
+    size = 0
+
+    fd, temp_path = tempfile.mkstemp(dir=_temp_dir())
+    try:
+        with os.fdopen(fd, "wb") as target:
+            for chunk in chunks:
+                sha256.update(chunk)
+                target.write(chunk)
+                size += len(chunk)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+    audio_key = sha256.hexdigest()
+    _commit_temp_file(temp_path, audio_key)
+    return audio_key, size
+
+def _read_file_chunks(file_path):
+    """Yield a file's contents in CHUNK_SIZE pieces"""
+    with open(file_path, "rb") as source:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+def put_file(file_path):
+    """Copy an audio file into the store, returning (audio_key, size)"""
+    return put_chunks(_read_file_chunks(file_path))
+
+# ------------------- Reading -------------------
+def open_audio(audio_key):
+    """Open a stored audio file for binary reading"""
+    return open(path_for(audio_key), "rb")
+
+def read_audio(audio_key):
+    """Read a stored audio file into memory"""
+    with open_audio(audio_key) as f:
+        return f.read()
+
+def delete_audio(audio_key):
+    """Remove an audio file from the store if it exists"""
+    try:
+        os.remove(path_for(audio_key))
+        return True
+    except FileNotFoundError:
+        return False
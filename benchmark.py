@@ -0,0 +1,300 @@
+import argparse
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+# Page modules start the pygame mixer on import; a benchmark needs no sound card
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import mysql.connector
+import numpy as np
+
+import catalogue
+import db
+import download
+import generate_data
+import history_writer
+import play_counts
+import playlist
+import recommend
+import recommender
+import search
+import search_index
+import song_handles
+
+# ------------------- Benchmark Settings -------------------
+# Times the data-access functions the pages call on every interaction,
+# against the local database, optionally growing it with generate_data.py
+# between runs. For each function it records latency percentiles and, from
+# the server's global status counters, InnoDB rows read and bytes sent per
+# call, so run against an otherwise idle server. Results are written as
+# JSON and can be compared with an earlier file to spot regressions.
+ITERATIONS = 200  # Measured calls per function
+WARMUP_CALLS = 5  # Unmeasured calls first, to fill caches and build indexes
+SAMPLE_SIZE = 500  # Users, songs and search terms drawn as inputs
+REGRESSION_RATIO = 1.25  # Flag a function whose p95 grew by more than this
+RESULTS_DIR = os.path.join("temp", "benchmarks")
+
+# Shape of the data added when growing to a --sizes target
+PLAYS_PER_USER = 100
+PLAYS_PER_SONG = 10
+SONGS_PER_ARTIST = 20
+
+STATUS_QUERY = """
+SHOW GLOBAL STATUS WHERE Variable_name IN ('Innodb_rows_read', 'Bytes_sent')
+"""
+
+COUNTED_TABLES = ["Users", "Artists", "Songs", "Playlists", "Playlist_Songs", "Listening_History"]
+
+# ------------------- Server Counters -------------------
+def _server_status(cursor):
+    """Read the global rows-read and bytes-sent counters"""
+    cursor.execute(STATUS_QUERY)
+    return {name: int(value) for name, value in cursor.fetchall()}
+
+def _status_overhead(cursor):
+    """Measure what reading the counters itself adds to them"""
+    before = _server_status(cursor)
+    after = _server_status(cursor)
+    return {name: after[name] - before[name] for name in before}
+
+# ------------------- Inputs -------------------
+def dataset_size(cursor):
+    """Count the rows in the tables the benchmarked queries read"""
+    sizes = {}
+    for table in COUNTED_TABLES:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        sizes[table] = cursor.fetchone()[0]
+    return sizes
+
+def _sample_inputs(cursor, rng):
+    """Draw the users, songs, playlists and search terms the calls use"""
+    cursor.execute("SELECT user_id FROM Users WHERE is_admin = 0")
+    user_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT song_id FROM Songs")
+    song_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT playlist_id FROM Playlists")
+    playlist_ids = [row[0] for row in cursor.fetchall()]
+
+    def sample(values):
+        return rng.sample(values, min(SAMPLE_SIZE, len(values)))
+
+    # Whole words and typed prefixes of real titles
+    song_ids = sample(song_ids)
+    titles = [song["title"] for song in (song_handles.get_song(song_id) for song_id in song_ids[:100]) if song]
+    words = [word for title in titles for word in title.split()]
+    terms = words + [word[:3] for word in words if len(word) > 3]
+
+    return {
+        "user_ids": sample(user_ids),
+        "song_ids": song_ids,
+        "playlist_ids": sample(playlist_ids),
+        "terms": terms or ["a"]
+    }
+
+# ------------------- Cases -------------------
+def _song_data(song_id):
+    """Load a song the way the player does, with its handle not yet cached"""
+    song_handles.invalidate(song_id)
+    song = song_handles.get_song(song_id)
+    return song and song_handles.song_file(song)
+
+def _cases(inputs, rng):
+    """Get {name: call} for each benchmarked function, each call drawing its own input"""
+    user_ids, song_ids = inputs["user_ids"], inputs["song_ids"]
+
+    def flush_plays():
+        # The write history_writer's background flush makes for a full batch
+        played_at = datetime.datetime.now()
+        plays = [(rng.choice(user_ids), rng.choice(song_ids), played_at) for _ in range(history_writer.FLUSH_SIZE)]
+        play_counts.record_plays(plays)
+        return plays
+
+    cases = {
+        "search_songs": lambda: search.search_songs(rng.choice(inputs["terms"])),
+        "get_recommended_songs": lambda: recommend.get_recommended_songs(8, user_id=rng.choice(user_ids)),
+        "get_popular_songs": lambda: download.get_popular_songs(8),
+        "get_song_data": lambda: _song_data(rng.choice(song_ids)),
+        "record_listening_history": lambda: history_writer.record_play(rng.choice(song_ids), rng.choice(user_ids)),
+        "flush_listening_history": flush_plays
+    }
+    if inputs["playlist_ids"]:
+        cases["get_playlist_songs"] = lambda: playlist.get_playlist_songs(rng.choice(inputs["playlist_ids"]))
+    return cases
+
+def _rows_returned(result):
+    """Count the rows a benchmarked call handed back"""
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 1 if result else 0
+
+def measure(call, status_cursor, overhead, iterations=ITERATIONS):
+    """Time a call, returning its latency percentiles and per-call server work"""
+    for _ in range(WARMUP_CALLS):
+        call()
+
+    latencies = []
+    returned = 0
+    before = _server_status(status_cursor)
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = call()
+        latencies.append(time.perf_counter() - started)
+        returned += _rows_returned(result)
+    after = _server_status(status_cursor)
+
+    work = {name: max(after[name] - before[name] - overhead[name], 0) / iterations for name in before}
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {
+        "iterations": iterations,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(np.mean(latencies)) * 1000, 3),
+        "rows_returned": returned / iterations,
+        "rows_read": work["Innodb_rows_read"],
+        "bytes_sent": work["Bytes_sent"]
+    }
+
+def run_cases(connection, seed, iterations=ITERATIONS, only=None):
+    """Benchmark every function against the database as it is now"""
+    rng = random.Random(seed)
+    connection.commit()  # Start a fresh snapshot that includes any generated rows
+    cursor = connection.cursor()
+    try:
+        dataset = dataset_size(cursor)
+        inputs = _sample_inputs(cursor, rng)
+        overhead = _status_overhead(cursor)
+
+        results = {}
+        for name, call in _cases(inputs, rng).items():
+            if only and name not in only:
+                continue
+            results[name] = measure(call, cursor, overhead, iterations)
+            # Write queued plays now rather than during the next function
+            history_writer.flush()
+            print(f"  {name}: p50 {results[name]['p50_ms']:.2f} ms, p95 {results[name]['p95_ms']:.2f} ms, "
+                  f"p99 {results[name]['p99_ms']:.2f} ms, {results[name]['rows_read']:.0f} rows read")
+    finally:
+        cursor.close()
+
+    return {"dataset": dataset, "cases": results}
+
+# ------------------- Datasets -------------------
+def grow_to(connection, plays, seed):
+    """Generate data until Listening_History has at least this many plays"""
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM Listening_History")
+    missing = plays - cursor.fetchone()[0]
+    cursor.close()
+    if missing <= 0:
+        return
+
+    songs = max(missing // PLAYS_PER_SONG, 1)
+    generate_data.generate(
+        seed=seed,
+        users=max(missing // PLAYS_PER_USER, 1),
+        artists=max(songs // SONGS_PER_ARTIST, 1),
+        songs=songs,
+        plays=missing
+    )
+
+    # Drop everything cached from the smaller dataset
+    recommender.build_model()
+    catalogue.refresh(force=True)
+    search_index.build()
+    song_handles.clear()
+
+# ------------------- Results -------------------
+def _git_commit():
+    """Get the checked-out commit, or None outside a git checkout"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+def compare(results, baseline):
+    """Print p95 changes against an earlier results file, returning the regressions"""
+    regressions = []
+    for run, base_run in zip(results["runs"], baseline["runs"]):
+        print(f"Plays {base_run['dataset'].get('Listening_History')} -> {run['dataset'].get('Listening_History')}:")
+        for name, case in run["cases"].items():
+            base_case = base_run["cases"].get(name)
+            if base_case is None:
+                continue
+            ratio = case["p95_ms"] / max(base_case["p95_ms"], 1e-6)
+            flag = ""
+            if ratio > REGRESSION_RATIO:
+                flag = "  <-- regression"
+                regressions.append((name, run["dataset"].get("Listening_History"), ratio))
+            print(f"  {name}: p95 {base_case['p95_ms']:.2f} -> {case['p95_ms']:.2f} ms ({ratio:.2f}x){flag}")
+    return regressions
+
+def benchmark(sizes=None, seed=generate_data.DEFAULT_SEED, iterations=ITERATIONS, only=None, output=None):
+    """Benchmark the current database, or each size in turn after growing it
+
+    sizes are Listening_History row counts, smallest first. Returns the
+    results dict that was written to output.
+    """
+    db.require_mysql("benchmark.py")  # Work is measured with the server's status counters
+
+    results = {
+        "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "iterations": iterations,
+        "seed": seed,
+        "runs": []
+    }
+
+    # A dedicated connection reads the server counters between calls
+    connection = mysql.connector.connect(**db.DB_CONFIG)
+    try:
+        for step, plays in enumerate(sizes or [None]):
+            if plays is not None:
+                # A new seed per step, so each step adds different users and songs
+                grow_to(connection, plays, seed + step)
+            print(f"Benchmarking with {plays or 'the current'} plays...")
+            results["runs"].append(run_cases(connection, seed, iterations, only))
+    finally:
+        connection.close()
+
+    output = output or os.path.join(RESULTS_DIR, f"{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+    return results
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the data-access hot paths against the local database")
+    parser.add_argument("--sizes", type=lambda text: [int(size) for size in text.split(",")], default=None,
+                        help="comma-separated Listening_History sizes to grow the database to and benchmark at")
+    parser.add_argument("--seed", type=int, default=generate_data.DEFAULT_SEED, help="seed for inputs and data")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS, help="measured calls per function")
+    parser.add_argument("--only", nargs="+", default=None, help="benchmark only these functions")
+    parser.add_argument("--output", default=None, help="results file (default: temp/benchmarks/<time>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare p95 latency against")
+    args = parser.parse_args()
+
+    error = db.check_health()
+    if error is not None:
+        print(f"Database health check failed: {error}")
+        sys.exit(1)
+
+    try:
+        results = benchmark(args.sizes, args.seed, args.iterations, args.only, args.output)
+    except mysql.connector.Error as err:
+        print(f"Error running benchmark: {err}")
+        sys.exit(1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f))
+        if regressions:
+            sys.exit(1)
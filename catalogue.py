@@ -0,0 +1,116 @@
+import threading
+import time
+
+import db
+
+# ------------------- Catalogue Settings -------------------
+# Artists, Genres and Albums are small and rarely change, so each process
+# keeps an id -> name map of them and song queries select only Songs
+# columns; names are filled in client-side. A table is reloaded when its
+# (MAX(id), COUNT(*)) changes, checked with one query at most every
+# CHECK_INTERVAL seconds. That catches inserts and deletes; after renaming
+# a row in this process, call invalidate().
+CHECK_INTERVAL = 30
+UNKNOWN_ARTIST = "Unknown Artist"
+
+# name -> (table, id column, name column)
+TABLES = {
+    "artists": ("Artists", "artist_id", "name"),
+    "genres": ("Genres", "genre_id", "name"),
+    "albums": ("Albums", "album_id", "title")
+}
+
+VERSION_QUERY = """
+SELECT (SELECT COALESCE(MAX(artist_id), 0) FROM Artists), (SELECT COUNT(*) FROM Artists),
+       (SELECT COALESCE(MAX(genre_id), 0) FROM Genres), (SELECT COUNT(*) FROM Genres),
+       (SELECT COALESCE(MAX(album_id), 0) FROM Albums), (SELECT COUNT(*) FROM Albums)
+"""
+
+_maps = {name: {} for name in TABLES}
+_versions = {name: None for name in TABLES}
+_checked_at = 0.0
+_lock = threading.Lock()
+
+# ------------------- Loading -------------------
+def _load(name):
+    """Read one dimension table into its id -> name map"""
+    table, id_column, name_column = TABLES[name]
+    rows = db.fetch_all(f"SELECT {id_column}, {name_column} FROM {table}", dictionary=False)
+    _maps[name] = {row_id: row_name for row_id, row_name in rows}
+
+def refresh(force=False, check_now=False):
+    """Reload any table whose version changed, checking at most every CHECK_INTERVAL
+
+    force reloads every table; check_now skips the interval but still only
+    reloads tables whose version moved.
+    """
+    global _checked_at
+
+    with _lock:
+        now = time.monotonic()
+        if not (force or check_now) and now - _checked_at < CHECK_INTERVAL:
+            return
+
+        row = db.fetch_one(VERSION_QUERY, dictionary=False)
+        for i, name in enumerate(TABLES):
+            version = (row[2 * i], row[2 * i + 1])
+            if force or version != _versions[name]:
+                _load(name)
+                _versions[name] = version
+
+        _checked_at = now
+
+def invalidate():
+    """Reload every table on the next lookup, e.g. after adding or renaming an artist"""
+    global _checked_at
+
+    with _lock:
+        _checked_at = 0.0
+        for name in TABLES:
+            _versions[name] = None
+
+# ------------------- Lookups -------------------
+def artists():
+    """Get the {artist_id: name} map"""
+    refresh()
+    return _maps["artists"]
+
+def genres():
+    """Get the {genre_id: name} map"""
+    refresh()
+    return _maps["genres"]
+
+def albums():
+    """Get the {album_id: title} map"""
+    refresh()
+    return _maps["albums"]
+
+def sorted_rows(name):
+    """Get a table as [{id column: ..., "name": ...}] sorted by name, for pickers"""
+    refresh()
+    id_column = TABLES[name][1]
+    return [{id_column: row_id, "name": row_name}
+            for row_id, row_name in sorted(_maps[name].items(), key=lambda item: item[1].casefold())]
+
+def resolve(songs):
+    """Fill in artist_name, genre_name and album_name from the song rows' IDs
+
+    Rows need artist_id; genre_id and album_id are used when present.
+    Returns the same list, updated in place.
+    """
+    refresh()
+
+    # An ID we have not seen means a row was added since the last check
+    if any(song["artist_id"] is not None and song["artist_id"] not in _maps["artists"] for song in songs):
+        refresh(check_now=True)
+
+    artist_names, genre_names, album_titles = _maps["artists"], _maps["genres"], _maps["albums"]
+
+    for song in songs:
+        song["artist_name"] = artist_names.get(song["artist_id"], UNKNOWN_ARTIST)
+        if "genre_id" in song:
+            song["genre_name"] = genre_names.get(song["genre_id"])
+        if "album_id" in song:
+            song["album_name"] = album_titles.get(song["album_id"])
+
+    return songs
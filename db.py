@@ -0,0 +1,513 @@
+import atexit
+import datetime
+import json
+import os
+import re
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from collections import OrderedDict
+
+import mysql.connector
+from mysql.connector import pooling
+
+import sqlite_backend
+
+# ------------------- Connection Settings -------------------
+# "mysql" talks to the server below; "sqlite" uses an embedded database
+# file for single-user and offline installs, with no server to run
+DB_BACKEND = os.environ.get("MUSIC_DB_BACKEND", "mysql")
+
+DB_HOST = "localhost"
+DB_USER = "root"
+DB_PASSWORD = "new_password"
+DB_NAME = "online_music_system"
+
+SERVER_CONFIG = {
+    "host": DB_HOST,
+    "user": DB_USER,
+    "password": DB_PASSWORD
+}
+
+DB_CONFIG = dict(SERVER_CONFIG, database=DB_NAME)
+
+# Pool settings
+POOL_NAME = "music_pool"
+POOL_SIZE = 5                # Upper bound on open connections per process
+POOL_WAIT_TIMEOUT = 5.0      # Seconds to wait for a free connection
+HEALTH_CHECK_INTERVAL = 30   # Seconds a connection may sit idle before it is pinged
+PREPARED_CACHE_SIZE = 32     # Prepared statements kept per connection
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Last time each raw connection was handed out, used for health checks
+_last_used = weakref.WeakKeyDictionary()
+
+# Per-connection prepared statement cache: raw connection -> {sql: cursor}
+_prepared_cursors = weakref.WeakKeyDictionary()
+
+# Instrumentation settings. Every connection handed out here returns
+# cursors that time each statement. Timings are grouped by fingerprint, the
+# SQL with literals and IN lists collapsed. Statements slower than
+# SLOW_QUERY_MS go to the slow log, and SELECTs also get their EXPLAIN
+# plan, captured in the background at most once per EXPLAIN_INTERVAL for
+# each fingerprint. Both files go under the app's own temp directory,
+# whatever the working directory; the stats dump at exit is opt-in, set
+# MUSIC_QUERY_STATS=1 to get it.
+INSTRUMENT_QUERIES = True
+SLOW_QUERY_MS = 200
+APP_TEMP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp")
+SLOW_LOG_FILE = os.path.join(APP_TEMP_DIR, "slow_queries.log")
+STATS_FILE = os.path.join(APP_TEMP_DIR, "query_stats.json")
+WRITE_STATS_AT_EXIT = os.environ.get("MUSIC_QUERY_STATS") == "1"
+EXPLAIN_INTERVAL = 600  # Seconds between EXPLAINs of the same fingerprint
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+BYTES_SAMPLE_ROWS = 100  # Rows sized per fetch; larger fetches are extrapolated
+FINGERPRINT_CACHE_SIZE = 1024
+
+_stats = {}  # fingerprint -> counters, see _record()
+_stats_lock = threading.Lock()
+_fingerprints = OrderedDict()  # sql -> fingerprint
+_explained_at = {}  # fingerprint -> time of its last EXPLAIN
+_explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+_explain_connection = None
+
+# ------------------- Pool Management -------------------
+def get_pool():
+    """Create the shared connection pool on first use"""
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name=POOL_NAME,
+                    pool_size=POOL_SIZE,
+                    # Session state is never changed by the app, and skipping the
+                    # reset keeps server-side prepared statements alive
+                    pool_reset_session=False,
+                    **DB_CONFIG
+                )
+    return _pool
+
+class PooledConnection:
+    """Pooled connection that ends its transaction when handed back
+
+    Connections are not autocommit, so even a plain SELECT opens a
+    REPEATABLE READ transaction. Without a rollback the next borrower would
+    keep reading the snapshot it took, and pool_reset_session is off.
+
+    The pool has no finalizer, so a connection that is never closed loses
+    its slot for good. Callers close in a finally block, even when the
+    connection broke; closing twice is harmless.
+    """
+
+    def __init__(self, connection):
+        self._wrapped = connection
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._wrapped.in_transaction:
+                self._wrapped.rollback()
+        except mysql.connector.Error:
+            pass  # A broken connection is reconnected by the next health check
+        finally:
+            self._wrapped.close()
+
+def _raw_connection(connection):
+    """Get the underlying connection behind a pooled or instrumented wrapper"""
+    while isinstance(connection, (InstrumentedConnection, PooledConnection)):
+        connection = connection._wrapped
+    return getattr(connection, "_cnx", connection)
+
+def _ensure_healthy(connection):
+    """Ping a connection that has been idle for a while, reconnecting if needed"""
+    raw = _raw_connection(connection)
+    now = time.monotonic()
+    last_used = _last_used.get(raw)
+
+    if last_used is None or now - last_used > HEALTH_CHECK_INTERVAL:
+        connection.ping(reconnect=True, attempts=2, delay=0.2)
+        # A reconnect drops every server-side prepared statement
+        _prepared_cursors.pop(raw, None)
+
+    _last_used[raw] = now
+
+def connect_db():
+    """Get a healthy connection from the shared pool
+
+    Closing the returned connection rolls back anything left uncommitted
+    and hands it back to the pool. Raises
+    mysql.connector.Error if no connection becomes available in time.
+    """
+    if DB_BACKEND == "sqlite":
+        # Opening the file is cheap enough that SQLite needs no pool
+        return _instrumented(sqlite_backend.connect())
+
+    pool = get_pool()
+    deadline = time.monotonic() + POOL_WAIT_TIMEOUT
+
+    while True:
+        try:
+            connection = pool.get_connection()
+            break
+        except mysql.connector.errors.PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+
+    _ensure_healthy(connection)
+    return _instrumented(PooledConnection(connection))
+
+def connect_db_server():
+    """Connect to the MySQL server without selecting a database (setup only)"""
+    if DB_BACKEND == "sqlite":
+        return _instrumented(sqlite_backend.connect())
+    return _instrumented(mysql.connector.connect(**SERVER_CONFIG))
+
+def require_mysql(tool):
+    """Refuse to run a tool that needs MySQL-only SQL against the SQLite backend"""
+    if DB_BACKEND == "sqlite":
+        raise mysql.connector.NotSupportedError(
+            msg=f"{tool} needs the MySQL backend and does not run with MUSIC_DB_BACKEND=sqlite"
+        )
+
+def check_health():
+    """Check that the database answers, returning None or the error it gave"""
+    try:
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+        return None
+    except mysql.connector.Error as err:
+        return err
+
+@contextmanager
+def pooled_connection():
+    """Borrow a pooled connection for the duration of a with-block"""
+    conn = connect_db()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+# ------------------- Prepared Statements -------------------
+def prepared_cursor(connection, query, dictionary=True):
+    """Get a cached prepared cursor for a query on this connection"""
+    raw = _raw_connection(connection)
+    cache = _prepared_cursors.get(raw)
+    if cache is None:
+        cache = OrderedDict()
+        _prepared_cursors[raw] = cache
+
+    key = (query, dictionary)
+    cursor = cache.get(key)
+    if cursor is not None:
+        cache.move_to_end(key)
+        return cursor
+
+    cursor = connection.cursor(prepared=True, dictionary=dictionary)
+    cache[key] = cursor
+
+    # Drop the least recently used statement when the cache is full
+    if len(cache) > PREPARED_CACHE_SIZE:
+        _, old_cursor = cache.popitem(last=False)
+        try:
+            old_cursor.close()
+        except mysql.connector.Error:
+            pass
+
+    return cursor
+
+# ------------------- Query Helpers -------------------
+def fetch_all(query, params=(), dictionary=True):
+    """Run a SELECT on a pooled connection and return all rows"""
+    with pooled_connection() as conn:
+        cursor = prepared_cursor(conn, query, dictionary)
+        cursor.execute(query, tuple(params))
+        return cursor.fetchall()
+
+def fetch_one(query, params=(), dictionary=True):
+    """Run a SELECT on a pooled connection and return the first row"""
+    rows = fetch_all(query, params, dictionary)
+    return rows[0] if rows else None
+
+def execute(query, params=()):
+    """Run a single write statement and commit, returning the last row ID"""
+    with pooled_connection() as conn:
+        cursor = prepared_cursor(conn, query, dictionary=False)
+        cursor.execute(query, tuple(params))
+        conn.commit()
+        return cursor.lastrowid
+
+def execute_many(query, rows):
+    """Run a write statement for many parameter rows in one transaction"""
+    if not rows:
+        return 0
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(query, rows)
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+# ------------------- Query Instrumentation -------------------
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s)\s*,?)+\)", re.IGNORECASE)
+_PLACEHOLDER_VALUES = re.compile(r"VALUES\s*\((?:[^()]*)\)(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+
+def fingerprint(sql):
+    """Get a statement's shape, with literals and IN lists collapsed"""
+    with _stats_lock:
+        cached = _fingerprints.get(sql)
+        if cached is not None:
+            return cached
+
+    shape = " ".join(sql.split())
+    shape = _LITERALS.sub("?", shape)
+    shape = _IN_LISTS.sub("IN (...)", shape)
+    shape = _PLACEHOLDER_VALUES.sub("VALUES (...)", shape)
+
+    with _stats_lock:
+        _fingerprints[sql] = shape
+        if len(_fingerprints) > FINGERPRINT_CACHE_SIZE:
+            _fingerprints.popitem(last=False)
+    return shape
+
+def _row_bytes(rows):
+    """Estimate the bytes in fetched rows from a sample of them"""
+    sample = rows[:BYTES_SAMPLE_ROWS]
+    size = 0
+    for row in sample:
+        for value in (row.values() if isinstance(row, dict) else row):
+            size += len(value) if isinstance(value, (str, bytes, bytearray)) else 8
+    return size * len(rows) // max(len(sample), 1)
+
+def _record(sql, params, elapsed, rows, size):
+    """Add one finished statement to its fingerprint's counters"""
+    shape = fingerprint(sql)
+    elapsed_ms = elapsed * 1000
+
+    bucket = len(LATENCY_BUCKETS_MS)
+    for i, bound in enumerate(LATENCY_BUCKETS_MS):
+        if elapsed_ms <= bound:
+            bucket = i
+            break
+
+    with _stats_lock:
+        stats = _stats.get(shape)
+        if stats is None:
+            stats = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "bytes": 0,
+                     "histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+            _stats[shape] = stats
+        stats["count"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        stats["rows"] += rows
+        stats["bytes"] += size
+        stats["histogram"][bucket] += 1
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        _log_slow_query(shape, sql, params, elapsed_ms, rows)
+
+def _log_slow_query(shape, sql, params, elapsed_ms, rows):
+    """Write a slow statement to the slow log, with its plan if it is a SELECT"""
+    now = time.monotonic()
+    explain = sql.lstrip().upper().startswith("SELECT")
+    with _stats_lock:
+        if explain and now - _explained_at.get(shape, -EXPLAIN_INTERVAL) >= EXPLAIN_INTERVAL:
+            _explained_at[shape] = now
+        else:
+            explain = False
+
+    entry = {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "ms": round(elapsed_ms, 1),
+        "rows": rows,
+        "fingerprint": shape
+    }
+    _explain_executor.submit(_write_slow_entry, entry, sql if explain else None, params)
+
+def _explain(sql, params):
+    """Get a statement's EXPLAIN rows on a connection of its own"""
+    global _explain_connection
+
+    if _explain_connection is None or not _explain_connection.is_connected():
+        if DB_BACKEND == "sqlite":
+            _explain_connection = sqlite_backend.connect()
+        else:
+            _explain_connection = mysql.connector.connect(**DB_CONFIG)
+    cursor = _explain_connection.cursor(dictionary=True)
+    try:
+        explain = "EXPLAIN QUERY PLAN " if DB_BACKEND == "sqlite" else "EXPLAIN "
+        cursor.execute(explain + sql, tuple(params or ()))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+def _write_slow_entry(entry, sql, params):
+    """Append one JSON line to the slow log (explain thread)"""
+    if sql is not None:
+        try:
+            entry["explain"] = _explain(sql, params)
+        except mysql.connector.Error as err:
+            entry["explain_error"] = str(err)
+
+    try:
+        os.makedirs(os.path.dirname(SLOW_LOG_FILE), exist_ok=True)
+        with open(SLOW_LOG_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, default=str) + "\n")
+    except OSError as e:
+        print(f"Error writing slow query log: {e}")
+
+def query_stats():
+    """Get per-fingerprint statement stats, slowest in total first
+
+    Each entry has count, total/mean/max ms, p50/p95/p99 ms (the upper
+    bound of the histogram bucket they fall in), rows and bytes fetched.
+    """
+    with _stats_lock:
+        snapshot = [(shape, dict(stats, histogram=list(stats["histogram"]))) for shape, stats in _stats.items()]
+
+    report = []
+    for shape, stats in snapshot:
+        percentiles = {}
+        for name, share in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            seen = 0
+            for i, count in enumerate(stats["histogram"]):
+                seen += count
+                if seen >= share * stats["count"]:
+                    percentiles[name] = LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else stats["max_ms"]
+                    break
+        report.append(dict(
+            stats,
+            fingerprint=shape,
+            mean_ms=stats["total_ms"] / stats["count"],
+            buckets_ms=list(LATENCY_BUCKETS_MS),
+            **percentiles
+        ))
+
+    report.sort(key=lambda entry: entry["total_ms"], reverse=True)
+    return report
+
+def reset_query_stats():
+    """Forget every recorded statement"""
+    with _stats_lock:
+        _stats.clear()
+
+def _write_stats():
+    """Save this process's statement stats to STATS_FILE at exit, if asked to"""
+    if not WRITE_STATS_AT_EXIT or not _stats:
+        return
+    try:
+        os.makedirs(os.path.dirname(STATS_FILE), exist_ok=True)
+        with open(STATS_FILE, "w", encoding="utf-8") as f:
+            json.dump(query_stats(), f, indent=2)
+    except OSError as e:
+        print(f"Error writing query stats: {e}")
+
+atexit.register(_write_stats)
+
+class InstrumentedCursor:
+    """Cursor wrapper timing each statement from execute to its last fetch"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._statement = None  # [sql, params, elapsed, rows, bytes] until finished
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        row = self.fetchone()
+        while row is not None:
+            yield row
+            row = self.fetchone()
+
+    def _finish(self):
+        if self._statement is not None:
+            _record(*self._statement)
+            self._statement = None
+
+    def _fetched(self, started, rows):
+        if self._statement is not None:
+            self._statement[2] += time.perf_counter() - started
+            self._statement[3] += len(rows)
+            self._statement[4] += _row_bytes(rows)
+
+    def execute(self, operation, params=(), *args, **kwargs):
+        self._finish()
+        started = time.perf_counter()
+        result = self._cursor.execute(operation, params, *args, **kwargs)
+        self._statement = [operation, params, time.perf_counter() - started, 0, 0]
+
+        # Writes have no rows to wait for
+        if not getattr(self._cursor, "with_rows", True):
+            self._finish()
+        return result
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self._finish()
+        started = time.perf_counter()
+        result = self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        _record(operation, None, time.perf_counter() - started, 0, 0)
+        return result
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        if row is None:
+            self._finish()
+        else:
+            self._fetched(started, [row])
+        return row
+
+    def fetchmany(self, size=1):
+        started = time.perf_counter()
+        rows = self._cursor.fetchmany(size)
+        self._fetched(started, rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(started, rows)
+        self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+class InstrumentedConnection:
+    """Connection wrapper whose cursors are instrumented"""
+
+    def __init__(self, connection):
+        self._wrapped = connection
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._wrapped.cursor(*args, **kwargs))
+
+def _instrumented(connection):
+    """Wrap a connection so its statements are timed, if instrumentation is on"""
+    return InstrumentedConnection(connection) if INSTRUMENT_QUERIES else connection
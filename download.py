@@ -1,27 +1,25 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox, simpledialog
 import mysql.connector
-import subprocess
+import db
+import catalogue
+import router
+import player
+import audio_objects
+import song_audio
+import song_handles
+import song_list
+import search_index
 import os
 import io
 import shutil
 from pygame import mixer
-from mutagen.mp3 import MP3
-from mutagen.flac import FLAC
-from mutagen.wave import WAVE
-import mutagen
 
 # Initialize mixer for music playback
 mixer.init()
 
-# Current song information
-current_song = {
-    "id": None,
-    "title": "No song playing",
-    "artist": "",
-    "playing": False,
-    "paused": False
-}
+# Current song information, shared with every other page
+current_song = player.current_song
 
 # Keep track of selected song
 selected_song = {
@@ -30,17 +28,14 @@ selected_song = {
     "artist": None
 }
 
+# Virtualized list on the popular songs tab
+popular_list = None
+
 # ------------------- Database Functions -------------------
 def connect_db():
-    """Connect to the MySQL database"""
+    """Get a pooled connection to the MySQL database"""
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="new_password",
-            database="online_music_system"
-        )
-        return connection
+        return db.connect_db()
     except mysql.connector.Error as err:
         messagebox.showerror("Database Connection Error", 
                             f"Failed to connect to database: {err}")
@@ -80,12 +75,11 @@ def get_current_user():
         print(f"Error getting current user: {e}")
         return None
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
-def get_popular_songs(limit=8):
-    """Get most popular songs from the database"""
+def get_popular_songs(limit=8, after=None):
+    """Get most popular songs from the database, continuing after the given song"""
     try:
         connection = connect_db()
         if not connection:
@@ -93,36 +87,43 @@ def get_popular_songs(limit=8):
             
         cursor = connection.cursor(dictionary=True)
         
-        # Get songs with most plays in listening history
-        query = """
-        SELECT s.song_id, s.title, a.name as artist_name, COUNT(lh.history_id) as play_count, 
-               g.name as genre_name, s.file_size, s.file_type
-        FROM Songs s
-        JOIN Artists a ON s.artist_id = a.artist_id
-        LEFT JOIN Genres g ON s.genre_id = g.genre_id
-        LEFT JOIN Listening_History lh ON s.song_id = lh.song_id
-        GROUP BY s.song_id
-        ORDER BY play_count DESC
+        # Keyset pagination on (play_count DESC, song_id) for further pages
+        if after:
+            where = "WHERE pc.total_plays < %s OR (pc.total_plays = %s AND pc.song_id > %s)"
+            params = (after['play_count'], after['play_count'], after['song_id'], limit)
+        else:
+            where = ""
+            params = (limit,)
+        
+        # Get songs with most plays, read in order from the play count index
+        query = f"""
+        SELECT s.song_id, s.title, s.artist_id, pc.total_plays as play_count, 
+               s.genre_id, s.file_size, s.file_type
+        FROM Song_Play_Counts pc
+        JOIN Songs s ON pc.song_id = s.song_id
+        {where}
+        ORDER BY pc.total_plays DESC, pc.song_id
         LIMIT %s
         """
         
-        cursor.execute(query, (limit,))
+        cursor.execute(query, params)
         songs = cursor.fetchall()
         
         # If no songs with play history, get newest songs
-        if not songs:
+        if not songs and after is None:
             query = """
-            SELECT s.song_id, s.title, a.name as artist_name, s.file_size, s.file_type,
-                   g.name as genre_name, 0 as play_count
+            SELECT s.song_id, s.title, s.artist_id, s.file_size, s.file_type,
+                   s.genre_id, 0 as play_count
             FROM Songs s
-            JOIN Artists a ON s.artist_id = a.artist_id
-            LEFT JOIN Genres g ON s.genre_id = g.genre_id
             ORDER BY s.upload_date DESC
             LIMIT %s
             """
             cursor.execute(query, (limit,))
             songs = cursor.fetchall()
             
+        # Artist and genre names come from the in-memory catalogue
+        catalogue.resolve(songs)
+        
         # Format file sizes to human-readable format
         for song in songs:
             song['file_size_formatted'] = format_file_size(song['file_size'])
@@ -133,8 +134,7 @@ def get_popular_songs(limit=8):
         print(f"Error fetching popular songs: {e}")
         return []
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 def get_user_favorite_songs(limit=8):
@@ -150,22 +150,33 @@ def get_user_favorite_songs(limit=8):
             
         cursor = connection.cursor(dictionary=True)
         
-        # Get songs the user has listened to most
+        # Get songs the user has listened to most, counting plays already
+        # rolled up out of the raw history
         query = """
-        SELECT s.song_id, s.title, a.name as artist_name, COUNT(lh.history_id) as play_count,
-               g.name as genre_name, s.file_size, s.file_type
-        FROM Listening_History lh
-        JOIN Songs s ON lh.song_id = s.song_id
-        JOIN Artists a ON s.artist_id = a.artist_id
-        LEFT JOIN Genres g ON s.genre_id = g.genre_id
-        WHERE lh.user_id = %s
-        GROUP BY s.song_id
-        ORDER BY play_count DESC
+        SELECT s.song_id, s.title, s.artist_id, plays.play_count,
+               s.genre_id, s.file_size, s.file_type
+        FROM (
+            SELECT song_id, SUM(plays) as play_count
+            FROM (
+                SELECT song_id, COUNT(*) as plays
+                FROM Listening_History
+                WHERE user_id = %s
+                GROUP BY song_id
+                UNION ALL
+                SELECT song_id, SUM(plays)
+                FROM Listening_History_Daily
+                WHERE user_id = %s
+                GROUP BY song_id
+            ) counted
+            GROUP BY song_id
+        ) plays
+        JOIN Songs s ON plays.song_id = s.song_id
+        ORDER BY plays.play_count DESC
         LIMIT %s
         """
         
-        cursor.execute(query, (user_id, limit))
-        songs = cursor.fetchall()
+        cursor.execute(query, (user_id, user_id, limit))
+        songs = catalogue.resolve(cursor.fetchall())
         
         # Format file sizes to human-readable format
         for song in songs:
@@ -177,177 +188,35 @@ def get_user_favorite_songs(limit=8):
         print(f"Error getting user favorite songs: {e}")
         return []
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
-
-def get_song_data(song_id):
-    """Get binary song data from database"""
-    try:
-        connection = connect_db()
-        if not connection:
-            return None
-            
-        cursor = connection.cursor()
-        
-        query = """
-        SELECT file_data, file_type, title, a.name as artist_name 
-        FROM Songs s
-        JOIN Artists a ON s.artist_id = a.artist_id
-        WHERE s.song_id = %s
-        """
-        cursor.execute(query, (song_id,))
-        
-        result = cursor.fetchone()
-        if result:
-            return {
-                'data': result[0], 
-                'type': result[1],
-                'title': result[2],
-                'artist': result[3]
-            }
-        return None
-        
-    except mysql.connector.Error as e:
-        print(f"Error getting song data: {e}")
-        return None
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
-    """Get binary song data from database"""
-    try:
-        connection = connect_db()
-        if not connection:
-            return None
-            
-        cursor = connection.cursor()
-        
-        query = """
-        SELECT s.file_data, s.file_type, s.title, a.name as artist_name 
-        FROM Songs s
-        JOIN Artists a ON s.artist_id = a.artist_id
-        WHERE s.song_id = %s
-        """
-        cursor.execute(query, (song_id,))
-        
-        result = cursor.fetchone()
-        if result:
-            return {
-                'data': result[0], 
-                'type': result[1],
-                'title': result[2],
-                'artist': result[3]
-            }
-        return None
-        
-    except mysql.connector.Error as e:
-        print(f"Error getting song data: {e}")
-        return None
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
-
-def record_listening_history(song_id):
-    """Record that the current user listened to a song"""
-    try:
-        # Get current user ID
-        with open("current_user.txt", "r") as f:
-            user_id = f.read().strip()
-            
-        connection = connect_db()
-        if not connection:
-            return
-            
-        cursor = connection.cursor()
-        
-        query = "INSERT INTO Listening_History (user_id, song_id) VALUES (%s, %s)"
-        cursor.execute(query, (user_id, song_id))
-        connection.commit()
-        
-    except Exception as e:
-        print(f"Error recording listening history: {e}")
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 def get_artists():
-    """Get list of artists from the database"""
+    """Get list of artists, sorted by name, from the catalogue cache"""
     try:
-        connection = connect_db()
-        if not connection:
-            return []
-            
-        cursor = connection.cursor(dictionary=True)
-        
-        query = "SELECT artist_id, name FROM Artists ORDER BY name"
-        cursor.execute(query)
-        
-        return cursor.fetchall()
-        
+        return catalogue.sorted_rows("artists")
     except mysql.connector.Error as e:
         print(f"Error fetching artists: {e}")
         return []
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
 
 def get_genres():
-    """Get list of genres from the database"""
+    """Get list of genres, sorted by name, from the catalogue cache"""
     try:
-        connection = connect_db()
-        if not connection:
-            return []
-            
-        cursor = connection.cursor(dictionary=True)
-        
-        query = "SELECT genre_id, name FROM Genres ORDER BY name"
-        cursor.execute(query)
-        
-        return cursor.fetchall()
-        
+        return catalogue.sorted_rows("genres")
     except mysql.connector.Error as e:
         print(f"Error fetching genres: {e}")
         return []
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
 
 def upload_song(file_path, title, artist_id, genre_id=None):
-    """Upload a song to the database"""
+    """Upload a song to the audio store and register it in the database"""
     try:
         if not os.path.exists(file_path):
             messagebox.showerror("Error", f"File not found: {file_path}")
             return None
         
-        # Get file information
-        file_size = os.path.getsize(file_path)
-        file_type = os.path.splitext(file_path)[1][1:].lower()  # Get extension without dot
-        
-        # Get song duration using mutagen
-        try:
-            if file_type == 'mp3':
-                audio = MP3(file_path)
-            elif file_type == 'flac':
-                audio = FLAC(file_path)
-            elif file_type in ['wav', 'wave']:
-                audio = WAVE(file_path)
-            else:
-                # Fallback for other formats
-                audio = mutagen.File(file_path)
-                
-            duration = int(audio.info.length)
-        except Exception as e:
-            print(f"Error getting audio duration: {e}")
-            duration = 0
-        
-        # Read file binary data - ensure binary data is properly read
-        with open(file_path, 'rb') as file:
-            file_data = file.read()
+        # Stream the file into the audio store, probing its duration on the way;
+        # the Songs row is only written once every chunk has landed
+        audio = song_audio.ingest_file(file_path)
         
         # Insert into database
         connection = connect_db()
@@ -357,79 +226,22 @@ def upload_song(file_path, title, artist_id, genre_id=None):
         cursor = connection.cursor()
         
         query = """
-        INSERT INTO Songs (title, artist_id, genre_id, duration, file_data, file_type, file_size)
+        INSERT INTO Songs (title, artist_id, genre_id, duration, audio_key, file_type, file_size)
         VALUES (%s, %s, %s, %s, %s, %s, %s)
         """
         
-        values = (title, artist_id, genre_id, duration, file_data, file_type, file_size)
+        values = (title, artist_id, genre_id, audio["duration"], audio["audio_key"],
+                  audio["file_type"], audio["file_size"])
         
         cursor.execute(query, values)
-        connection.commit()
-        
-        # Return the new song ID
         new_song_id = cursor.lastrowid
         
-        messagebox.showinfo("Success", f"Song '{title}' uploaded successfully!")
-        return new_song_id
-        
-    except mysql.connector.Error as e:
-        print(f"Error uploading song: {e}")
-        messagebox.showerror("Database Error", f"Failed to upload song: {e}")
-        return None
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
-    """Upload a song to the database"""
-    try:
-        if not os.path.exists(file_path):
-            messagebox.showerror("Error", f"File not found: {file_path}")
-            return None
-        
-        # Get file information
-        file_size = os.path.getsize(file_path)
-        file_type = os.path.splitext(file_path)[1][1:].lower()  # Get extension without dot
-        
-        # Get song duration using mutagen
-        try:
-            if file_type == 'mp3':
-                audio = MP3(file_path)
-            elif file_type == 'flac':
-                audio = FLAC(file_path)
-            elif file_type in ['wav', 'wave']:
-                audio = WAVE(file_path)
-            else:
-                # Fallback for other formats
-                audio = mutagen.File(file_path)
-                
-            duration = int(audio.info.length)
-        except Exception as e:
-            print(f"Error getting audio duration: {e}")
-            duration = 0
-        
-        # Read file binary data
-        with open(file_path, 'rb') as file:
-            file_data = file.read()
-        
-        # Insert into database
-        connection = connect_db()
-        if not connection:
-            return None
-            
-        cursor = connection.cursor()
-        
-        query = """
-        INSERT INTO Songs (title, artist_id, genre_id, duration, file_data, file_type, file_size)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        values = (title, artist_id, genre_id, duration, file_data, file_type, file_size)
-        
-        cursor.execute(query, values)
+        # An identical file uploaded before shares the same audio object
+        audio_objects.add_reference(cursor, audio["audio_key"], audio["file_size"])
         connection.commit()
         
-        # Return the new song ID
-        new_song_id = cursor.lastrowid
+        # Make the song searchable right away
+        search_index.add_song(new_song_id)
         
         messagebox.showinfo("Success", f"Song '{title}' uploaded successfully!")
         return new_song_id
@@ -438,9 +250,12 @@ def upload_song(file_path, title, artist_id, genre_id=None):
         print(f"Error uploading song: {e}")
         messagebox.showerror("Database Error", f"Failed to upload song: {e}")
         return None
+    except OSError as e:
+        print(f"Error storing song file: {e}")
+        messagebox.showerror("Error", f"Failed to store song file: {e}")
+        return None
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 def format_file_size(size_bytes):
@@ -462,113 +277,13 @@ def format_file_size(size_bytes):
     return f"{size:.2f} {units[unit_index]}"
 
 # ------------------- Music Player Functions -------------------
-def play_song(song_id):
-    """Play a song from its binary data in the database"""
-    global current_song
-    
-    try:
-        # Get song data from database
-        song_data = get_song_data(song_id)
-        if not song_data:
-            messagebox.showerror("Error", "Could not retrieve song data")
-            return False
-            
-        # Get additional song info for display
-        connection = connect_db()
-        if connection:
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute(
-                "SELECT s.title, a.name as artist_name FROM Songs s JOIN Artists a ON s.artist_id = a.artist_id WHERE s.song_id = %s",
-                (song_id,)
-            )
-            song_info = cursor.fetchone()
-            cursor.close()
-            connection.close()
-        else:
-            song_info = {"title": "Unknown", "artist_name": "Unknown"}
-            
-        # Create a temporary file to play the song
-        temp_dir = "temp"
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        temp_file = os.path.join(temp_dir, f"song_{song_id}.{song_data['type']}")
-        
-        # Write binary data to temp file
-        with open(temp_file, 'wb') as f:
-            f.write(song_data['data'])
-            
-        # Load and play the song
-        mixer.music.load(temp_file)
-        mixer.music.play()
-        
-        # Update current song info
-        current_song = {
-            "id": song_id,
-            "title": song_info["title"],
-            "artist": song_info["artist_name"],
-            "playing": True,
-            "paused": False
-        }
-        
-        # Update UI elements
-        if 'now_playing_label' in globals():
-            now_playing_label.configure(text=f"Now Playing: {current_song['title']} - {current_song['artist']}")
-        
-        if 'play_btn' in globals():
-            play_btn.configure(text="⏸️")
-        
-        # Record in listening history
-        record_listening_history(song_id)
-        
-        return True
-        
-    except Exception as e:
-        print(f"Error playing song: {e}")
-        messagebox.showerror("Error", f"Could not play song: {e}")
-        return False
-    """Play a song from its binary data in the database"""
-    global current_song
-    
+def play_song(song_id, source=None):
+    """Play a song, queueing the list it was picked from after it"""
     try:
-        # Get song data from database
-        song_data = get_song_data(song_id)
-        if not song_data:
+        # The next songs are prefetched while this one plays
+        if not player.play_song(song_id, source):
             messagebox.showerror("Error", "Could not retrieve song data")
             return False
-            
-        # Create a temporary file to play the song
-        temp_dir = "temp"
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        temp_file = os.path.join(temp_dir, f"song_{song_id}.{song_data['type']}")
-        
-        # Write binary data to temp file
-        with open(temp_file, 'wb') as f:
-            f.write(song_data['data'])
-            
-        # Load and play the song
-        mixer.music.load(temp_file)
-        mixer.music.play()
-        
-        # Update current song info
-        current_song = {
-            "id": song_id,
-            "title": song_data["title"],
-            "artist": song_data["artist"],
-            "playing": True,
-            "paused": False
-        }
-        
-        # Update UI elements
-        if 'now_playing_label' in globals():
-            now_playing_label.configure(text=f"Now Playing: {current_song['title']} - {current_song['artist']}")
-        
-        if 'play_btn' in globals():
-            play_btn.configure(text="⏸️")
-        
-        # Record in listening history
-        record_listening_history(song_id)
-        
         return True
         
     except Exception as e:
@@ -597,12 +312,22 @@ def toggle_play_pause():
         play_btn.configure(text="▶️")
 
 def play_next_song():
-    """Placeholder for playing next song"""
-    messagebox.showinfo("Info", "Next song feature will be implemented with playlists")
+    """Play the next song in the queue"""
+    try:
+        if not player.play_next():
+            messagebox.showinfo("Info", "There is no next song in the queue")
+    except Exception as e:
+        print(f"Error playing next song: {e}")
+        messagebox.showerror("Error", f"Could not play song: {e}")
 
 def play_previous_song():
-    """Placeholder for playing previous song"""
-    messagebox.showinfo("Info", "Previous song feature will be implemented with playlists")
+    """Play the previous song in the queue, or restart the current one"""
+    try:
+        if not player.play_previous():
+            messagebox.showinfo("Info", "There is no previous song in the queue")
+    except Exception as e:
+        print(f"Error playing previous song: {e}")
+        messagebox.showerror("Error", f"Could not play song: {e}")
 
 # ------------------- Download Functions -------------------
 def download_song(song_id):
@@ -610,14 +335,15 @@ def download_song(song_id):
     global selected_song
     
     try:
-        # Get song data
-        song_data = get_song_data(song_id)
+        # Find the song's audio; it is streamed to disk below, not loaded here
+        song_data = song_handles.get_song(song_id)
         if not song_data:
             messagebox.showerror("Error", "Could not retrieve song data")
             return False
+        file_type = song_data['file_type']
         
         # Format the filename
-        filename = f"{song_data['artist']} - {song_data['title']}.{song_data['type']}"
+        filename = f"{song_data['artist_name']} - {song_data['title']}.{file_type}"
         # Replace invalid filename characters
         filename = filename.replace('/', '_').replace('\\', '_').replace(':', '_').replace('*', '_').replace('?', '_').replace('"', '_').replace('<', '_').replace('>', '_').replace('|', '_')
         
@@ -626,16 +352,16 @@ def download_song(song_id):
         save_path = filedialog.asksaveasfilename(
             initialdir=downloads_dir,
             initialfile=filename,
-            defaultextension=f".{song_data['type']}",
-            filetypes=[(f"{song_data['type'].upper()} files", f"*.{song_data['type']}"), ("All files", "*.*")]
+            defaultextension=f".{file_type}",
+            filetypes=[(f"{file_type.upper()} files", f"*.{file_type}"), ("All files", "*.*")]
         )
         
         if not save_path:  # User cancelled
             return False
         
-        # Write song data to file
+        # Stream the song to the file in chunks
         with open(save_path, 'wb') as f:
-            f.write(song_data['data'])
+            song_audio.copy_to(song_data, f)
         
         messagebox.showinfo("Download Complete", f"Song has been downloaded to:\n{save_path}")
         return True
@@ -680,12 +406,14 @@ def handle_upload_song():
             cursor = connection.cursor()
             cursor.execute("INSERT INTO Artists (name) VALUES (%s)", (artist_name,))
             connection.commit()
+            catalogue.invalidate()
             artist_id = cursor.lastrowid
             cursor.close()
-            connection.close()
         except Exception as e:
             messagebox.showerror("Error", f"Could not add artist: {e}")
             return
+        finally:
+            connection.close()
     else:
         # Let user select artist
         artist_id = None
@@ -739,12 +467,14 @@ def handle_upload_song():
             cursor = connection.cursor()
             cursor.execute("INSERT INTO Artists (name) VALUES (%s)", (artist_name,))
             connection.commit()
+            catalogue.invalidate()
             artist_id = cursor.lastrowid
             cursor.close()
-            connection.close()
         except Exception as e:
             messagebox.showerror("Error", f"Could not add artist: {e}")
             return
+        finally:
+            connection.close()
     else:
         # Create a dialog to select artist
         artist_select = ctk.CTkToplevel(root)
@@ -789,15 +519,17 @@ def handle_upload_song():
                         cursor = connection.cursor()
                         cursor.execute("INSERT INTO Artists (name) VALUES (%s)", (artist_name,))
                         connection.commit()
+                        catalogue.invalidate()
                         new_id = cursor.lastrowid
                         cursor.close()
-                        connection.close()
                         
                         # Add to list and select it
                         ctk.CTkRadioButton(artists_frame, text=artist_name, variable=artist_var, value=str(new_id)).pack(anchor="w", pady=5)
                         artist_var.set(str(new_id))
                     except Exception as e:
                         messagebox.showerror("Error", f"Could not add artist: {e}")
+                    finally:
+                        connection.close()
         
         ctk.CTkButton(artist_select, text="+ Add New Artist", command=add_new_artist).pack(pady=5)
         
@@ -888,32 +620,28 @@ def handle_upload_song():
 def open_home_page():
     """Open the home page"""
     try:
-        subprocess.Popen(["python", "home.py"])
-        root.destroy()
+        router.show_page("home")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open home page: {e}")
 
 def open_search_page():
     """Open the search page"""
     try:
-        subprocess.Popen(["python", "search.py"])
-        root.destroy()
+        router.show_page("search")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open search page: {e}")
 
 def open_playlist_page():
     """Open the playlist page"""
     try:
-        subprocess.Popen(["python", "playlist.py"])
-        root.destroy()
+        router.show_page("playlist")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open playlist page: {e}")
 
 def open_recommend_page():
     """Open the recommendations page"""
     try:
-        subprocess.Popen(["python", "recommend.py"])
-        root.destroy()
+        router.show_page("recommend")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open recommendations page: {e}")
 
@@ -921,15 +649,13 @@ def open_login_page():
     """Logout and open the login page"""
     try:
         # Stop any playing music
-        if mixer.music.get_busy():
-            mixer.music.stop()
+        player.stop()
             
         # Remove current user file
         if os.path.exists("current_user.txt"):
             os.remove("current_user.txt")
             
-        subprocess.Popen(["python", "login.py"])
-        root.destroy()
+        router.show_page("login", reset=True)
     except Exception as e:
         messagebox.showerror("Error", f"Unable to logout: {e}")
 
@@ -948,6 +674,10 @@ def select_song_for_download(song_id, title, artist, song_frame):
     selected_song["id"] = song_id
     selected_song["title"] = title
     selected_song["artist"] = artist
+    
+    # Recycled popular rows derive their highlight from the selection
+    if popular_list:
+        popular_list.refresh()
 
 def refresh_song_list():
     """Refresh the song list"""
@@ -984,6 +714,9 @@ def display_favorite_songs_tab():
         no_songs_label.pack(pady=30)
         return
     
+    # Playing one queues the rest of the list
+    favorite_song_ids = [song['song_id'] for song in favorite_songs]
+    
     # Create song frames for each song
     for song in favorite_songs:
         song_frame = ctk.CTkFrame(favorite_tab, fg_color="#1A1A2E", corner_radius=10, height=50)
@@ -1020,7 +753,7 @@ def display_favorite_songs_tab():
             fg_color="#1E293B",
             hover_color="#2A3749",
             width=30, height=30,
-            command=lambda sid=song['song_id']: play_song(sid)
+            command=lambda sid=song['song_id']: play_song(sid, favorite_song_ids)
         )
         play_btn.pack(side="right", padx=5)
         
@@ -1051,10 +784,15 @@ def download_selected_song():
     download_song(selected_song["id"])
 def display_popular_songs_tab():
     """Display the popular songs tab"""
-    global song_frames
+    global popular_list
+    
+    # Clear the previous list when refreshing
+    for widget in popular_tab.winfo_children():
+        widget.destroy()
+    popular_list = None
     
-    # Get popular songs
-    popular_songs = get_popular_songs()
+    # Get the first page of popular songs
+    popular_songs = get_popular_songs(song_list.PAGE_SIZE)
     
     if not popular_songs:
         no_songs_label = ctk.CTkLabel(
@@ -1066,80 +804,97 @@ def display_popular_songs_tab():
         no_songs_label.pack(pady=30)
         return
     
-    # Create song frames for each song
-    for song in popular_songs:
-        song_frame = ctk.CTkFrame(popular_tab, fg_color="#1A1A2E", corner_radius=10, height=50)
-        song_frame.pack(fill="x", pady=5, ipady=5)
-        
-        # Prevent frame from resizing
-        song_frame.pack_propagate(False)
-        
-        # Song icon and title - left side
-        song_icon = "🎵"
-        song_label = ctk.CTkLabel(
-            song_frame, 
-            text=f"{song_icon} {song['artist_name']} - {song['title']}", 
-            font=("Arial", 14), 
-            text_color="white",
-            anchor="w"
-        )
-        song_label.pack(side="left", padx=20)
-        
-        file_info = ctk.CTkLabel(
-            song_frame, 
-            text=f"{song['file_size_formatted']} ({song['file_type']})", 
-            font=("Arial", 12), 
-            text_color="#A0A0A0"
-        )
-        file_info.pack(side="right", padx=(0, 20))
-        
-        # Play button - right side
-        play_btn = ctk.CTkButton(
-            song_frame, 
-            text="▶️", 
-            font=("Arial", 14), 
-            fg_color="#1E293B",
-            hover_color="#2A3749",
-            width=30, height=30,
-            command=lambda sid=song['song_id']: play_song(sid)
-        )
-        play_btn.pack(side="right", padx=5)
-        
-        # Make frame selectable
-        song_frame.bind(
-            "<Button-1>", 
-            lambda e, sid=song['song_id'], title=song['title'], artist=song['artist_name'], frame=song_frame: 
-                select_song_for_download(sid, title, artist, frame)
-        )
-        song_label.bind(
-            "<Button-1>", 
-            lambda e, sid=song['song_id'], title=song['title'], artist=song['artist_name'], frame=song_frame: 
-                select_song_for_download(sid, title, artist, frame)
-        )
-        
-        # Add to list of song frames
-        song_frames.append(song_frame)
+    # Only the visible rows get widgets; more songs load as the user scrolls
+    popular_list = song_list.SongList(
+        popular_tab, create_popular_song_row, update_popular_song_row, songs=popular_songs,
+        fetch_page=lambda last_song, limit: get_popular_songs(limit, last_song),
+        row_height=60
+    )
+    popular_list.pack(fill="both", expand=True)
+
+def create_popular_song_row(parent):
+    """Create a reusable row for the popular songs list"""
+    song_frame = ctk.CTkFrame(parent, fg_color="#1A1A2E", corner_radius=10, height=50)
+    row = {"frame": song_frame}
+    
+    # Prevent frame from resizing
+    song_frame.pack_propagate(False)
+    
+    # Song icon and title - left side
+    song_label = ctk.CTkLabel(
+        song_frame, 
+        text="", 
+        font=("Arial", 14), 
+        text_color="white",
+        anchor="w"
+    )
+    song_label.pack(side="left", padx=20)
+    
+    file_info = ctk.CTkLabel(
+        song_frame, 
+        text="", 
+        font=("Arial", 12), 
+        text_color="#A0A0A0"
+    )
+    file_info.pack(side="right", padx=(0, 20))
+    
+    # Play button - right side; rows are recycled, so look the song up when clicked
+    play_btn = ctk.CTkButton(
+        song_frame, 
+        text="▶️", 
+        font=("Arial", 14), 
+        fg_color="#1E293B",
+        hover_color="#2A3749",
+        width=30, height=30,
+        command=lambda: play_song(row["song"]['song_id'], popular_list) if row["song"] else None
+    )
+    play_btn.pack(side="right", padx=5)
+    
+    # Make frame selectable
+    def select_row(event):
+        song = row["song"]
+        if song:
+            select_song_for_download(song['song_id'], song['title'], song['artist_name'], song_frame)
+    
+    song_frame.bind("<Button-1>", select_row)
+    song_label.bind("<Button-1>", select_row)
+    
+    row["label"] = song_label
+    row["file_info"] = file_info
+    return row
+
+def update_popular_song_row(row, song, index):
+    """Show a song in a recycled popular songs row"""
+    row["label"].configure(text=f"🎵 {song['artist_name']} - {song['title']}")
+    row["file_info"].configure(text=f"{song['file_size_formatted']} ({song['file_type']})")
+    
+    # Highlight follows the selected song, not the recycled frame
+    selected = song['song_id'] == selected_song["id"]
+    row["frame"].configure(fg_color="#2A2A4E" if selected else "#1A1A2E")
 
 # ------------------- Initialize App -------------------
-try:
+WINDOW_TITLE = "Online Music System - Download Songs"
+WINDOW_SIZE = "1000x600"
+
+def on_show():
+    """Refresh the player controls when returning to this page"""
+    player.sync_controls(now_playing_label, play_btn)
+
+def build_page(parent):
+    """Build the download page inside the app shell"""
+    global root, title_label, now_playing_label, play_btn, favorite_songs_frame, subtitle_label, tabs, favorite_tab, popular_tab, song_frames, button_frame
+
     # Get current user info
     user = get_current_user()
     if not user:
         # Redirect to login if not logged in
         open_login_page()
-        exit()
-
-    # ---------------- Initialize App ----------------
-    ctk.set_appearance_mode("dark")  # Dark mode
-    ctk.set_default_color_theme("blue")  # Default theme
+        return False
 
-    root = ctk.CTk()
-    root.title("Online Music System - Download Songs")
-    root.geometry("1000x600")  # Adjusted to match the image proportions
-    root.resizable(False, False)
+    root = router.root
 
     # ---------------- Main Frame ----------------
-    main_frame = ctk.CTkFrame(root, fg_color="#1E1E2E", corner_radius=15)
+    main_frame = ctk.CTkFrame(parent, fg_color="#1E1E2E", corner_radius=15)
     main_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
     # ---------------- Sidebar Navigation ----------------
@@ -1279,14 +1034,8 @@ try:
                                  command=handle_upload_song)
     upload_button.pack(side="left", padx=10)
 
-    # ---------------- Run Application ----------------
-    root.mainloop()
-    
-except Exception as e:
-    import traceback
-    print(f"Error in download.py: {e}")
-    traceback.print_exc()
-    messagebox.showerror("Error", f"An error occurred: {e}")
-    input("Press Enter to exit...")  # This keeps console open size and type - right side
-        
+    return True
 
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    router.run("download")
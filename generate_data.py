@@ -0,0 +1,411 @@
+import argparse
+import datetime
+import hashlib
+import io
+import os
+import tempfile
+import time
+import wave
+
+import mysql.connector
+import numpy as np
+
+import audio_objects
+import audio_store
+import db
+import play_counts
+
+# ------------------- Generator Settings -------------------
+# Builds a synthetic library at load-testing scale on top of the schema
+# main.py creates. Everything is drawn from one seed, and each phase gets
+# its own random stream, so the same seed and sizes always give the same
+# rows, and e.g. more plays do not change the catalogue.
+#
+# Song popularity is Zipf-distributed, songs per artist follow a power
+# law, and each user mostly plays within one favourite genre so the
+# recommender has co-listening structure to find. History is written in
+# chronological batches, either as multi-row INSERTs or via LOAD DATA.
+DEFAULT_SEED = 42
+DEFAULT_USERS = 10_000
+DEFAULT_ARTISTS = 5_000
+DEFAULT_SONGS = 100_000
+DEFAULT_PLAYS = 1_000_000
+DEFAULT_PLAYLISTS_PER_USER = 2.0  # Mean; the actual count per user is Poisson
+DEFAULT_DAYS = 365  # History spans this many days up to --end (default now)
+BATCH_SIZE = 10_000  # Rows per INSERT batch and per transaction
+
+SONG_EXPONENT = 1.1  # Zipf exponent of song popularity
+ARTIST_EXPONENT = 1.0  # Zipf exponent of songs per artist
+USER_EXPONENT = 0.8  # Zipf exponent of plays per user
+TASTE_SHARE = 0.7  # Share of a user's plays drawn from their favourite genre
+ALBUM_SIZE = 10  # Songs per album
+PLAYLIST_SONGS = (5, 30)  # Smallest and largest playlist
+PASSWORD = "password"  # Every generated user logs in with this
+
+GENRES = ["Pop", "Rock", "Hip Hop", "R&B", "Electronic", "Jazz", "Classical", "Country", "Metal", "Folk"]
+
+FIRST_NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn",
+               "Robin", "Drew", "Kai", "Noor", "Mika", "Ari", "Sasha", "Lee", "Rowan", "Emery"]
+LAST_NAMES = ["Smith", "Garcia", "Chen", "Patel", "Okafor", "Novak", "Silva", "Kim", "Müller", "Rossi",
+              "Haddad", "Nguyen", "Larsen", "Dubois", "Ivanova", "Tanaka", "Moreno", "Kowalski", "Byrne", "Ali"]
+ADJECTIVES = ["Midnight", "Golden", "Electric", "Silent", "Broken", "Velvet", "Neon", "Wild", "Lonely", "Burning",
+              "Crystal", "Faded", "Hollow", "Restless", "Scarlet", "Endless", "Paper", "Northern", "Frozen", "Sweet"]
+NOUNS = ["Heart", "River", "City", "Dream", "Echo", "Fire", "Highway", "Moon", "Ocean", "Shadow",
+         "Summer", "Thunder", "Garden", "Signal", "Mirror", "Horizon", "Static", "Harbor", "Season", "Wire"]
+
+# ------------------- Helpers -------------------
+def _connect(local_infile=False):
+    """Open a dedicated connection, so session settings never leak into the pool"""
+    return mysql.connector.connect(allow_local_infile=local_infile, **db.DB_CONFIG)
+
+def _streams(seed, count):
+    """Get independent random generators for each phase from one seed"""
+    return [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(count)]
+
+def _zipf_cdf(count, exponent):
+    """Get the cumulative distribution of a Zipf law over ranks 0..count-1"""
+    weights = 1.0 / np.arange(1, count + 1, dtype=np.float64) ** exponent
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+def _sample(rng, cdf, size):
+    """Draw ranks from a cumulative distribution"""
+    ranks = np.searchsorted(cdf, rng.random(size), side="right")
+    return np.minimum(ranks, len(cdf) - 1)
+
+def _max_id(cursor, table, id_column):
+    """Get the highest ID in a table, or 0 when it is empty"""
+    cursor.execute(f"SELECT COALESCE(MAX({id_column}), 0) FROM {table}")
+    return cursor.fetchone()[0]
+
+def _new_ids(cursor, table, id_column, after):
+    """Get the IDs inserted after a previous _max_id(), in insertion order"""
+    cursor.execute(f"SELECT {id_column} FROM {table} WHERE {id_column} > %s ORDER BY {id_column}", (after,))
+    return np.array([row[0] for row in cursor.fetchall()], dtype=np.int64)
+
+def _insert_batches(connection, query, rows, batch_size, label):
+    """Insert rows with executemany, one transaction per batch"""
+    cursor = connection.cursor()
+    try:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(query, rows[start:start + batch_size])
+            connection.commit()
+    except mysql.connector.Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    print(f"Added {len(rows)} {label}.")
+
+def _names(rng, first_words, second_words, count):
+    """Combine two word lists into count names, numbering repeats so names stay distinct"""
+    firsts = rng.integers(len(first_words), size=count)
+    seconds = rng.integers(len(second_words), size=count)
+
+    seen = {}
+    names = []
+    for a, b in zip(firsts.tolist(), seconds.tolist()):
+        name = f"{first_words[a]} {second_words[b]}"
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name} {seen[name]}")
+    return names
+
+def _placeholder_audio():
+    """Create one second of silence that every generated song shares"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(1)
+        wav.setframerate(8000)
+        wav.writeframes(bytes([128]) * 8000)
+    return buffer.getvalue()
+
+# ------------------- Users -------------------
+def generate_users(connection, rng, count, seed, batch_size):
+    """Add users, returning their IDs"""
+    cursor = connection.cursor()
+
+    # Emails carry the seed, so a second run with the same seed is caught here
+    first_email = f"user0.s{seed}@loadtest.local"
+    cursor.execute("SELECT COUNT(*) FROM Users WHERE email = %s", (first_email,))
+    if cursor.fetchone()[0]:
+        cursor.close()
+        raise ValueError(f"Data for seed {seed} was already generated in this database")
+
+    password = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    firsts = rng.integers(len(FIRST_NAMES), size=count).tolist()
+    lasts = rng.integers(len(LAST_NAMES), size=count).tolist()
+    rows = [(FIRST_NAMES[firsts[i]], LAST_NAMES[lasts[i]], f"user{i}.s{seed}@loadtest.local", password, False)
+            for i in range(count)]
+
+    after = _max_id(cursor, "Users", "user_id")
+    _insert_batches(
+        connection,
+        "INSERT INTO Users (first_name, last_name, email, password, is_admin) VALUES (%s, %s, %s, %s, %s)",
+        rows, batch_size, "users"
+    )
+    user_ids = _new_ids(cursor, "Users", "user_id", after)
+    cursor.close()
+    return user_ids
+
+# ------------------- Catalogue -------------------
+def _genre_ids(connection):
+    """Make sure the standard genres exist, returning their IDs"""
+    cursor = connection.cursor()
+    cursor.executemany("INSERT IGNORE INTO Genres (name) VALUES (%s)", [(name,) for name in GENRES])
+    connection.commit()
+
+    cursor.execute(f"SELECT genre_id FROM Genres WHERE name IN ({', '.join(['%s'] * len(GENRES))}) ORDER BY genre_id",
+                   GENRES)
+    genre_ids = np.array([row[0] for row in cursor.fetchall()], dtype=np.int64)
+    cursor.close()
+    return genre_ids
+
+def generate_catalogue(connection, rng, artist_count, song_count, batch_size):
+    """Add artists, albums and songs
+
+    Returns a dict with song_ids in popularity order (most played first)
+    and song_genres, the genre index of each of those songs.
+    """
+    cursor = connection.cursor()
+    genre_ids = _genre_ids(connection)
+
+    # Artists, each with one genre its songs share
+    artist_genres = rng.integers(len(genre_ids), size=artist_count)
+    artist_names = _names(rng, ADJECTIVES, NOUNS, artist_count)
+    after = _max_id(cursor, "Artists", "artist_id")
+    _insert_batches(connection, "INSERT INTO Artists (name) VALUES (%s)",
+                    [(name,) for name in artist_names], batch_size, "artists")
+    artist_ids = _new_ids(cursor, "Artists", "artist_id", after)
+
+    # Songs per artist follow a power law: a few artists have most songs
+    song_artists = np.sort(_sample(rng, _zipf_cdf(artist_count, ARTIST_EXPONENT), song_count))
+
+    # Each artist's songs fill albums of ALBUM_SIZE in turn
+    songs_per_artist = np.bincount(song_artists, minlength=artist_count)
+    first_song = np.concatenate(([0], np.cumsum(songs_per_artist)[:-1]))
+    track_index = np.arange(song_count) - first_song[song_artists]
+    albums_per_artist = -(-songs_per_artist // ALBUM_SIZE)
+    first_album = np.concatenate(([0], np.cumsum(albums_per_artist)[:-1]))
+    song_albums = first_album[song_artists] + track_index // ALBUM_SIZE
+
+    album_artists = np.repeat(np.arange(artist_count), albums_per_artist)
+    album_titles = _names(rng, ADJECTIVES, NOUNS, len(album_artists))
+    album_years = rng.integers(1970, datetime.date.today().year + 1, size=len(album_artists))
+    after = _max_id(cursor, "Albums", "album_id")
+    _insert_batches(
+        connection,
+        "INSERT INTO Albums (title, artist_id, release_year) VALUES (%s, %s, %s)",
+        list(zip(album_titles, artist_ids[album_artists].tolist(), album_years.tolist())),
+        batch_size, "albums"
+    )
+    album_ids = _new_ids(cursor, "Albums", "album_id", after)
+
+    # Every song points at the same stored placeholder audio
+    audio_key, file_size = audio_store.put_bytes(_placeholder_audio())
+    song_genres = artist_genres[song_artists]
+    titles = _names(rng, ADJECTIVES, NOUNS, song_count)
+    durations = np.clip(rng.normal(210, 45, size=song_count), 60, 600).astype(int)
+
+    after = _max_id(cursor, "Songs", "song_id")
+    _insert_batches(
+        connection,
+        """
+        INSERT INTO Songs (title, artist_id, album_id, genre_id, duration, audio_key, file_type, file_size)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """,
+        [(title, artist_id, album_id, genre_id, duration, audio_key, "wav", file_size)
+         for title, artist_id, album_id, genre_id, duration in zip(
+             titles,
+             artist_ids[song_artists].tolist(),
+             album_ids[song_albums].tolist(),
+             genre_ids[song_genres].tolist(),
+             durations.tolist()
+         )],
+        batch_size, "songs"
+    )
+    song_ids = _new_ids(cursor, "Songs", "song_id", after)
+
+    audio_objects.add_reference(cursor, audio_key, file_size, song_count)
+    connection.commit()
+    cursor.close()
+
+    # Popularity is unrelated to insertion order
+    popularity = rng.permutation(song_count)
+    return {
+        "song_ids": song_ids[popularity],
+        "song_genres": song_genres[popularity],
+        "genre_count": len(genre_ids)
+    }
+
+# ------------------- Playlists -------------------
+def generate_playlists(connection, rng, user_ids, catalogue, per_user, batch_size):
+    """Add Poisson(per_user) playlists per user, filled with popularity-weighted songs"""
+    cursor = connection.cursor()
+    song_ids = catalogue["song_ids"]
+    song_cdf = _zipf_cdf(len(song_ids), SONG_EXPONENT)
+
+    playlist_users = np.repeat(user_ids, rng.poisson(per_user, size=len(user_ids)))
+    names = _names(rng, ADJECTIVES, NOUNS, len(playlist_users))
+    after = _max_id(cursor, "Playlists", "playlist_id")
+    _insert_batches(
+        connection,
+        "INSERT INTO Playlists (user_id, name, description) VALUES (%s, %s, %s)",
+        [(user_id, name, "Generated playlist") for user_id, name in zip(playlist_users.tolist(), names)],
+        batch_size, "playlists"
+    )
+    playlist_ids = _new_ids(cursor, "Playlists", "playlist_id", after)
+    cursor.close()
+
+    smallest, largest = PLAYLIST_SONGS
+    largest = min(largest, len(song_ids))
+    sizes = rng.integers(min(smallest, largest), largest + 1, size=len(playlist_ids))
+
+    rows = []
+    for playlist_id, size in zip(playlist_ids.tolist(), sizes.tolist()):
+        # Oversample, then keep the first distinct songs
+        ranks = _sample(rng, song_cdf, size * 3)
+        _, first = np.unique(ranks, return_index=True)
+        chosen = song_ids[ranks[np.sort(first)][:size]]
+        rows.extend((playlist_id, song_id, position) for position, song_id in enumerate(chosen.tolist(), 1))
+
+    _insert_batches(
+        connection,
+        "INSERT INTO Playlist_Songs (playlist_id, song_id, position) VALUES (%s, %s, %s)",
+        rows, batch_size, "playlist songs"
+    )
+
+# ------------------- Listening History -------------------
+def _write_history(connection, cursor, rows, load_data):
+    """Write one batch of (user_id, song_id, played_at) plays"""
+    if not load_data:
+        cursor.executemany("INSERT INTO Listening_History (user_id, song_id, played_at) VALUES (%s, %s, %s)", rows)
+        return
+
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.writelines(f"{user_id},{song_id},{played_at}\n" for user_id, song_id, played_at in rows)
+        cursor.execute(
+            """
+            LOAD DATA LOCAL INFILE %s INTO TABLE Listening_History
+            FIELDS TERMINATED BY ',' LINES TERMINATED BY '\\n'
+            (user_id, song_id, played_at)
+            """,
+            (path,)
+        )
+    finally:
+        os.remove(path)
+
+def generate_history(connection, rng, user_ids, catalogue, plays, days, batch_size, load_data=False, end=None):
+    """Add plays spread over the days before end, oldest first, one batch per transaction
+
+    A few users play far more than the rest, and each user draws
+    TASTE_SHARE of their plays from their favourite genre's chart.
+    """
+    song_ids, song_genres = catalogue["song_ids"], catalogue["song_genres"]
+    genre_count = catalogue["genre_count"]
+
+    # Who plays most is unrelated to user_id order
+    active_users = rng.permutation(user_ids)
+    user_cdf = _zipf_cdf(len(active_users), USER_EXPONENT)
+    user_tastes = rng.integers(genre_count, size=len(active_users))
+
+    song_cdf = _zipf_cdf(len(song_ids), SONG_EXPONENT)
+    genre_songs = [song_ids[song_genres == genre] for genre in range(genre_count)]
+    genre_cdfs = [_zipf_cdf(len(songs), SONG_EXPONENT) if len(songs) else None for songs in genre_songs]
+
+    end = end or datetime.datetime.now().replace(microsecond=0)
+    start = np.datetime64(end - datetime.timedelta(days=days), "s")
+    span = days * 24 * 60 * 60
+    batches = max(-(-plays // batch_size), 1)
+    started = time.monotonic()
+
+    cursor = connection.cursor()
+    try:
+        # Every generated ID exists, so skip the per-row foreign key lookups;
+        # this connection is not pooled, so the setting dies with it
+        cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+
+        for batch in range(batches):
+            size = min(batch_size, plays - batch * batch_size)
+            if size <= 0:
+                break
+
+            users = _sample(rng, user_cdf, size)
+            songs = song_ids[_sample(rng, song_cdf, size)]
+
+            # Swap in favourite-genre songs for most plays
+            tastes = user_tastes[users]
+            in_taste = rng.random(size) < TASTE_SHARE
+            for genre in range(genre_count):
+                if genre_cdfs[genre] is None:
+                    continue
+                chosen = np.flatnonzero(in_taste & (tastes == genre))
+                songs[chosen] = genre_songs[genre][_sample(rng, genre_cdfs[genre], len(chosen))]
+
+            # Each batch covers the next slice of the time range, in order
+            offsets = np.sort(rng.random(size))
+            seconds = ((batch + offsets) * span / batches).astype("timedelta64[s]")
+            played_at = np.datetime_as_string(start + seconds, unit="s")
+
+            rows = list(zip(active_users[users].tolist(), songs.tolist(), played_at.tolist()))
+            _write_history(connection, cursor, rows, load_data)
+            connection.commit()
+
+            done = min((batch + 1) * batch_size, plays)
+            rate = done / max(time.monotonic() - started, 1e-6)
+            print(f"Added {done}/{plays} plays ({rate:.0f} rows/s)...")
+    except mysql.connector.Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+# ------------------- Generation -------------------
+def generate(seed=DEFAULT_SEED, users=DEFAULT_USERS, artists=DEFAULT_ARTISTS, songs=DEFAULT_SONGS,
+             plays=DEFAULT_PLAYS, playlists_per_user=DEFAULT_PLAYLISTS_PER_USER, days=DEFAULT_DAYS,
+             batch_size=BATCH_SIZE, load_data=False, end=None):
+    """Generate a full synthetic dataset into the database created by main.py"""
+    db.require_mysql("generate_data.py")  # Bulk loads go straight to the server
+    user_rng, catalogue_rng, playlist_rng, history_rng = _streams(seed, 4)
+    started = time.monotonic()
+
+    connection = _connect(local_infile=load_data)
+    try:
+        user_ids = generate_users(connection, user_rng, users, seed, batch_size)
+        catalogue = generate_catalogue(connection, catalogue_rng, artists, songs, batch_size)
+        generate_playlists(connection, playlist_rng, user_ids, catalogue, playlists_per_user, batch_size)
+        generate_history(connection, history_rng, user_ids, catalogue, plays, days, batch_size, load_data, end)
+    finally:
+        connection.close()
+
+    # Derived tables are rebuilt from the new history in one pass
+    print("Rebuilding play counts...")
+    play_counts.rebuild()
+
+    print(f"Done in {time.monotonic() - started:.1f}s. Run recommender.py to rebuild the recommendation model.")
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic dataset for load testing")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="random seed; the same seed gives the same data")
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS, help="number of users")
+    parser.add_argument("--artists", type=int, default=DEFAULT_ARTISTS, help="number of artists")
+    parser.add_argument("--songs", type=int, default=DEFAULT_SONGS, help="number of songs")
+    parser.add_argument("--plays", type=int, default=DEFAULT_PLAYS, help="listening history rows")
+    parser.add_argument("--playlists-per-user", type=float, default=DEFAULT_PLAYLISTS_PER_USER,
+                        help="mean playlists per user")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="days of history before --end")
+    parser.add_argument("--end", type=datetime.datetime.fromisoformat, default=None,
+                        help="end of the history as YYYY-MM-DD[ HH:MM:SS] (default now); fix it for identical timestamps")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per insert batch")
+    parser.add_argument("--load-data", action="store_true",
+                        help="load history with LOAD DATA LOCAL INFILE (needs local_infile on the server)")
+    args = parser.parse_args()
+
+    try:
+        generate(args.seed, args.users, args.artists, args.songs, args.plays,
+                 args.playlists_per_user, args.days, args.batch_size, args.load_data, args.end)
+    except (mysql.connector.Error, ValueError) as err:
+        print(f"Error generating data: {err}")
@@ -0,0 +1,273 @@
+import argparse
+import datetime
+import gzip
+import os
+import tempfile
+
+import mysql.connector
+
+import db
+
+# ------------------- Retention Settings -------------------
+# Listening_History is range-partitioned by month of played_at (one
+# partition per month, pYYYYMM, plus pmax for anything later). Raw plays
+# are kept for KEEP_MONTHS; older months are rolled up into
+# Listening_History_Daily, one row per user, song and day, written to a
+# gzipped CSV in ARCHIVE_DIR, and then the whole partition is dropped,
+# which costs the same however many rows it held.
+#
+# Each step can be repeated: the archive file only appears once complete,
+# the rollup overwrites rather than adds, and the partition is dropped
+# last, so a job interrupted anywhere is finished by the next run.
+KEEP_MONTHS = 6
+PARTITIONS_AHEAD = 3  # Empty future months kept ready so pmax stays empty
+ARCHIVE_DIR = "history_archive"
+ARCHIVE_BATCH = 10_000  # Rows fetched at a time while archiving
+
+# ------------------- Months -------------------
+def _month_start(day):
+    """Get the first day of a date's month"""
+    return datetime.date(day.year, day.month, 1)
+
+def _add_months(month, count):
+    """Move a first-of-month date by count months"""
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+def _partition_name(month):
+    """Get the partition name holding a month's plays"""
+    return f"p{month:%Y%m}"
+
+def _partition_definition(month):
+    """Get the DDL for one month's partition"""
+    return (f"PARTITION {_partition_name(month)} "
+            f"VALUES LESS THAN (UNIX_TIMESTAMP('{_add_months(month, 1):%Y-%m-%d}'))")
+
+def _partition_month(name):
+    """Get the month a pYYYYMM partition holds, or None for pmax"""
+    if name == "pmax":
+        return None
+    return datetime.date(int(name[1:5]), int(name[5:7]), 1)
+
+# ------------------- Schema -------------------
+def create_table(cursor):
+    """Create the daily rollup table that outlives the raw partitions"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Listening_History_Daily (
+        user_id INT NOT NULL,
+        song_id INT NOT NULL,
+        play_date DATE NOT NULL,
+        plays INT NOT NULL,
+        last_played_at TIMESTAMP NULL,
+        PRIMARY KEY (user_id, song_id, play_date),
+        INDEX idx_listening_daily_song (song_id, play_date)
+    )
+    """)
+
+def partitions(cursor):
+    """Get the names of Listening_History's partitions in order, or [] if unpartitioned"""
+    cursor.execute(
+        """
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'Listening_History' AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+        """,
+        (db.DB_NAME,)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+def partition_table(cursor):
+    """Rebuild Listening_History as a monthly partitioned table
+
+    MySQL requires the partitioning column in the primary key and allows
+    no foreign keys on partitioned tables, so those are replaced: the key
+    becomes (history_id, played_at), and deleting a song removes its plays
+    in audio_objects.delete_song(). This copies the table once.
+    """
+    if partitions(cursor):
+        return
+
+    cursor.execute(
+        """
+        SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+        WHERE CONSTRAINT_SCHEMA = %s AND TABLE_NAME = 'Listening_History'
+        """,
+        (db.DB_NAME,)
+    )
+    for (constraint,) in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE Listening_History DROP FOREIGN KEY {constraint}")
+
+    cursor.execute("SELECT MIN(played_at) FROM Listening_History")
+    oldest = cursor.fetchone()[0]
+    today = datetime.date.today()
+    month = _month_start(oldest.date() if oldest else today)
+    last = _add_months(_month_start(today), PARTITIONS_AHEAD)
+
+    definitions = []
+    while month <= last:
+        definitions.append(_partition_definition(month))
+        month = _add_months(month, 1)
+    definitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+
+    print(f"Partitioning Listening_History into {len(definitions)} partitions...")
+    cursor.execute(f"""
+    ALTER TABLE Listening_History
+        MODIFY played_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        DROP PRIMARY KEY,
+        ADD PRIMARY KEY (history_id, played_at)
+    PARTITION BY RANGE (UNIX_TIMESTAMP(played_at)) (
+        {", ".join(definitions)}
+    )
+    """)
+
+def ensure_partitions(cursor, months_ahead=PARTITIONS_AHEAD):
+    """Split future months out of pmax so they exist before plays arrive
+
+    Returns the number of partitions added.
+    """
+    names = partitions(cursor)
+    months = [month for month in map(_partition_month, names) if month]
+    if not months:
+        return 0
+
+    wanted = _add_months(_month_start(datetime.date.today()), months_ahead)
+    month = _add_months(max(months), 1)
+    definitions = []
+    while month <= wanted:
+        definitions.append(_partition_definition(month))
+        month = _add_months(month, 1)
+    if not definitions:
+        return 0
+
+    cursor.execute(f"""
+    ALTER TABLE Listening_History REORGANIZE PARTITION pmax INTO (
+        {", ".join(definitions)},
+        PARTITION pmax VALUES LESS THAN MAXVALUE
+    )
+    """)
+    return len(definitions)
+
+# ------------------- Retention -------------------
+def _archive_partition(connection, name):
+    """Write one partition's raw plays to ARCHIVE_DIR/<name>.csv.gz"""
+    path = os.path.join(ARCHIVE_DIR, f"{name}.csv.gz")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=ARCHIVE_DIR, suffix=".part")
+    os.close(fd)
+    cursor = connection.cursor()
+    try:
+        with gzip.open(temp_path, "wt", newline="") as f:
+            f.write("history_id,user_id,song_id,played_at\n")
+            cursor.execute(
+                f"SELECT history_id, user_id, song_id, played_at FROM Listening_History PARTITION ({name}) "
+                f"ORDER BY history_id"
+            )
+            while True:
+                rows = cursor.fetchmany(ARCHIVE_BATCH)
+                if not rows:
+                    break
+                f.writelines(f"{history_id},{user_id},{song_id},{played_at:%Y-%m-%d %H:%M:%S}\n"
+                             for history_id, user_id, song_id, played_at in rows)
+    except Exception:
+        os.remove(temp_path)
+        raise
+    finally:
+        cursor.close()
+
+    os.replace(temp_path, path)
+    return path
+
+def _roll_up_partition(connection, name):
+    """Aggregate one partition into Listening_History_Daily"""
+    cursor = connection.cursor()
+    try:
+        # A day never spans two partitions, so its total is final
+        cursor.execute(f"""
+        INSERT INTO Listening_History_Daily (user_id, song_id, play_date, plays, last_played_at)
+        SELECT user_id, song_id, DATE(played_at), COUNT(*), MAX(played_at)
+        FROM Listening_History PARTITION ({name})
+        GROUP BY user_id, song_id, DATE(played_at)
+        ON DUPLICATE KEY UPDATE plays = VALUES(plays), last_played_at = VALUES(last_played_at)
+        """)
+        connection.commit()
+    except mysql.connector.Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def apply_retention(keep_months=KEEP_MONTHS, archive=True):
+    """Roll up, archive and drop every partition older than keep_months
+
+    Returns the names of the partitions dropped.
+    """
+    cutoff = _add_months(_month_start(datetime.date.today()), -keep_months)
+    dropped = []
+    if db.DB_BACKEND == "sqlite":
+        print("History retention needs MySQL partitions; the SQLite backend keeps every play.")
+        return dropped
+
+    with db.pooled_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            names = partitions(cursor)
+            if not names:
+                print("Listening_History is not partitioned; run migrations.py first.")
+                return dropped
+
+            for name in names:
+                month = _partition_month(name)
+                if month is None or month >= cutoff:
+                    continue
+
+                print(f"Retiring {name}...")
+                if archive:
+                    _archive_partition(connection, name)
+                _roll_up_partition(connection, name)
+                cursor.execute(f"ALTER TABLE Listening_History DROP PARTITION {name}")
+                dropped.append(name)
+
+            ensure_partitions(cursor)
+        finally:
+            cursor.close()
+
+    return dropped
+
+# ------------------- Users -------------------
+def delete_user(user_id):
+    """Delete a user and every play they made, returning True if they existed
+
+    Playlists and favourites go by cascade, but the partitioned history
+    tables have no foreign keys to cascade, so their rows are removed here.
+    """
+    with db.pooled_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("DELETE FROM Users WHERE user_id = %s", (user_id,))
+            existed = cursor.rowcount > 0
+            cursor.execute("DELETE FROM Listening_History WHERE user_id = %s", (user_id,))
+            cursor.execute("DELETE FROM Listening_History_Daily WHERE user_id = %s", (user_id,))
+            connection.commit()
+        except mysql.connector.Error:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    return existed
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll up, archive and drop old Listening_History partitions")
+    parser.add_argument("--keep-months", type=int, default=KEEP_MONTHS, help="months of raw plays to keep")
+    parser.add_argument("--no-archive", action="store_true", help="drop old plays without writing archive files")
+    args = parser.parse_args()
+
+    try:
+        dropped = apply_retention(args.keep_months, archive=not args.no_archive)
+        print(f"Retired {len(dropped)} partitions." if dropped else "No partitions to retire.")
+    except mysql.connector.Error as err:
+        print(f"Error applying history retention: {err}")
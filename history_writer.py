@@ -0,0 +1,207 @@
+import atexit
+import datetime
+import glob
+import json
+import os
+import threading
+import time
+
+import mysql.connector
+
+import play_counts
+
+# ------------------- Writer Settings -------------------
+# Plays are appended to a local journal first and written to the database
+# in batches by a background thread. The active journal is rotated into a
+# numbered segment on each flush; a segment is deleted only after its plays
+# are committed, so plays from a crash are replayed on the next start.
+# Delivery is at-least-once: a crash between commit and delete replays that
+# one segment.
+JOURNAL_DIR = os.path.join("temp", "history_journal")
+ACTIVE_JOURNAL = os.path.join(JOURNAL_DIR, "active.jsonl")
+FLUSH_SIZE = 50  # Flush once this many plays are waiting
+FLUSH_INTERVAL = 10  # ...or after this many seconds
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_lock = threading.Lock()
+_wakeup = threading.Condition(_lock)
+_flush_lock = threading.Lock()  # Only one flush writes segments at a time
+
+_journal = None  # Open handle on the active journal
+_pending = []  # Plays in the active journal, kept in memory
+_segments = {}  # Rotated segment path -> its plays, for journals this process wrote
+_worker = None
+_stopping = False
+
+# Cached logged-in user, re-read only when current_user.txt changes
+_user_cache = {"mtime": None, "user_id": None}
+
+# ------------------- Current User -------------------
+def current_user_id():
+    """Get the logged-in user's ID without re-reading the session file every play"""
+    try:
+        mtime = os.stat("current_user.txt").st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    if _user_cache["mtime"] != mtime:
+        with open("current_user.txt", "r") as f:
+            try:
+                _user_cache["user_id"] = int(f.read().strip())
+            except ValueError:
+                _user_cache["user_id"] = None  # Empty or garbled file: nobody is logged in
+        _user_cache["mtime"] = mtime
+
+    return _user_cache["user_id"]
+
+# ------------------- Journal -------------------
+def _append_to_journal(play):
+    """Durably append one play to the active journal"""
+    global _journal
+
+    if _journal is None:
+        # A journal left by an earlier run holds plays _pending never saw
+        _rotate_journal()
+        os.makedirs(JOURNAL_DIR, exist_ok=True)
+        _journal = open(ACTIVE_JOURNAL, "a")
+
+    _journal.write(json.dumps(play) + "\n")
+    _journal.flush()
+    os.fsync(_journal.fileno())
+
+def _rotate_journal():
+    """Turn the active journal into a segment waiting to be flushed"""
+    global _journal, _pending
+
+    # Only a journal this process has open matches _pending; one found on
+    # disk with none open was left by a crash and is read back by flush()
+    written_here = _journal is not None
+    if written_here:
+        _journal.close()
+        _journal = None
+
+    if not os.path.exists(ACTIVE_JOURNAL):
+        return
+
+    segment = os.path.join(JOURNAL_DIR, f"segment-{time.time_ns()}.jsonl")
+    os.replace(ACTIVE_JOURNAL, segment)
+    if written_here:
+        _segments[segment] = _pending
+        _pending = []
+
+def _read_segment(segment):
+    """Read the plays in a segment left over from an earlier run"""
+    plays = []
+    with open(segment, "r") as f:
+        for line in f:
+            try:
+                plays.append(json.loads(line))
+            except ValueError:
+                pass  # A line torn by a crash mid-write
+    return plays
+
+# ------------------- Flushing -------------------
+def flush():
+    """Write every journaled play to the database, oldest segment first"""
+    with _flush_lock:
+        with _lock:
+            _rotate_journal()
+
+        for segment in sorted(glob.glob(os.path.join(JOURNAL_DIR, "segment-*.jsonl"))):
+            plays = _segments.get(segment)
+            if plays is None:
+                plays = _read_segment(segment)
+
+            rows = [
+                (play["user_id"], play["song_id"],
+                 datetime.datetime.strptime(play["played_at"], TIME_FORMAT))
+                for play in plays
+            ]
+
+            try:
+                play_counts.record_plays(rows)
+            except mysql.connector.IntegrityError:
+                # e.g. a song deleted since it was played; drop only the bad plays
+                for row in rows:
+                    try:
+                        play_counts.record_plays([row])
+                    except mysql.connector.IntegrityError as e:
+                        print(f"Dropping listening history for song {row[1]}: {e}")
+            except mysql.connector.Error as e:
+                # Keep the segment and try again on the next flush
+                print(f"Error writing listening history: {e}")
+                return False
+
+            os.remove(segment)
+            _segments.pop(segment, None)
+
+    return True
+
+def _run():
+    """Background loop flushing on the size or time threshold"""
+    while True:
+        with _lock:
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while not _stopping and len(_pending) < FLUSH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                _wakeup.wait(remaining)
+            stopping = _stopping
+
+        try:
+            flush()
+        except Exception as e:
+            # Never let the writer die; the journal keeps the plays safe
+            print(f"Error flushing listening history: {e}")
+
+        if stopping:
+            return
+
+def start():
+    """Start the background writer, replaying plays journaled before a crash"""
+    global _worker
+
+    with _lock:
+        if _worker is not None:
+            return
+        _worker = threading.Thread(target=_run, name="history-writer", daemon=True)
+        _worker.start()
+
+    atexit.register(stop)
+
+def stop():
+    """Flush what is left and stop the background writer"""
+    global _stopping
+
+    with _lock:
+        if _worker is None:
+            return
+        _stopping = True
+        _wakeup.notify()
+
+    _worker.join(timeout=FLUSH_INTERVAL)
+
+# ------------------- Recording -------------------
+def record_play(song_id, user_id=None):
+    """Queue a play for the logged-in user; returns immediately"""
+    if user_id is None:
+        user_id = current_user_id()
+        if user_id is None:
+            return False
+
+    play = {
+        "user_id": user_id,
+        "song_id": song_id,
+        "played_at": datetime.datetime.now().strftime(TIME_FORMAT)
+    }
+
+    start()
+
+    with _lock:
+        _append_to_journal(play)
+        _pending.append(play)
+        if len(_pending) >= FLUSH_SIZE:
+            _wakeup.notify()
+
+    return True
@@ -1,7 +1,10 @@
 import customtkinter as ctk
 from tkinter import messagebox, ttk
 import mysql.connector
-import subprocess
+import db
+import catalogue
+import router
+import player
 import os
 import io
 import threading
@@ -13,26 +16,14 @@ import tempfile
 # Initialize mixer for music playback
 mixer.init()
 
-# Current song information
-current_song = {
-    "id": None,
-    "title": "No song playing",
-    "artist": "",
-    "playing": False,
-    "paused": False
-}
+# Current song information, shared with every other page
+current_song = player.current_song
 
 # ------------------- Database Functions -------------------
 def connect_db():
-    """Connect to the MySQL database"""
+    """Get a pooled connection to the MySQL database"""
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="new_password",
-            database="online_music_system"
-        )
-        return connection
+        return db.connect_db()
     except mysql.connector.Error as err:
         messagebox.showerror("Database Connection Error", 
                             f"Failed to connect to database: {err}")
@@ -72,8 +63,7 @@ def get_current_user():
         print(f"Error getting current user: {e}")
         return None
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 def get_featured_songs(limit=3):
@@ -85,14 +75,12 @@ def get_featured_songs(limit=3):
             
         cursor = connection.cursor(dictionary=True)
         
-        # Get songs with most plays in listening history
+        # Get songs with most plays, read in order from the play count index
         query = """
-        SELECT s.song_id, s.title, a.name as artist_name, COUNT(lh.history_id) as play_count 
-        FROM Songs s
-        JOIN Artists a ON s.artist_id = a.artist_id
-        LEFT JOIN Listening_History lh ON s.song_id = lh.song_id
-        GROUP BY s.song_id
-        ORDER BY play_count DESC
+        SELECT s.song_id, s.title, s.artist_id, pc.total_plays as play_count 
+        FROM Song_Play_Counts pc
+        JOIN Songs s ON pc.song_id = s.song_id
+        ORDER BY pc.total_plays DESC, pc.song_id
         LIMIT %s
         """
         
@@ -102,150 +90,32 @@ def get_featured_songs(limit=3):
         # If no songs with play history, get newest songs
         if not songs:
             query = """
-            SELECT s.song_id, s.title, a.name as artist_name 
+            SELECT s.song_id, s.title, s.artist_id 
             FROM Songs s
-            JOIN Artists a ON s.artist_id = a.artist_id
             ORDER BY s.upload_date DESC
             LIMIT %s
             """
             cursor.execute(query, (limit,))
             songs = cursor.fetchall()
             
-        return songs
+        # Artist names come from the in-memory catalogue
+        return catalogue.resolve(songs)
         
     except mysql.connector.Error as e:
         print(f"Error fetching featured songs: {e}")
         return []
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
-
-def get_song_data(song_id):
-    """Get binary song data from the database"""
-    try:
-        connection = connect_db()
-        if not connection:
-            return None
-            
-        cursor = connection.cursor()
-        
-        query = "SELECT file_data, file_type FROM Songs WHERE song_id = %s"
-        cursor.execute(query, (song_id,))
-        
-        result = cursor.fetchone()
-        if result:
-            return {'data': result[0], 'type': result[1]}
-        return None
-        
-    except mysql.connector.Error as e:
-        print(f"Error fetching song data: {e}")
-        return None
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
-
-def get_song_info(song_id):
-    """Get song information from the database"""
-    try:
-        connection = connect_db()
-        if not connection:
-            return None
-            
-        cursor = connection.cursor(dictionary=True)
-        
-        query = """
-        SELECT s.title, a.name as artist_name, s.duration, g.name as genre
-        FROM Songs s
-        JOIN Artists a ON s.artist_id = a.artist_id
-        LEFT JOIN Genres g ON s.genre_id = g.genre_id
-        WHERE s.song_id = %s
-        """
-        
-        cursor.execute(query, (song_id,))
-        return cursor.fetchone()
-        
-    except mysql.connector.Error as e:
-        print(f"Error fetching song info: {e}")
-        return None
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
-
-def record_listening_history(song_id):
-    """Record that the current user listened to a song"""
-    try:
-        # Get current user ID
-        with open("current_user.txt", "r") as f:
-            user_id = f.read().strip()
-            
-        connection = connect_db()
-        if not connection:
-            return
-            
-        cursor = connection.cursor()
-        
-        query = "INSERT INTO Listening_History (user_id, song_id) VALUES (%s, %s)"
-        cursor.execute(query, (user_id, song_id))
-        connection.commit()
-        
-    except Exception as e:
-        print(f"Error recording listening history: {e}")
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 # ------------------- Music Player Functions -------------------
-def play_song(song_id):
-    """Play a song from its binary data in the database"""
-    global current_song
-    
+def play_song(song_id, source=None):
+    """Play a song, queueing the list it was picked from after it"""
     try:
-        # Get song data from database
-        song_data = get_song_data(song_id)
-        if not song_data:
+        # The next songs are prefetched while this one plays
+        if not player.play_song(song_id, source):
             messagebox.showerror("Error", "Could not retrieve song data")
             return False
-            
-        # Get song info
-        song_info = get_song_info(song_id)
-        if not song_info:
-            messagebox.showerror("Error", "Could not retrieve song information")
-            return False
-            
-        # Create a temporary file to play the song
-        temp_dir = "temp"
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        temp_file = os.path.join(temp_dir, f"song_{song_id}.{song_data['type']}")
-        
-        # Write binary data to temp file
-        with open(temp_file, 'wb') as f:
-            f.write(song_data['data'])
-            
-        # Load and play the song
-        mixer.music.load(temp_file)
-        mixer.music.play()
-        
-        # Update current song info
-        current_song = {
-            "id": song_id,
-            "title": song_info['title'],
-            "artist": song_info['artist_name'],
-            "playing": True,
-            "paused": False
-        }
-        
-        # Update UI elements
-        now_playing_label.configure(text=f"Now Playing: {current_song['title']} - {current_song['artist']}")
-        play_btn.configure(text="⏸️")
-        
-        # Record in listening history
-        record_listening_history(song_id)
-        
         return True
         
     except Exception as e:
@@ -258,10 +128,9 @@ def toggle_play_pause():
     global current_song
     
     if current_song["id"] is None:
-        # No song is loaded, try to play first featured song
-        featured_songs = get_featured_songs(1)
+        # No song is loaded, play the featured songs from the top
         if featured_songs:
-            play_song(featured_songs[0]['song_id'])
+            play_song(featured_songs[0]['song_id'], [song['song_id'] for song in featured_songs])
     elif current_song["paused"]:
         # Resume paused song
         mixer.music.unpause()
@@ -276,45 +145,49 @@ def toggle_play_pause():
         play_btn.configure(text="▶️")
 
 def play_next_song():
-    """Play the next song in the playlist"""
-    # This is a placeholder that would be implemented with your playlist functionality
-    messagebox.showinfo("Info", "Next song feature will be implemented with playlists")
+    """Play the next song in the queue"""
+    try:
+        if not player.play_next():
+            messagebox.showinfo("Info", "There is no next song in the queue")
+    except Exception as e:
+        print(f"Error playing next song: {e}")
+        messagebox.showerror("Error", f"Could not play song: {e}")
 
 def play_previous_song():
-    """Play the previous song in the playlist"""
-    # This is a placeholder that would be implemented with your playlist functionality
-    messagebox.showinfo("Info", "Previous song feature will be implemented with playlists")
+    """Play the previous song in the queue, or restart the current one"""
+    try:
+        if not player.play_previous():
+            messagebox.showinfo("Info", "There is no previous song in the queue")
+    except Exception as e:
+        print(f"Error playing previous song: {e}")
+        messagebox.showerror("Error", f"Could not play song: {e}")
 
 # ------------------- Navigation Functions -------------------
 def open_search_page():
     """Open the search page"""
     try:
-        subprocess.Popen(["python", "search.py"])
-        root.destroy()
+        router.show_page("search")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open search page: {e}")
 
 def open_playlist_page():
     """Open the playlist page"""
     try:
-        subprocess.Popen(["python", "playlist.py"])
-        root.destroy()
+        router.show_page("playlist")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open playlist page: {e}")
 
 def open_download_page():
     """Open the download page"""
     try:
-        subprocess.Popen(["python", "download.py"])
-        root.destroy()
+        router.show_page("download")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open download page: {e}")
 
 def open_recommend_page():
     """Open the recommendations page"""
     try:
-        subprocess.Popen(["python", "recommend.py"])
-        root.destroy()
+        router.show_page("recommend")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open recommendations page: {e}")
 
@@ -322,15 +195,13 @@ def open_login_page():
     """Logout and open the login page"""
     try:
         # Stop any playing music
-        if mixer.music.get_busy():
-            mixer.music.stop()
+        player.stop()
             
         # Remove current user file
         if os.path.exists("current_user.txt"):
             os.remove("current_user.txt")
             
-        subprocess.Popen(["python", "login.py"])
-        root.destroy()
+        router.show_page("login", reset=True)
     except Exception as e:
         messagebox.showerror("Error", f"Unable to logout: {e}")
 
@@ -359,31 +230,34 @@ def create_song_card(parent, song_id, title, artist):
     play_song_btn = ctk.CTkButton(song_card, text="▶️ Play", 
                                 font=("Arial", 12, "bold"),
                                 fg_color="#B146EC", hover_color="#9333EA",
-                                command=lambda: play_song(song_id))
+                                command=lambda: play_song(song_id, [song["song_id"] for song in featured_songs]))
     play_song_btn.pack(pady=(15, 0))
     
     return song_card
 
 # ------------------- Initialize App -------------------
-try:
+WINDOW_TITLE = "Online Music System - Home"
+WINDOW_SIZE = "1000x600"
+
+def on_show():
+    """Refresh the player controls when returning to this page"""
+    player.sync_controls(now_playing_label, play_btn)
+
+def build_page(parent):
+    """Build the home page inside the app shell"""
+    global root, now_playing_label, play_btn, featured_songs
+
     # Get current user info
     user = get_current_user()
     if not user:
         # Redirect to login if not logged in
         open_login_page()
-        exit()
-
-    # ---------------- Initialize App ----------------
-    ctk.set_appearance_mode("dark")  # Dark mode
-    ctk.set_default_color_theme("blue")  # Default theme
+        return False
 
-    root = ctk.CTk()
-    root.title("Online Music System - Home")
-    root.geometry("1000x600")  # Adjusted to match the image proportions
-    root.resizable(False, False)
+    root = router.root
 
     # ---------------- Main Frame ----------------
-    main_frame = ctk.CTkFrame(root, fg_color="#1E1E2E", corner_radius=15)
+    main_frame = ctk.CTkFrame(parent, fg_color="#1E1E2E", corner_radius=15)
     main_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
     # ---------------- Sidebar Navigation ----------------
@@ -547,12 +421,8 @@ try:
         )
         song_card.pack(side="left", padx=10)
 
-    # ---------------- Run Application ----------------
-    root.mainloop()
-    
-except Exception as e:
-    import traceback
-    print(f"Error in home.py: {e}")
-    traceback.print_exc()
-    messagebox.showerror("Error", f"An error occurred: {e}")
-    input("Press Enter to exit...")  # This keeps console open
\ No newline at end of file
+    return True
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    router.run("home")
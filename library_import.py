@@ -0,0 +1,238 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import mysql.connector
+
+import audio_objects
+import db
+import search_index
+import song_audio
+
+# ------------------- Import Settings -------------------
+# Files are probed, hashed and copied into the audio store by a pool of
+# worker processes; the parent only talks to the database, one batch of
+# songs at a time.
+AUDIO_EXTENSIONS = {".mp3", ".flac", ".wav"}
+BATCH_SIZE = 500  # Songs resolved and inserted per transaction
+WORKER_CHUNK_SIZE = 8  # Files handed to a worker at a time
+UNKNOWN_ARTIST = "Unknown Artist"
+
+# Column widths in the schema, so long tags are cut rather than rejected
+TITLE_LENGTH = 100
+ARTIST_LENGTH = 100
+GENRE_LENGTH = 50
+
+# ------------------- Scanning -------------------
+def find_audio_files(directory):
+    """Yield every MP3, FLAC and WAV file under a directory, in a stable order"""
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in AUDIO_EXTENSIONS:
+                yield os.path.join(dirpath, filename)
+
+def ingest(file_path):
+    """Worker: copy one file into the audio store and read its metadata"""
+    try:
+        song = song_audio.ingest_file(file_path)
+    except Exception as e:
+        return {"path": file_path, "error": str(e)}
+
+    tags = song.pop("tags")
+    default_title = os.path.splitext(os.path.basename(file_path))[0]
+
+    song["path"] = file_path
+    song["title"] = (tags.get("title") or default_title)[:TITLE_LENGTH]
+    song["artist"] = (tags.get("artist") or UNKNOWN_ARTIST)[:ARTIST_LENGTH]
+    song["album"] = (tags.get("album") or "")[:TITLE_LENGTH] or None
+    song["genre"] = (tags.get("genre") or "")[:GENRE_LENGTH] or None
+    return song
+
+# ------------------- Lookups -------------------
+def _placeholders(values):
+    """Get a %s list for an IN clause"""
+    return ", ".join(["%s"] * len(values))
+
+def _existing_audio_keys(cursor, audio_keys):
+    """Get the audio keys that already belong to a song"""
+    audio_keys = list(audio_keys)
+    if not audio_keys:
+        return set()
+
+    cursor.execute(
+        f"SELECT DISTINCT audio_key FROM Songs WHERE audio_key IN ({_placeholders(audio_keys)})",
+        audio_keys
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+def _resolve_names(cursor, table, id_column, names, cache):
+    """Map names to IDs in Artists or Genres, creating missing rows in one statement
+
+    cache is keyed by folded name, matching the case and accent insensitive
+    comparison MySQL uses, so 'Beyoncé' and 'beyonce' share a row.
+    """
+    missing = {}
+    for name in names:
+        key = search_index.fold(name)
+        if key not in cache:
+            missing.setdefault(key, name)
+    if not missing:
+        return
+
+    def load():
+        cursor.execute(
+            f"SELECT {id_column}, name FROM {table} WHERE name IN ({_placeholders(missing)}) ORDER BY {id_column}",
+            list(missing.values())
+        )
+        for row_id, name in cursor.fetchall():
+            cache.setdefault(search_index.fold(name), row_id)
+
+    load()
+    new_names = [name for key, name in missing.items() if key not in cache]
+    if new_names:
+        cursor.executemany(f"INSERT INTO {table} (name) VALUES (%s)", [(name,) for name in new_names])
+        load()
+
+def _resolve_albums(cursor, albums, cache):
+    """Map (album title, artist_id) pairs to album IDs, creating missing albums"""
+    missing = {}
+    for title, artist_id in albums:
+        key = (search_index.fold(title), artist_id)
+        if key not in cache:
+            missing.setdefault(key, (title, artist_id))
+    if not missing:
+        return
+
+    def load():
+        titles = list({title for title, artist_id in missing.values()})
+        cursor.execute(
+            f"SELECT album_id, title, artist_id FROM Albums WHERE title IN ({_placeholders(titles)}) ORDER BY album_id",
+            titles
+        )
+        for album_id, title, artist_id in cursor.fetchall():
+            cache.setdefault((search_index.fold(title), artist_id), album_id)
+
+    load()
+    new_albums = [album for key, album in missing.items() if key not in cache]
+    if new_albums:
+        cursor.executemany("INSERT INTO Albums (title, artist_id) VALUES (%s, %s)", new_albums)
+        load()
+
+# ------------------- Inserting -------------------
+def insert_batch(connection, songs, caches):
+    """Insert a batch of probed songs, skipping audio already in the library
+
+    Returns the number of songs inserted.
+    """
+    cursor = connection.cursor()
+    try:
+        existing = _existing_audio_keys(cursor, {song["audio_key"] for song in songs})
+
+        new_songs = []
+        for song in songs:
+            if song["audio_key"] in existing:
+                continue
+            existing.add(song["audio_key"])  # Duplicates within the batch too
+            new_songs.append(song)
+        if not new_songs:
+            return 0
+
+        artists, genres = caches["artists"], caches["genres"]
+        _resolve_names(cursor, "Artists", "artist_id", {song["artist"] for song in new_songs}, artists)
+        _resolve_names(cursor, "Genres", "genre_id", {song["genre"] for song in new_songs if song["genre"]}, genres)
+        _resolve_albums(
+            cursor,
+            {(song["album"], artists[search_index.fold(song["artist"])]) for song in new_songs if song["album"]},
+            caches["albums"]
+        )
+
+        rows = []
+        for song in new_songs:
+            artist_id = artists[search_index.fold(song["artist"])]
+            album_id = caches["albums"][(search_index.fold(song["album"]), artist_id)] if song["album"] else None
+            genre_id = genres[search_index.fold(song["genre"])] if song["genre"] else None
+            rows.append((song["title"], artist_id, album_id, genre_id, song["duration"],
+                         song["audio_key"], song["file_type"], song["file_size"]))
+
+        # executemany sends this as one multi-row INSERT
+        cursor.executemany(
+            """
+            INSERT INTO Songs (title, artist_id, album_id, genre_id, duration, audio_key, file_type, file_size)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            rows
+        )
+
+        # new_songs holds each audio key once, so each is one more reference
+        audio_objects.add_references(cursor, [(song["audio_key"], song["file_size"], 1) for song in new_songs])
+        connection.commit()
+        return len(rows)
+
+    except mysql.connector.Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def import_library(directory, workers=None, batch_size=BATCH_SIZE, progress=None):
+    """Import every audio file under a directory into the library
+
+    progress(done, total, imported) is called after each batch, or a line
+    is printed when no callback is given. Returns a dict of counts.
+    """
+    files = list(find_audio_files(directory))
+    total = len(files)
+    counts = {"files": total, "imported": 0, "duplicates": 0, "failed": 0}
+    caches = {"artists": {}, "genres": {}, "albums": {}}
+    started = time.monotonic()
+
+    def report(done):
+        if progress is not None:
+            progress(done, total, counts["imported"])
+        else:
+            rate = done / max(time.monotonic() - started, 1e-6)
+            print(f"Processed {done}/{total} files, imported {counts['imported']} ({rate:.0f} files/s)...")
+
+    with db.pooled_connection() as connection, ProcessPoolExecutor(max_workers=workers) as pool:
+        batch = []
+        done = 0
+
+        def flush():
+            inserted = insert_batch(connection, batch, caches)
+            counts["imported"] += inserted
+            counts["duplicates"] += len(batch) - inserted
+            batch.clear()
+            report(done)
+
+        for song in pool.map(ingest, files, chunksize=WORKER_CHUNK_SIZE):
+            done += 1
+            if "error" in song:
+                counts["failed"] += 1
+                print(f"Skipping {song['path']}: {song['error']}")
+                continue
+
+            batch.append(song)
+            if len(batch) >= batch_size:
+                flush()
+
+        if batch:
+            flush()
+
+    print(f"Done. Imported {counts['imported']} of {total} files "
+          f"({counts['duplicates']} duplicates, {counts['failed']} failed).")
+    return counts
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a directory tree of MP3, FLAC and WAV files into the library")
+    parser.add_argument("directory", help="folder to scan recursively")
+    parser.add_argument("--workers", type=int, default=None, help="probe processes (default: one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="songs inserted per transaction")
+    args = parser.parse_args()
+
+    try:
+        import_library(args.directory, args.workers, args.batch_size)
+    except mysql.connector.Error as err:
+        print(f"Error importing library: {err}")
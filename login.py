@@ -1,28 +1,19 @@
 import customtkinter as ctk
 from tkinter import messagebox
-import subprocess  # To open signup.py and home.py
 import mysql.connector
+import db
+import router
 import hashlib
 import os
 
-# Initialize CustomTkinter
-ctk.set_appearance_mode("dark")
-ctk.set_default_color_theme("blue")
-
 # ------------------- Database Functions -------------------
 def connect_db():
-    """Connect to the MySQL database"""
+    """Get a pooled connection to the MySQL database"""
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="new_password",
-            database="online_music_system"
-        )
-        return connection
+        return db.connect_db()
     except mysql.connector.Error as err:
         messagebox.showerror("Database Connection Error", 
-                             f"Failed to connect to database: {err}")
+                            f"Failed to connect to database: {err}")
         return None
 
 def hash_password(password):
@@ -66,7 +57,6 @@ def login_user():
             with open("current_user.txt", "w") as f:
                 f.write(str(user_id))
                 
-            root.destroy()
             open_home_page()
         else:
             messagebox.showerror("Login Failed", "Invalid Email or Password.")
@@ -74,39 +64,41 @@ def login_user():
     except mysql.connector.Error as err:
         messagebox.showerror("Database Error", str(err))
     finally:
-        if 'connection' in locals() and connection is not None and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 # ------------------- Navigation Functions -------------------
 def open_home_page():
     """Open the home page after successful login"""
     try:
-        subprocess.Popen(["python", "home.py"])
+        router.show_page("home", reset=True)
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open home page: {e}")
 
 def open_signup_page():
     """Open the signup page"""
     try:
-        subprocess.Popen(["python", "signup.py"])
-        root.destroy()  # Close current window
+        router.show_page("signup")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open signup page: {e}")
 
 # ---------------- Main Application Window ----------------
-try:
+WINDOW_TITLE = "Online Music System - Login"
+WINDOW_SIZE = "700x500"
+
+def on_show():
+    """Clear the password field when the page is shown again"""
+    password_entry.delete(0, "end")
+
+def build_page(parent):
+    """Build the login page inside the app shell"""
+    global email_entry, password_entry
+
     # Create temp directory for temporary files if it doesn't exist
     os.makedirs("temp", exist_ok=True)
     
-    # Main window with adjusted proportions
-    root = ctk.CTk()
-    root.title("Online Music System - Login")
-    root.geometry("700x500")
-    root.resizable(False, False)
-
     # Main Frame with rounded corners
-    main_frame = ctk.CTkFrame(root, corner_radius=20)
+    main_frame = ctk.CTkFrame(parent, corner_radius=20)
     main_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
     # Left Side - Branding (adjusted color to match image)
@@ -227,11 +219,8 @@ try:
     signup_label.pack(side="left")
     signup_label.bind("<Button-1>", lambda e: open_signup_page())
 
-    # Start the main loop
-    root.mainloop()
+    return True
 
-except Exception as e:
-    import traceback
-    print(f"Error: {e}")
-    traceback.print_exc()
-    input("Press Enter to exit...")  # This keeps the console open
\ No newline at end of file
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    router.run("login")
@@ -1,12 +1,23 @@
 import mysql.connector
+import db
+import audio_store
+import audio_objects
+import play_counts
+import history_writer
+import history_retention
+import migrations
+import recommender
+import router
+import sqlite_backend
+from migrate_audio import upgrade_songs_table
 import os
-import subprocess
 import tkinter as tk
 from tkinter import messagebox
 import customtkinter as ctk
 import hashlib
 import random
 import time
+import threading
 import shutil
 import io
 from PIL import Image
@@ -15,26 +26,15 @@ from PIL import Image
 def connect_db_server():
     """Connect to MySQL server without specifying a database"""
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="new_password"
-        )
-        return connection
+        return db.connect_db_server()
     except mysql.connector.Error as err:
         print(f"Error connecting to MySQL server: {err}")
         return None
 
 def connect_db():
-    """Connect to the specific database"""
+    """Get a pooled connection to the specific database"""
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="new_password",
-            database="online_music_system"
-        )
-        return connection
+        return db.connect_db()
     except mysql.connector.Error as err:
         print(f"Error connecting to database: {err}")
         return None
@@ -42,6 +42,13 @@ def connect_db():
 def create_database():
     """Create the database and tables"""
     try:
+        # The embedded database is created in one step, already fully migrated
+        if db.DB_BACKEND == "sqlite":
+            print("Creating SQLite database...")
+            sqlite_backend.create_schema()
+            print("Database and tables created successfully!")
+            return True
+        
         # First connect to server
         connection = connect_db_server()
         if not connection:
@@ -51,8 +58,8 @@ def create_database():
         
         # Create database
         print("Creating database...")
-        cursor.execute("CREATE DATABASE IF NOT EXISTS online_music_system")
-        cursor.execute("USE online_music_system")
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db.DB_NAME}")
+        cursor.execute(f"USE {db.DB_NAME}")
         
         # Create Users table
         print("Creating Users table...")
@@ -110,25 +117,36 @@ def create_database():
             artist_id INT,
             album_id INT,
             genre_id INT,
+            audio_key CHAR(64),
             duration INT,
-            file_data LONGBLOB NOT NULL,
+            file_data LONGBLOB,
             file_type VARCHAR(10) NOT NULL,
             file_size INT NOT NULL,
             upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (artist_id) REFERENCES Artists(artist_id) ON DELETE SET NULL,
             FOREIGN KEY (album_id) REFERENCES Albums(album_id) ON DELETE SET NULL,
+            INDEX idx_songs_audio_key (audio_key),
             FOREIGN KEY (genre_id) REFERENCES Genres(genre_id) ON DELETE SET NULL
         )
         """)
         
-        # Create Playlists table
+        # Bring Songs tables from older installs up to date
+        upgrade_songs_table(cursor)
+        
+        # Create Audio_Objects table, counting songs that already use the store
+        print("Creating Audio_Objects table...")
+        if audio_objects.create_table(cursor):
+            audio_objects.rebuild_counts(cursor)
+        
+        # Create Playlists table; featured system playlists have no owner
         print("Creating Playlists table...")
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS Playlists (
             playlist_id INT AUTO_INCREMENT PRIMARY KEY,
-            user_id INT NOT NULL,
+            user_id INT NULL,
             name VARCHAR(100) NOT NULL,
             description TEXT,
+            is_system BOOLEAN NOT NULL DEFAULT FALSE,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE CASCADE
         )
@@ -143,6 +161,7 @@ def create_database():
             position INT NOT NULL,
             added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             PRIMARY KEY (playlist_id, song_id),
+            INDEX idx_playlist_songs_position (playlist_id, position, song_id),
             FOREIGN KEY (playlist_id) REFERENCES Playlists(playlist_id) ON DELETE CASCADE,
             FOREIGN KEY (song_id) REFERENCES Songs(song_id) ON DELETE CASCADE
         )
@@ -169,15 +188,28 @@ def create_database():
             user_id INT NOT NULL,
             song_id INT NOT NULL,
             played_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_listening_history_played_at (played_at, song_id),
             FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE CASCADE,
             FOREIGN KEY (song_id) REFERENCES Songs(song_id) ON DELETE CASCADE
         )
         """)
         
+        # Create Song_Play_Counts table
+        print("Creating Song_Play_Counts table...")
+        play_counts_created = play_counts.create_table(cursor)
+        
+        # Bring indexes and later schema changes up to date
+        migrations.migrate(connection)
+        history_retention.ensure_partitions(cursor)
+        
         connection.commit()
         cursor.close()
         connection.close()
         
+        # Backfill counters from any history recorded before the table existed
+        if play_counts_created:
+            play_counts.rebuild()
+        
         print("Database and tables created successfully!")
         return True
         
@@ -204,8 +236,6 @@ def add_default_users():
         
         if user_count > 0:
             print(f"Users table already has {user_count} records. Skipping default users.")
-            cursor.close()
-            connection.close()
             return True
         
         # Default users
@@ -219,24 +249,24 @@ def add_default_users():
             ("Bob", "Williams", "bob@example.com", hash_password("password123"), False)
         ]
         
-        # Insert users
+        # Insert users; executemany sends one multi-row INSERT
         print("Adding default users...")
-        for first_name, last_name, email, password, is_admin in default_users:
-            cursor.execute(
-                "INSERT INTO Users (first_name, last_name, email, password, is_admin) VALUES (%s, %s, %s, %s, %s)",
-                (first_name, last_name, email, password, is_admin)
-            )
+        cursor.executemany(
+            "INSERT INTO Users (first_name, last_name, email, password, is_admin) VALUES (%s, %s, %s, %s, %s)",
+            default_users
+        )
         
         connection.commit()
         print(f"Added {len(default_users)} default users successfully!")
         
-        cursor.close()
-        connection.close()
         return True
         
     except mysql.connector.Error as err:
         print(f"Error adding default users: {err}")
         return False
+    finally:
+        if 'connection' in locals() and connection:
+            connection.close()
 
 def add_default_genres():
     """Add default music genres"""
@@ -253,8 +283,6 @@ def add_default_genres():
         
         if genre_count > 0:
             print(f"Genres table already has {genre_count} records. Skipping default genres.")
-            cursor.close()
-            connection.close()
             return True
         
         # Default genres
@@ -267,19 +295,19 @@ def add_default_genres():
         
         # Insert genres
         print("Adding default genres...")
-        for genre in default_genres:
-            cursor.execute("INSERT INTO Genres (name) VALUES (%s)", (genre,))
+        cursor.executemany("INSERT INTO Genres (name) VALUES (%s)", [(genre,) for genre in default_genres])
         
         connection.commit()
         print(f"Added {len(default_genres)} default genres successfully!")
         
-        cursor.close()
-        connection.close()
         return True
         
     except mysql.connector.Error as err:
         print(f"Error adding default genres: {err}")
         return False
+    finally:
+        if 'connection' in locals() and connection:
+            connection.close()
 
 def add_default_artists():
     """Add default artists"""
@@ -296,8 +324,6 @@ def add_default_artists():
         
         if artist_count > 0:
             print(f"Artists table already has {artist_count} records. Skipping default artists.")
-            cursor.close()
-            connection.close()
             return True
         
         # Default artists with bios
@@ -316,22 +342,19 @@ def add_default_artists():
         
         # Insert artists
         print("Adding default artists...")
-        for name, bio in default_artists:
-            cursor.execute(
-                "INSERT INTO Artists (name, bio) VALUES (%s, %s)",
-                (name, bio)
-            )
+        cursor.executemany("INSERT INTO Artists (name, bio) VALUES (%s, %s)", default_artists)
         
         connection.commit()
         print(f"Added {len(default_artists)} default artists successfully!")
         
-        cursor.close()
-        connection.close()
         return True
         
     except mysql.connector.Error as err:
         print(f"Error adding default artists: {err}")
         return False
+    finally:
+        if 'connection' in locals() and connection:
+            connection.close()
 
 def add_default_albums():
     """Add default albums"""
@@ -348,8 +371,6 @@ def add_default_albums():
         
         if album_count > 0:
             print(f"Albums table already has {album_count} records. Skipping default albums.")
-            cursor.close()
-            connection.close()
             return True
         
         # Get artist IDs
@@ -372,22 +393,22 @@ def add_default_albums():
         
         # Insert albums
         print("Adding default albums...")
-        for title, artist_id, release_year in default_albums:
-            cursor.execute(
-                "INSERT INTO Albums (title, artist_id, release_year) VALUES (%s, %s, %s)",
-                (title, artist_id, release_year)
-            )
+        cursor.executemany(
+            "INSERT INTO Albums (title, artist_id, release_year) VALUES (%s, %s, %s)",
+            default_albums
+        )
         
         connection.commit()
         print(f"Added {len(default_albums)} default albums successfully!")
         
-        cursor.close()
-        connection.close()
         return True
         
     except mysql.connector.Error as err:
         print(f"Error adding default albums: {err}")
         return False
+    finally:
+        if 'connection' in locals() and connection:
+            connection.close()
 
 def add_dummy_songs():
     """Add dummy/placeholder songs"""
@@ -404,8 +425,6 @@ def add_dummy_songs():
         
         if song_count > 0:
             print(f"Songs table already has {song_count} records. Skipping dummy songs.")
-            cursor.close()
-            connection.close()
             return True
         
         # Get artist IDs
@@ -442,36 +461,42 @@ def add_dummy_songs():
         
         # Dummy audio data - just a placeholder WAV file
         print("Creating dummy audio data...")
-        dummy_audio_data = create_dummy_audio()
-        dummy_file_size = len(dummy_audio_data)
+        dummy_audio_key, dummy_file_size = audio_store.put_bytes(bytes(create_dummy_audio()))
         dummy_file_type = "wav"
         
         # Insert songs
         print("Adding dummy songs...")
+        song_rows = []
         for title, artist_name, album_title, genre_name, duration in dummy_songs:
             # Get IDs from mappings
             artist_id = artists.get(artist_name, 1)  # Default to ID 1 if not found
             album_id = albums.get(album_title, 1)    # Default to ID 1 if not found
             genre_id = genres.get(genre_name, 1)     # Default to ID 1 if not found
             
-            cursor.execute(
-                """
-                INSERT INTO Songs (title, artist_id, album_id, genre_id, duration, file_data, file_type, file_size)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                (title, artist_id, album_id, genre_id, duration, dummy_audio_data, dummy_file_type, dummy_file_size)
-            )
+            song_rows.append((title, artist_id, album_id, genre_id, duration,
+                              dummy_audio_key, dummy_file_type, dummy_file_size))
+        
+        cursor.executemany(
+            """
+            INSERT INTO Songs (title, artist_id, album_id, genre_id, duration, audio_key, file_type, file_size)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            song_rows
+        )
         
+        # Every dummy song shares the one stored placeholder file
+        audio_objects.add_reference(cursor, dummy_audio_key, dummy_file_size, len(dummy_songs))
         connection.commit()
         print(f"Added {len(dummy_songs)} dummy songs successfully!")
         
-        cursor.close()
-        connection.close()
         return True
         
     except mysql.connector.Error as err:
         print(f"Error adding dummy songs: {err}")
         return False
+    finally:
+        if 'connection' in locals() and connection:
+            connection.close()
 
 def create_dummy_audio():
     """Create a dummy WAV file data for placeholder"""
@@ -532,46 +557,31 @@ def add_default_playlists():
         
         if playlist_count > 0:
             print(f"Playlists table already has {playlist_count} records. Skipping default playlists.")
-            cursor.close()
-            connection.close()
             return True
         
         # Get user IDs
-        cursor.execute("SELECT user_id FROM Users")
+        cursor.execute("SELECT user_id FROM Users WHERE is_admin = FALSE ORDER BY user_id")
         user_ids = [row[0] for row in cursor.fetchall()]
         
-        # Create system playlists (user_id 0)
+        # System playlists have no owner, only the is_system flag
         system_playlists = [
-            (0, "Top Hits", "Most popular songs right now"),
-            (0, "Chill Vibes", "Relaxing music for your downtime"),
-            (0, "Workout Mix", "Energetic tracks to keep you moving")
+            (None, "Top Hits", "Most popular songs right now", True),
+            (None, "Chill Vibes", "Relaxing music for your downtime", True),
+            (None, "Workout Mix", "Energetic tracks to keep you moving", True)
         ]
         
-        # Insert system playlists
-        print("Adding system playlists...")
-        for user_id, name, description in system_playlists:
-            cursor.execute(
-                "INSERT INTO Playlists (user_id, name, description) VALUES (%s, %s, %s)",
-                (user_id, name, description)
-            )
-        
-        # Create user playlists (one for each user)
+        # Create user playlists (two for each regular user)
         user_playlists = []
         for user_id in user_ids:
-            if user_id > 0:  # Skip admin user
-                user_playlists.append((user_id, f"My Favorites", "My favorite songs"))
-                user_playlists.append((user_id, f"Road Trip", "Perfect for long drives"))
-        
-        # Insert user playlists
-        print("Adding user playlists...")
-        for user_id, name, description in user_playlists:
-            cursor.execute(
-                "INSERT INTO Playlists (user_id, name, description) VALUES (%s, %s, %s)",
-                (user_id, name, description)
-            )
-        
-        connection.commit()
-        print(f"Added {len(system_playlists) + len(user_playlists)} default playlists successfully!")
+            user_playlists.append((user_id, "My Favorites", "My favorite songs", False))
+            user_playlists.append((user_id, "Road Trip", "Perfect for long drives", False))
+        
+        # Insert every playlist in one statement
+        print("Adding playlists...")
+        cursor.executemany(
+            "INSERT INTO Playlists (user_id, name, description, is_system) VALUES (%s, %s, %s, %s)",
+            system_playlists + user_playlists
+        )
         
         # Now add songs to playlists
         cursor.execute("SELECT playlist_id FROM Playlists")
@@ -580,32 +590,37 @@ def add_default_playlists():
         cursor.execute("SELECT song_id FROM Songs")
         song_ids = [row[0] for row in cursor.fetchall()]
         
+        playlist_song_rows = []
         if song_ids:
             print("Adding songs to playlists...")
             # For each playlist, add 3-5 random songs
             for playlist_id in playlist_ids:
                 # Choose a random number of songs (3-5)
-                num_songs = random.randint(3, min(5, len(song_ids)))
+                num_songs = random.randint(min(3, len(song_ids)), min(5, len(song_ids)))
                 # Choose random songs
                 playlist_songs = random.sample(song_ids, num_songs)
                 
-                # Add songs to playlist
                 for position, song_id in enumerate(playlist_songs, 1):
-                    cursor.execute(
-                        "INSERT INTO Playlist_Songs (playlist_id, song_id, position) VALUES (%s, %s, %s)",
-                        (playlist_id, song_id, position)
-                    )
+                    playlist_song_rows.append((playlist_id, song_id, position))
+            
+            cursor.executemany(
+                "INSERT INTO Playlist_Songs (playlist_id, song_id, position) VALUES (%s, %s, %s)",
+                playlist_song_rows
+            )
         
+        # Playlists and their songs land together
         connection.commit()
+        print(f"Added {len(system_playlists) + len(user_playlists)} default playlists successfully!")
         print("Added songs to playlists successfully!")
         
-        cursor.close()
-        connection.close()
         return True
         
     except mysql.connector.Error as err:
         print(f"Error adding default playlists: {err}")
         return False
+    finally:
+        if 'connection' in locals() and connection:
+            connection.close()
 
 def add_sample_listening_history():
     """Add sample listening history for users"""
@@ -622,8 +637,6 @@ def add_sample_listening_history():
         
         if history_count > 0:
             print(f"Listening_History table already has {history_count} records. Skipping sample history.")
-            cursor.close()
-            connection.close()
             return True
         
         # Get user IDs (except admin)
@@ -636,42 +649,51 @@ def add_sample_listening_history():
         
         if not song_ids or not user_ids:
             print("No songs or users found. Skipping sample listening history.")
-            cursor.close()
-            connection.close()
             return False
         
         print("Adding sample listening history...")
         # For each user, add 5-15 listening records
+        history_rows = []
         for user_id in user_ids:
             # Choose a random number of plays (5-15)
             num_plays = random.randint(5, 15)
             
             # Generate random plays
             for _ in range(num_plays):
-                # Choose a random song
-                song_id = random.choice(song_ids)
-                
-                # Add to listening history
-                cursor.execute(
-                    "INSERT INTO Listening_History (user_id, song_id) VALUES (%s, %s)",
-                    (user_id, song_id)
-                )
+                history_rows.append((user_id, random.choice(song_ids)))
         
+        cursor.executemany(
+            "INSERT INTO Listening_History (user_id, song_id) VALUES (%s, %s)",
+            history_rows
+        )
         connection.commit()
         
+        # Count the sample plays
+        play_counts.rebuild()
+        
         # Check how many were added
         cursor.execute("SELECT COUNT(*) FROM Listening_History")
         new_count = cursor.fetchone()[0]
         
         print(f"Added {new_count} listening history records successfully!")
         
-        cursor.close()
-        connection.close()
         return True
         
     except mysql.connector.Error as err:
         print(f"Error adding sample listening history: {err}")
         return False
+    finally:
+        if 'connection' in locals() and connection:
+            connection.close()
+
+def build_recommendation_model():
+    """Build the song recommendation model from the listening history"""
+    try:
+        recommender.build_model()
+        return True
+    except mysql.connector.Error as err:
+        print(f"Error building recommendation model: {err}")
+        return False
 
 def create_temp_directory():
     """Create a temp directory for storing temporary files"""
@@ -743,35 +765,31 @@ def show_splash_screen():
     )
     status_label.pack(pady=5)
     
-    # Setup steps with corresponding progress values
+    # Setup steps; progress advances as each one completes
     setup_steps = [
-        ("Creating database schema...", 0.1, create_database),
-        ("Adding default users...", 0.2, add_default_users),
-        ("Adding music genres...", 0.3, add_default_genres),
-        ("Adding artists...", 0.4, add_default_artists),
-        ("Adding albums...", 0.5, add_default_albums),
-        ("Adding sample songs...", 0.6, add_dummy_songs),
-        ("Creating playlists...", 0.8, add_default_playlists),
-        ("Adding listening history...", 0.9, add_sample_listening_history),
-        ("Creating temporary directories...", 0.95, create_temp_directory)
+        ("Creating database schema...", create_database),
+        ("Adding default users...", add_default_users),
+        ("Adding music genres...", add_default_genres),
+        ("Adding artists...", add_default_artists),
+        ("Adding albums...", add_default_albums),
+        ("Adding sample songs...", add_dummy_songs),
+        ("Creating playlists...", add_default_playlists),
+        ("Adding listening history...", add_sample_listening_history),
+        ("Building recommendations...", build_recommendation_model),
+        ("Creating temporary directories...", create_temp_directory)
     ]
     
     # Function to run setup in steps
     def run_setup():
-        # Initialize progress
-        progress.set(0.05)
-        loading_label.configure(text="Starting setup...")
-        splash_root.update_idletasks()
-        time.sleep(0.5)
+        started = time.monotonic()
         
         # Run each setup step
         setup_success = True
-        for message, prog_value, step_function in setup_steps:
+        for i, (message, step_function) in enumerate(setup_steps):
             # Update UI
             loading_label.configure(text=message)
             status_label.configure(text="")
-            progress.set(prog_value)
-            splash_root.update_idletasks()
+            splash_root.update()
             
             # Run step
             try:
@@ -784,31 +802,26 @@ def show_splash_screen():
                 print(f"Error during setup: {e}")
                 status_label.configure(text=f"Error: {str(e)[:30]}...")
             
-            # Small delay for visual feedback
-            time.sleep(0.3)
-        
-        # Complete setup
-        progress.set(1.0)
+            progress.set((i + 1) / len(setup_steps))
+            splash_root.update()
         
+        elapsed = time.monotonic() - started
         if setup_success:
-            loading_label.configure(text="Setup completed successfully!")
-            status_label.configure(text="Launching application...")
+            print(f"Setup completed in {elapsed:.1f}s")
         else:
-            loading_label.configure(text="Setup completed with errors.")
-            status_label.configure(text="See console for details. Launching application...")
-        
-        splash_root.update_idletasks()
-        time.sleep(1.5)
+            print(f"Setup completed with errors in {elapsed:.1f}s")
         
-        # Close splash and launch application
+        # Close splash; the application starts once its mainloop returns
         splash_root.destroy()
-        launch_application()
     
-    # Start setup after a short delay
-    splash_root.after(500, run_setup)
+    # Start setup as soon as the splash has been drawn
+    splash_root.after(10, run_setup)
     
     # Start the splash screen
     splash_root.mainloop()
+    
+    # Open the application window in this same process
+    launch_application()
 
 # ------------------- Launch Application -------------------
 def launch_application():
@@ -821,8 +834,17 @@ def launch_application():
         if os.path.exists("current_admin.txt"):
             os.remove("current_admin.txt")
         
-        # Start the login page
-        subprocess.Popen(["python", "login.py"])
+        # Keep the rolling play counts dropping plays as they age out
+        play_counts.start_refresher()
+        
+        # Write out any plays journaled before the last exit
+        history_writer.start()
+        
+        # Refresh an outdated recommendation model without delaying startup
+        threading.Thread(target=recommender.rebuild_if_stale, daemon=True).start()
+        
+        # Start the app shell on the login page
+        router.run("login")
     except Exception as e:
         print(f"Error launching application: {e}")
         messagebox.showerror("Error", f"Failed to launch application: {e}")
@@ -0,0 +1,99 @@
+import argparse
+
+import mysql.connector
+
+import audio_objects
+import audio_store
+import db
+import song_audio
+import song_handles
+
+# ------------------- Schema Upgrade -------------------
+def upgrade_songs_table(cursor):
+    """Add the audio_key column and make file_data optional on old installs"""
+    cursor.execute(
+        """
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'Songs'
+        """,
+        (db.DB_NAME,)
+    )
+    columns = {row[0].lower() for row in cursor.fetchall()}
+
+    if "audio_key" not in columns:
+        print("Adding audio_key column to Songs...")
+        cursor.execute("ALTER TABLE Songs ADD COLUMN audio_key CHAR(64) NULL AFTER genre_id")
+        cursor.execute("ALTER TABLE Songs ADD INDEX idx_songs_audio_key (audio_key)")
+        cursor.execute("ALTER TABLE Songs MODIFY file_data LONGBLOB NULL")
+
+# ------------------- Blob Migration -------------------
+def migrate_blobs(batch_size=50, limit=None):
+    """Move Songs.file_data blobs into the audio store one row at a time"""
+    db.require_mysql("migrate_audio.py")  # SQLite installs never stored blobs
+    connection = db.connect_db()
+    cursor = connection.cursor()
+
+    try:
+        upgrade_songs_table(cursor)
+        connection.commit()
+
+        migrated = 0
+        bytes_moved = 0
+        last_id = 0
+
+        while limit is None or migrated < limit:
+            # Page through IDs only so blobs are never fetched in bulk
+            cursor.execute(
+                """
+                SELECT song_id FROM Songs
+                WHERE song_id > %s AND audio_key IS NULL AND file_data IS NOT NULL
+                ORDER BY song_id
+                LIMIT %s
+                """,
+                (last_id, batch_size)
+            )
+            song_ids = [row[0] for row in cursor.fetchall()]
+            if not song_ids:
+                break
+
+            for song_id in song_ids:
+                # Stream the blob out in ranges rather than fetching it whole
+                source = song_audio.get_song_source(song_id)
+                audio_key, size = audio_store.put_chunks(song_audio.iter_chunks(source))
+
+                # The file is safely on disk before the blob is dropped
+                cursor.execute(
+                    "UPDATE Songs SET audio_key = %s, file_size = %s, file_data = NULL WHERE song_id = %s",
+                    (audio_key, size, song_id)
+                )
+                audio_objects.add_reference(cursor, audio_key, size)
+                connection.commit()
+                song_handles.invalidate(song_id)
+
+                migrated += 1
+                bytes_moved += size
+                last_id = song_id
+
+                if limit is not None and migrated >= limit:
+                    break
+
+            print(f"Migrated {migrated} songs ({bytes_moved / (1024 * 1024):.1f} MB)...")
+
+        print(f"Done. Moved {migrated} songs out of the database.")
+        return migrated
+
+    finally:
+        cursor.close()
+        connection.close()
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move song audio from Songs.file_data into the on-disk audio store")
+    parser.add_argument("--batch-size", type=int, default=50, help="song IDs fetched per page")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many songs")
+    args = parser.parse_args()
+
+    try:
+        migrate_blobs(args.batch_size, args.limit)
+    except mysql.connector.Error as err:
+        print(f"Error migrating audio: {err}")
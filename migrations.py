@@ -0,0 +1,195 @@
+import argparse
+
+import mysql.connector
+
+import db
+import history_retention
+import system_stats
+
+# ------------------- Migration Settings -------------------
+# Schema changes made after the tables in main.create_database() are
+# numbered steps in MIGRATIONS, and Schema_Version records which have run.
+# Steps only ever move forward and each checks information_schema first,
+# so a step that was applied by hand or interrupted halfway is safe to run
+# again. MySQL commits DDL implicitly, so a version is recorded right after
+# its step completes. Indexes are built in place without locking the table,
+# so the app keeps reading and writing while a large table is migrated.
+ONLINE_DDL = "ALGORITHM=INPLACE, LOCK=NONE"
+LOCK_NAME = f"{db.DB_NAME}.migrations"  # Only one process migrates at a time
+LOCK_TIMEOUT = 60  # Seconds to wait for another process's migration
+
+# Featured playlists that main.py and playlist.py used to seed under the
+# admin account; migration 8 moves them to no owner
+SEEDED_SYSTEM_PLAYLISTS = ("Top Hits", "Chill Vibes", "Workout Mix", "Coding", "LoFi", "Bass")
+
+# ------------------- Schema Helpers -------------------
+def _index_exists(cursor, table, index_name):
+    """Check whether a table already has an index of this name"""
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND INDEX_NAME = %s
+        """,
+        (db.DB_NAME, table, index_name)
+    )
+    return cursor.fetchone()[0] > 0
+
+def _column_exists(cursor, table, column):
+    """Check whether a table already has a column of this name"""
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """,
+        (db.DB_NAME, table, column)
+    )
+    return cursor.fetchone()[0] > 0
+
+def add_index(cursor, table, index_name, columns):
+    """Add an index online unless it already exists"""
+    if _index_exists(cursor, table, index_name):
+        return
+    print(f"Adding {index_name} to {table}...")
+    cursor.execute(f"ALTER TABLE {table} ADD INDEX {index_name} ({columns}), {ONLINE_DDL}")
+
+# ------------------- Migrations -------------------
+def _history_by_user(cursor):
+    """Per-user history, favourites and recommendation seeds, newest first"""
+    add_index(cursor, "Listening_History", "idx_listening_history_user_played", "user_id, played_at, song_id")
+
+def _history_by_song(cursor):
+    """Per-song play counting, walked in song_id order without a sort"""
+    add_index(cursor, "Listening_History", "idx_listening_history_song_played", "song_id, played_at")
+
+def _songs_by_upload_date(cursor):
+    """Recent songs and the popular songs fallback"""
+    add_index(cursor, "Songs", "idx_songs_upload_date", "upload_date")
+
+def _playlist_positions(cursor):
+    """Playlist pages; new installs create this with the table, older ones lack it"""
+    add_index(cursor, "Playlist_Songs", "idx_playlist_songs_position", "playlist_id, position, song_id")
+
+def _daily_rollups(cursor):
+    """Per-user, per-song daily totals that outlive retired history partitions"""
+    history_retention.create_table(cursor)
+
+def _partition_history(cursor):
+    """Monthly partitions, so old plays are dropped whole and recent reads prune the rest"""
+    history_retention.partition_table(cursor)
+
+def _system_counters(cursor):
+    """Running totals for the admin dashboard, kept by triggers instead of COUNT(*)"""
+    system_stats.create_table(cursor)
+
+def _ownerless_system_playlists(cursor):
+    """System playlists flagged is_system with no owner, instead of borrowing the admin's account"""
+    if not _column_exists(cursor, "Playlists", "is_system"):
+        print("Adding is_system to Playlists...")
+        cursor.execute(
+            "ALTER TABLE Playlists MODIFY user_id INT NULL, "
+            "ADD COLUMN is_system BOOLEAN NOT NULL DEFAULT FALSE"
+        )
+    names = SEEDED_SYSTEM_PLAYLISTS
+    cursor.execute(
+        f"""
+        UPDATE Playlists p JOIN Users u ON p.user_id = u.user_id
+        SET p.user_id = NULL, p.is_system = TRUE
+        WHERE u.is_admin = TRUE AND p.name IN ({", ".join(["%s"] * len(names))})
+        """,
+        names
+    )
+
+# (version, description, step), in the order they are applied
+MIGRATIONS = [
+    (1, "Index Listening_History by user and time", _history_by_user),
+    (2, "Index Listening_History by song and time", _history_by_song),
+    (3, "Index Songs by upload date", _songs_by_upload_date),
+    (4, "Index Playlist_Songs by playlist position", _playlist_positions),
+    (5, "Create Listening_History_Daily rollups", _daily_rollups),
+    (6, "Partition Listening_History by month", _partition_history),
+    (7, "Create System_Counters for the admin dashboard", _system_counters),
+    (8, "Give system playlists no owner", _ownerless_system_playlists)
+]
+
+# ------------------- Runner -------------------
+def create_table(cursor):
+    """Create the Schema_Version table"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Schema_Version (
+        version INT PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+def applied_versions(cursor):
+    """Get the set of migration versions already applied"""
+    cursor.execute("SELECT version FROM Schema_Version")
+    return {row[0] for row in cursor.fetchall()}
+
+def current_version(cursor):
+    """Get the highest applied migration version, or 0 on a fresh install"""
+    return max(applied_versions(cursor), default=0)
+
+def migrate(connection):
+    """Apply every pending migration in order, returning how many ran"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT))
+        if cursor.fetchone()[0] != 1:
+            raise mysql.connector.Error(msg="Timed out waiting for another migration to finish")
+
+        try:
+            create_table(cursor)
+            applied = applied_versions(cursor)
+
+            count = 0
+            for version, description, step in MIGRATIONS:
+                if version in applied:
+                    continue
+                print(f"Applying migration {version}: {description}...")
+                step(cursor)
+                cursor.execute(
+                    "INSERT INTO Schema_Version (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                connection.commit()
+                count += 1
+            return count
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cursor.fetchall()
+    finally:
+        cursor.close()
+
+def status(connection):
+    """Print each migration and whether it has been applied"""
+    cursor = connection.cursor()
+    try:
+        create_table(cursor)
+        applied = applied_versions(cursor)
+    finally:
+        cursor.close()
+
+    for version, description, step in MIGRATIONS:
+        print(f"{version:>4}  {'applied' if version in applied else 'pending':<8} {description}")
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--status", action="store_true", help="list migrations without applying them")
+    args = parser.parse_args()
+
+    if db.DB_BACKEND == "sqlite":
+        print("The SQLite schema is created with every migration applied; nothing to do.")
+        raise SystemExit
+
+    try:
+        with db.pooled_connection() as connection:
+            if args.status:
+                status(connection)
+            else:
+                count = migrate(connection)
+                print(f"Applied {count} migrations." if count else "Schema is up to date.")
+    except mysql.connector.Error as err:
+        print(f"Error migrating schema: {err}")
@@ -0,0 +1,233 @@
+import argparse
+import datetime
+import threading
+import time
+
+import mysql.connector
+
+import db
+
+# ------------------- Counter Settings -------------------
+# Song_Play_Counts keeps an all-time total and rolling 1, 7 and 30 day
+# counts per song. A play only adds to the windows it falls in, and plays
+# age out of the windows only when refresh_windows() runs, so a
+# background thread runs it every REFRESH_INTERVAL seconds.
+WINDOW_DAYS = (1, 7, 30)  # plays_1d, plays_7d, plays_30d
+REFRESH_INTERVAL = 15 * 60
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+# ------------------- Schema -------------------
+def create_table(cursor):
+    """Create the per-song play counter table and the indexes it relies on
+
+    Returns True when the table was newly created and needs a rebuild().
+    """
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'Song_Play_Counts'
+        """,
+        (db.DB_NAME,)
+    )
+    created = cursor.fetchone()[0] == 0
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Song_Play_Counts (
+        song_id INT PRIMARY KEY,
+        total_plays INT NOT NULL DEFAULT 0,
+        plays_1d INT NOT NULL DEFAULT 0,
+        plays_7d INT NOT NULL DEFAULT 0,
+        plays_30d INT NOT NULL DEFAULT 0,
+        last_played_at TIMESTAMP NULL,
+        INDEX idx_play_counts_total (total_plays DESC, song_id),
+        INDEX idx_play_counts_1d (plays_1d DESC, song_id),
+        INDEX idx_play_counts_7d (plays_7d DESC, song_id),
+        INDEX idx_play_counts_30d (plays_30d DESC, song_id),
+        FOREIGN KEY (song_id) REFERENCES Songs(song_id) ON DELETE CASCADE
+    )
+    """)
+
+    # The window refresh reads recent history by time
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'Listening_History'
+          AND INDEX_NAME = 'idx_listening_history_played_at'
+        """,
+        (db.DB_NAME,)
+    )
+    if cursor.fetchone()[0] == 0:
+        print("Adding played_at index to Listening_History...")
+        cursor.execute("ALTER TABLE Listening_History ADD INDEX idx_listening_history_played_at (played_at, song_id)")
+
+    return created
+
+# ------------------- Recording Plays -------------------
+def record_play(user_id, song_id):
+    """Record a play in the listening history and bump the song's counters"""
+    record_plays([(user_id, song_id, datetime.datetime.now())])
+
+def record_plays(plays):
+    """Record (user_id, song_id, played_at) plays and update the counters in one transaction"""
+    if not plays:
+        return
+
+    # Collapse repeated songs so each counter row is touched once. Replayed
+    # or imported plays can be old, so each only counts towards the
+    # windows it falls in
+    now = datetime.datetime.now()
+    cutoffs = [now - datetime.timedelta(days=days) for days in WINDOW_DAYS]
+    song_plays = {}
+    for user_id, song_id, played_at in plays:
+        counts = song_plays.get(song_id)
+        if counts is None:
+            counts = song_plays[song_id] = [0] * (len(WINDOW_DAYS) + 1) + [played_at]
+        counts[0] += 1
+        for i, cutoff in enumerate(cutoffs):
+            if played_at >= cutoff:
+                counts[i + 1] += 1
+        counts[-1] = max(counts[-1], played_at)
+
+    with db.pooled_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            # executemany sends these as multi-row INSERTs
+            cursor.executemany(
+                "INSERT INTO Listening_History (user_id, song_id, played_at) VALUES (%s, %s, %s)",
+                list(plays)
+            )
+            cursor.executemany(
+                """
+                INSERT INTO Song_Play_Counts
+                    (song_id, total_plays, plays_1d, plays_7d, plays_30d, last_played_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    total_plays = total_plays + VALUES(total_plays),
+                    plays_1d = plays_1d + VALUES(plays_1d),
+                    plays_7d = plays_7d + VALUES(plays_7d),
+                    plays_30d = plays_30d + VALUES(plays_30d),
+                    last_played_at = GREATEST(COALESCE(last_played_at, VALUES(last_played_at)), VALUES(last_played_at))
+                """,
+                [(song_id, *counts) for song_id, counts in song_plays.items()]
+            )
+            # The admin dashboard's running total, see system_stats.py
+            cursor.execute("UPDATE System_Counters SET value = value + %s WHERE name = 'plays'", (len(plays),))
+            connection.commit()
+        except mysql.connector.Error:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+# ------------------- Compaction -------------------
+def refresh_windows():
+    """Recompute the rolling window counters from recent listening history
+
+    Plays only ever add to the windows, so they drift upwards until this
+    runs. It reads just the last 30 days of history via the played_at index.
+    """
+    with db.pooled_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            # Only rows with recent plays can have non-zero windows
+            cursor.execute("""
+            UPDATE Song_Play_Counts SET plays_1d = 0, plays_7d = 0, plays_30d = 0
+            WHERE plays_30d > 0
+            """)
+
+            cursor.execute("""
+            INSERT INTO Song_Play_Counts (song_id, plays_1d, plays_7d, plays_30d, last_played_at)
+            SELECT song_id,
+                   SUM(played_at >= NOW() - INTERVAL 1 DAY),
+                   SUM(played_at >= NOW() - INTERVAL 7 DAY),
+                   COUNT(*),
+                   MAX(played_at)
+            FROM Listening_History
+            WHERE played_at >= NOW() - INTERVAL 30 DAY
+            GROUP BY song_id
+            ON DUPLICATE KEY UPDATE
+                plays_1d = VALUES(plays_1d),
+                plays_7d = VALUES(plays_7d),
+                plays_30d = VALUES(plays_30d)
+            """)
+            connection.commit()
+        except mysql.connector.Error:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+def _refresh_loop():
+    """Background loop keeping the rolling windows current"""
+    while True:
+        try:
+            refresh_windows()
+        except Exception as e:
+            # Any failure must not end the thread; the next pass retries
+            print(f"Error refreshing play counts: {e}")
+        time.sleep(REFRESH_INTERVAL)
+
+def start_refresher():
+    """Refresh the rolling windows now and every REFRESH_INTERVAL, in the background"""
+    global _refresher
+
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = threading.Thread(target=_refresh_loop, name="play-counts-refresher", daemon=True)
+            _refresher.start()
+
+def rebuild():
+    """Recompute every counter from the full listening history
+
+    Used to backfill the table on an existing install; normal operation
+    only needs record_plays() and refresh_windows().
+    """
+    with db.pooled_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("DELETE FROM Song_Play_Counts")
+            # Plays from retired partitions live on in the daily rollups
+            cursor.execute("""
+            INSERT INTO Song_Play_Counts (song_id, total_plays, last_played_at)
+            SELECT song_id, SUM(plays), MAX(last_played_at)
+            FROM (
+                SELECT song_id, COUNT(*) as plays, MAX(played_at) as last_played_at
+                FROM Listening_History
+                GROUP BY song_id
+                UNION ALL
+                SELECT song_id, SUM(plays), MAX(last_played_at)
+                FROM Listening_History_Daily
+                GROUP BY song_id
+            ) counted
+            GROUP BY song_id
+            """)
+            cursor.execute("""
+            UPDATE System_Counters SET value = (SELECT COALESCE(SUM(total_plays), 0) FROM Song_Play_Counts)
+            WHERE name = 'plays'
+            """)
+            connection.commit()
+        except mysql.connector.Error:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    refresh_windows()
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the Song_Play_Counts table")
+    parser.add_argument("--rebuild", action="store_true", help="recompute all counters from the full history")
+    args = parser.parse_args()
+
+    try:
+        if args.rebuild:
+            rebuild()
+            print("Rebuilt play counts.")
+        else:
+            refresh_windows()
+            print("Refreshed rolling play counts.")
+    except mysql.connector.Error as err:
+        print(f"Error updating play counts: {err}")
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# ------------------- Cache Settings -------------------
+CACHE_DIR = os.path.join("temp", "cache")
+INDEX_FILE = os.path.join(CACHE_DIR, "index.json")
+CACHE_MAX_BYTES = 512 * 1024 * 1024  # Byte budget for cached songs
+CHUNK_SIZE = 1024 * 1024
+
+# song_id -> entry dict, ordered from least to most recently used
+_entries = OrderedDict()
+_loaded = False
+_lock = threading.RLock()
+
+# ------------------- Index Persistence -------------------
+def _file_path(entry):
+    """Get the cached file path for an index entry"""
+    return os.path.join(CACHE_DIR, entry["file"])
+
+def _hash_file(path):
+    """Compute the SHA-256 of a file"""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def _is_intact(entry):
+    """Check that a cached file still exists with the recorded size"""
+    try:
+        return os.path.getsize(_file_path(entry)) == entry["size"]
+    except OSError:
+        return False
+
+def _load_index():
+    """Load the index from disk, dropping entries whose files are damaged"""
+    global _loaded
+
+    if _loaded:
+        return
+    _loaded = True
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    try:
+        with open(INDEX_FILE, "r") as f:
+            saved_entries = json.load(f)
+    except (OSError, ValueError):
+        saved_entries = []
+
+    for entry in saved_entries:
+        if _is_intact(entry):
+            _entries[str(entry["song_id"])] = entry
+        else:
+            _remove_file(entry)
+
+    # Remove files left behind by a crash between writing and indexing
+    known_files = {entry["file"] for entry in _entries.values()}
+    for name in os.listdir(CACHE_DIR):
+        if name != os.path.basename(INDEX_FILE) and name not in known_files:
+            try:
+                os.remove(os.path.join(CACHE_DIR, name))
+            except OSError:
+                pass
+
+def _save_index():
+    """Write the index atomically so a crash never leaves it half written"""
+    fd, temp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".idx")
+    with os.fdopen(fd, "w") as f:
+        json.dump(list(_entries.values()), f)
+    os.replace(temp_path, INDEX_FILE)
+
+def _remove_file(entry):
+    """Delete a cached file, returning False if it is still in use"""
+    try:
+        os.remove(_file_path(entry))
+    except FileNotFoundError:
+        pass
+    except OSError:
+        return False
+    return True
+
+# ------------------- Eviction -------------------
+def total_bytes():
+    """Get the number of bytes currently cached"""
+    with _lock:
+        _load_index()
+        return sum(entry["size"] for entry in _entries.values())
+
+def _evict(keep_key=None):
+    """Evict least recently used songs until the cache fits its budget"""
+    used = sum(entry["size"] for entry in _entries.values())
+
+    for key in list(_entries.keys()):
+        if used <= CACHE_MAX_BYTES:
+            break
+        if key == keep_key:
+            continue
+
+        entry = _entries[key]
+        # A file the mixer still has open may refuse deletion; try it later
+        if _remove_file(entry):
+            del _entries[key]
+            used -= entry["size"]
+
+def set_max_bytes(max_bytes):
+    """Change the cache byte budget, evicting immediately if needed"""
+    global CACHE_MAX_BYTES
+
+    with _lock:
+        _load_index()
+        CACHE_MAX_BYTES = max_bytes
+        _evict()
+        _save_index()
+
+# ------------------- Lookup and Storage -------------------
+def lookup(song_id, content_hash=None, verify=False):
+    """Get the cached file path for a song, or None on a miss
+
+    When content_hash is given, a cached copy of different content counts
+    as a miss. verify=True re-hashes the file to catch silent corruption.
+    """
+    with _lock:
+        _load_index()
+        key = str(song_id)
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+
+        stale = content_hash is not None and entry["hash"] != content_hash
+        damaged = not _is_intact(entry) or (verify and _hash_file(_file_path(entry)) != entry["hash"])
+
+        if stale or damaged:
+            _remove_file(entry)
+            del _entries[key]
+            _save_index()
+            return None
+
+        entry["last_used"] = time.time()
+        _entries.move_to_end(key)
+        _save_index()
+        return _file_path(entry)
+
+def _add_entry(song_id, content_hash, file_type, temp_path, size):
+    """Move a written file into place and record it in the index"""
+    key = str(song_id)
+    entry = {
+        "song_id": song_id,
+        "hash": content_hash,
+        "file_type": file_type,
+        "size": size,
+        "file": f"song_{song_id}_{content_hash[:12]}.{file_type}",
+        "last_used": time.time()
+    }
+
+    old_entry = _entries.pop(key, None)
+    if old_entry and old_entry["file"] != entry["file"]:
+        _remove_file(old_entry)
+
+    os.replace(temp_path, _file_path(entry))
+    _entries[key] = entry
+
+    _evict(keep_key=key)
+    _save_index()
+    return _file_path(entry)
+
+def put(song_id, file_type, data, content_hash=None):
+    """Cache a song's audio bytes, returning the playable file path"""
+    return put_stream(song_id, file_type, [data], content_hash)
+
+def put_stream(song_id, file_type, chunks, content_hash=None):
+    """Cache a song from an iterable of byte chunks, hashing as it writes
+
+    Only one chunk is held in memory, but the path is returned once the
+    whole file is written: pygame's music decoder takes the end of a file
+    that is still growing for the end of the song.
+    """
+    with _lock:
+        _load_index()
+
+    # Write outside the lock; a slow source must not block cache hits
+    sha256 = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                sha256.update(chunk)
+                size += len(chunk)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+    with _lock:
+        return _add_entry(song_id, content_hash or sha256.hexdigest(), file_type, temp_path, size)
+
+def put_file(song_id, file_type, source_path, content_hash):
+    """Cache a copy of a song file that is already on disk"""
+    with _lock:
+        _load_index()
+        fd, temp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".part")
+        os.close(fd)
+        shutil.copyfile(source_path, temp_path)
+        return _add_entry(song_id, content_hash, file_type, temp_path, os.path.getsize(temp_path))
+
+def invalidate(song_id):
+    """Drop a song from the cache, e.g. after its audio changed"""
+    with _lock:
+        _load_index()
+        entry = _entries.pop(str(song_id), None)
+        if entry:
+            _remove_file(entry)
+            _save_index()
+
+def clear():
+    """Remove every cached song"""
+    with _lock:
+        _load_index()
+        for entry in list(_entries.values()):
+            _remove_file(entry)
+        _entries.clear()
+        _save_index()
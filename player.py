@@ -0,0 +1,258 @@
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+
+from pygame import mixer
+
+import history_writer
+import router
+import song_handles
+
+# ------------------- Shared Player State -------------------
+# Every page plays through the same pygame mixer, so they also share one
+# record of what is playing. Pages update this dict in place.
+current_song = {
+    "id": None,
+    "title": "No song playing",
+    "artist": "",
+    "playing": False,
+    "paused": False
+}
+
+def sync_controls(now_playing_label, play_btn):
+    """Make a page's player controls reflect the shared player state"""
+    if current_song["id"] is None:
+        now_playing_label.configure(text="Now Playing: No song playing")
+    else:
+        now_playing_label.configure(text=f"Now Playing: {current_song['title']} - {current_song['artist']}")
+
+    play_btn.configure(text="⏸️" if current_song["playing"] else "▶️")
+
+# ------------------- Queue Settings -------------------
+# Playing a song queues the list it was picked from. While a track plays,
+# a background worker materializes the next PREFETCH_AHEAD tracks in the
+# playback cache, and the next one is handed to mixer.music.queue() so
+# pygame starts it the moment the current track ends. The UI thread polls
+# the mixer to notice that switch; it never waits on the database or disk.
+PREFETCH_AHEAD = 2
+POLL_MS = 250
+RESTART_THRESHOLD_MS = 3000  # "Previous" restarts the track after this much playback
+LOAD_MORE_AHEAD = 3  # Ask the source list for more songs this close to the end
+
+queue = {
+    "song_ids": [],
+    "index": -1,
+    "load_more": None  # Returns further song IDs from the source list, or None
+}
+
+_prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+_tracks = {}  # song_id -> Future of a loaded track
+# queued_track is the track handed to mixer.music.queue(), kept so it can be
+# shown when pygame starts it even if its load has since been dropped
+_mixer_state = {"queued_index": None, "queued_track": None, "last_pos": 0, "polling": False}
+
+# ------------------- Loading Tracks -------------------
+def _load_track(song_id):
+    """Look up a song and materialize its file (worker thread)
+
+    A song played before costs no queries: its handle is cached and its
+    file is already in the playback cache.
+    """
+    song = song_handles.get_song(song_id)
+    if song is None:
+        return None
+
+    song_file = song_handles.song_file(song)
+    if not song_file:
+        return None
+
+    return {"song_id": song_id, "file": song_file, "title": song["title"], "artist": song["artist_name"]}
+
+def _failed(future):
+    """Check whether a track load was cancelled or raised"""
+    return future.done() and (future.cancelled() or future.exception() is not None)
+
+def _track_future(song_id):
+    """Get the (possibly still running) load of a track, starting it if needed"""
+    future = _tracks.get(song_id)
+    if future is None or _failed(future):
+        future = _prefetch_executor.submit(_load_track, song_id)
+        _tracks[song_id] = future
+    return future
+
+def _ready_track(index):
+    """Get a queued track if it has finished loading, else None"""
+    if not 0 <= index < len(queue["song_ids"]):
+        return None
+    future = _track_future(queue["song_ids"][index])
+    if not future.done() or _failed(future):
+        return None
+    return future.result()
+
+def _prefetch():
+    """Start loading the tracks after the current one and forget the rest"""
+    index = queue["index"]
+    wanted = set(queue["song_ids"][max(index - 1, 0):index + PREFETCH_AHEAD + 1])
+
+    for song_id in queue["song_ids"][index + 1:index + PREFETCH_AHEAD + 1]:
+        _track_future(song_id)
+
+    for song_id in list(_tracks):
+        if song_id not in wanted:
+            _tracks.pop(song_id).cancel()
+
+# ------------------- Queue -------------------
+def _extend_queue():
+    """Pull more songs from the source list when the queue is nearly used up"""
+    if queue["load_more"] is None or queue["index"] + LOAD_MORE_AHEAD < len(queue["song_ids"]):
+        return
+
+    more = queue["load_more"]()
+    if more:
+        queue["song_ids"].extend(more)
+    else:
+        queue["load_more"] = None
+
+def _queue_next_in_mixer():
+    """Hand the next track to pygame once it is ready, for a gapless change"""
+    if _mixer_state["queued_index"] is not None:
+        return
+
+    next_index = queue["index"] + 1
+    track = _ready_track(next_index)
+    if track is not None:
+        mixer.music.queue(track["file"])
+        _mixer_state["queued_index"] = next_index
+        _mixer_state["queued_track"] = track
+
+def _started(index, track):
+    """Record that a queued track has started playing"""
+    queue["index"] = index
+    _mixer_state["queued_index"] = None
+    _mixer_state["queued_track"] = None
+    _mixer_state["last_pos"] = 0
+
+    current_song.update({
+        "id": track["song_id"],
+        "title": track["title"],
+        "artist": track["artist"],
+        "playing": True,
+        "paused": False
+    })
+
+    history_writer.record_play(track["song_id"])
+
+    _extend_queue()
+    _prefetch()
+    _queue_next_in_mixer()
+    _notify_page()
+    _start_polling()
+
+def play_index(index):
+    """Play the track at a queue position, returning False if it cannot be loaded"""
+    if not 0 <= index < len(queue["song_ids"]):
+        return False
+
+    # Usually already prefetched; otherwise this waits for the load
+    track = _track_future(queue["song_ids"][index]).result()
+    if track is None:
+        return False
+
+    # Loading a new track also drops whatever was queued in the mixer
+    mixer.music.load(track["file"])
+    mixer.music.play()
+
+    _started(index, track)
+    return True
+
+def _next_pages(songs_view):
+    """Get a queue["load_more"] callback that loads a SongList's later pages"""
+    def load_more():
+        if not songs_view.has_more:
+            return None
+        loaded = len(songs_view.songs)
+        songs_view.load_more()
+        return [song["song_id"] for song in songs_view.songs[loaded:]]
+    return load_more
+
+def play_song(song_id, source=None):
+    """Play a song, queueing the songs it was picked from around it
+
+    source is the list on screen: either a song_list.SongList, whose later
+    pages are queued as they load, or a plain list of song IDs. With no
+    source only the song itself is queued.
+    """
+    paged = hasattr(source, "load_more")
+    if paged:
+        song_ids = [song["song_id"] for song in source.songs]
+    else:
+        song_ids = list(source or [])
+
+    if song_id in song_ids:
+        queue.update({"song_ids": song_ids, "load_more": _next_pages(source) if paged else None})
+    else:
+        queue.update({"song_ids": [song_id], "load_more": None})
+
+    return play_index(queue["song_ids"].index(song_id))
+
+def play_next():
+    """Skip to the next song in the queue"""
+    _extend_queue()
+    return play_index(queue["index"] + 1)
+
+def play_previous():
+    """Go back a song, or restart the current one if it has been playing a while"""
+    if queue["index"] <= 0 or mixer.music.get_pos() > RESTART_THRESHOLD_MS:
+        return play_index(max(queue["index"], 0))
+    return play_index(queue["index"] - 1)
+
+def stop():
+    """Stop playback and clear the queue, e.g. on logout"""
+    mixer.music.stop()
+    queue.update({"song_ids": [], "index": -1, "load_more": None})
+    _mixer_state["queued_index"] = None
+    _mixer_state["queued_track"] = None
+    for future in _tracks.values():
+        future.cancel()
+    _tracks.clear()
+    current_song.update({"id": None, "title": "No song playing", "artist": "", "playing": False, "paused": False})
+
+# ------------------- Mixer Polling -------------------
+def _notify_page():
+    """Refresh the player controls of the page on screen"""
+    name = router.current_page()
+    if name is None:
+        return
+    module = importlib.import_module(router.PAGES[name])
+    if hasattr(module, "on_show"):
+        module.on_show()
+
+def _start_polling():
+    """Begin watching the mixer for track changes, if not already"""
+    if not _mixer_state["polling"] and router.root is not None:
+        _mixer_state["polling"] = True
+        router.root.after(POLL_MS, _poll)
+
+def _poll():
+    """Notice pygame moving on to the queued track, or the queue running out"""
+    if current_song["paused"]:
+        router.root.after(POLL_MS, _poll)
+        return
+
+    if not mixer.music.get_busy():
+        # Nothing left to play
+        _mixer_state["polling"] = False
+        if current_song["playing"]:
+            current_song["playing"] = False
+            _notify_page()
+        return
+
+    # get_pos() starts again from zero when pygame switches to the queued track
+    pos = mixer.music.get_pos()
+    queued_index = _mixer_state["queued_index"]
+    if queued_index is not None and pos < _mixer_state["last_pos"]:
+        _started(queued_index, _mixer_state["queued_track"])
+    else:
+        _mixer_state["last_pos"] = pos
+        _queue_next_in_mixer()
+
+    router.root.after(POLL_MS, _poll)
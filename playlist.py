@@ -1,7 +1,11 @@
 import customtkinter as ctk
 from tkinter import messagebox, simpledialog
 import mysql.connector
-import subprocess
+import db
+import catalogue
+import router
+import player
+import song_list
 import os
 from pygame import mixer
 import io
@@ -9,26 +13,14 @@ import io
 # Initialize mixer for music playback
 mixer.init()
 
-# Current song information
-current_song = {
-    "id": None,
-    "title": "No song playing",
-    "artist": "",
-    "playing": False,
-    "paused": False
-}
+# Current song information, shared with every other page
+current_song = player.current_song
 
 # ------------------- Database Functions -------------------
 def connect_db():
-    """Connect to the MySQL database"""
+    """Get a pooled connection to the MySQL database"""
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="new_password",
-            database="online_music_system"
-        )
-        return connection
+        return db.connect_db()
     except mysql.connector.Error as err:
         messagebox.showerror("Database Connection Error", 
                             f"Failed to connect to database: {err}")
@@ -68,8 +60,7 @@ def get_current_user():
         print(f"Error getting current user: {e}")
         return None
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 def get_system_playlists():
@@ -81,13 +72,13 @@ def get_system_playlists():
             
         cursor = connection.cursor(dictionary=True)
         
-        # Get playlists where user_id is NULL (system playlists)
-        # or with most songs for featured playlists
+        # System playlists have no owner, so no listener's own playlists
+        # are ever featured; fullest first
         query = """
         SELECT p.playlist_id, p.name, COUNT(ps.song_id) AS song_count
         FROM Playlists p
         LEFT JOIN Playlist_Songs ps ON p.playlist_id = ps.playlist_id
-        WHERE p.user_id = 0
+        WHERE p.is_system = TRUE
         GROUP BY p.playlist_id
         ORDER BY song_count DESC
         LIMIT 3
@@ -110,8 +101,7 @@ def get_system_playlists():
         print(f"Error fetching system playlists: {e}")
         return []
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 def create_default_system_playlists():
@@ -131,10 +121,9 @@ def create_default_system_playlists():
         ]
         
         for name, description in default_playlists:
-            # user_id 0 indicates a system playlist
             cursor.execute(
-                "INSERT INTO Playlists (user_id, name, description) VALUES (%s, %s, %s)",
-                (0, name, description)
+                "INSERT INTO Playlists (user_id, name, description, is_system) VALUES (NULL, %s, %s, TRUE)",
+                (name, description)
             )
         
         connection.commit()
@@ -142,8 +131,7 @@ def create_default_system_playlists():
     except mysql.connector.Error as e:
         print(f"Error creating default playlists: {e}")
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 def get_user_playlists():
@@ -177,8 +165,7 @@ def get_user_playlists():
         print(f"Error fetching user playlists: {e}")
         return []
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 def create_new_playlist(name, description=""):
@@ -207,12 +194,11 @@ def create_new_playlist(name, description=""):
         print(f"Error creating playlist: {e}")
         return None
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
-def get_playlist_songs(playlist_id):
-    """Get songs in a playlist"""
+def get_playlist_songs(playlist_id, after=None, limit=50):
+    """Get a page of songs in a playlist, continuing after the given song"""
     try:
         connection = connect_db()
         if not connection:
@@ -220,18 +206,22 @@ def get_playlist_songs(playlist_id):
             
         cursor = connection.cursor(dictionary=True)
         
+        # Keyset pagination on (position, song_id) so deep pages stay cheap
+        after_position, after_song_id = (after['position'], after['song_id']) if after else (-1, 0)
+        
         query = """
-        SELECT s.song_id, s.title, a.name as artist_name, s.duration,
+        SELECT s.song_id, s.title, s.artist_id, s.duration,
                ps.position
         FROM Playlist_Songs ps
         JOIN Songs s ON ps.song_id = s.song_id
-        JOIN Artists a ON s.artist_id = a.artist_id
         WHERE ps.playlist_id = %s
-        ORDER BY ps.position
+          AND (ps.position > %s OR (ps.position = %s AND ps.song_id > %s))
+        ORDER BY ps.position, ps.song_id
+        LIMIT %s
         """
         
-        cursor.execute(query, (playlist_id,))
-        songs = cursor.fetchall()
+        cursor.execute(query, (playlist_id, after_position, after_position, after_song_id, limit))
+        songs = catalogue.resolve(cursor.fetchall())
         
         # Format durations to MM:SS
         for song in songs:
@@ -244,118 +234,17 @@ def get_playlist_songs(playlist_id):
         print(f"Error fetching playlist songs: {e}")
         return []
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
-
-def get_song_data(song_id):
-    """Get binary song data from database"""
-    try:
-        connection = connect_db()
-        if not connection:
-            return None
-            
-        cursor = connection.cursor()
-        
-        query = "SELECT file_data, file_type FROM Songs WHERE song_id = %s"
-        cursor.execute(query, (song_id,))
-        
-        result = cursor.fetchone()
-        if result:
-            return {'data': result[0], 'type': result[1]}
-        return None
-        
-    except mysql.connector.Error as e:
-        print(f"Error getting song data: {e}")
-        return None
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
-
-def record_listening_history(song_id):
-    """Record that the current user listened to a song"""
-    try:
-        # Get current user ID
-        with open("current_user.txt", "r") as f:
-            user_id = f.read().strip()
-            
-        connection = connect_db()
-        if not connection:
-            return
-            
-        cursor = connection.cursor()
-        
-        query = "INSERT INTO Listening_History (user_id, song_id) VALUES (%s, %s)"
-        cursor.execute(query, (user_id, song_id))
-        connection.commit()
-        
-    except Exception as e:
-        print(f"Error recording listening history: {e}")
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 # ------------------- Music Player Functions -------------------
-def play_song(song_id):
-    """Play a song from its binary data in the database"""
-    global current_song
-    
+def play_song(song_id, source=None):
+    """Play a song, queueing the list it was picked from after it"""
     try:
-        # Get song data from database
-        song_data = get_song_data(song_id)
-        if not song_data:
+        # The next songs are prefetched while this one plays
+        if not player.play_song(song_id, source):
             messagebox.showerror("Error", "Could not retrieve song data")
             return False
-            
-        # Get additional song info for display
-        connection = connect_db()
-        if connection:
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute(
-                "SELECT s.title, a.name as artist_name FROM Songs s JOIN Artists a ON s.artist_id = a.artist_id WHERE s.song_id = %s",
-                (song_id,)
-            )
-            song_info = cursor.fetchone()
-            cursor.close()
-            connection.close()
-        else:
-            song_info = {"title": "Unknown", "artist_name": "Unknown"}
-            
-        # Create a temporary file to play the song
-        temp_dir = "temp"
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        temp_file = os.path.join(temp_dir, f"song_{song_id}.{song_data['type']}")
-        
-        # Write binary data to temp file
-        with open(temp_file, 'wb') as f:
-            f.write(song_data['data'])
-            
-        # Load and play the song
-        mixer.music.load(temp_file)
-        mixer.music.play()
-        
-        # Update current song info
-        current_song = {
-            "id": song_id,
-            "title": song_info["title"],
-            "artist": song_info["artist_name"],
-            "playing": True,
-            "paused": False
-        }
-        
-        # Update UI elements
-        if 'now_playing_label' in globals():
-            now_playing_label.configure(text=f"Now Playing: {current_song['title']} - {current_song['artist']}")
-        
-        if 'play_btn' in globals():
-            play_btn.configure(text="⏸️")
-        
-        # Record in listening history
-        record_listening_history(song_id)
-        
         return True
         
     except Exception as e:
@@ -384,43 +273,49 @@ def toggle_play_pause():
         play_btn.configure(text="▶️")
 
 def play_next_song():
-    """Placeholder for playing next song"""
-    messagebox.showinfo("Info", "Next song feature will be implemented with playlists")
+    """Play the next song in the queue"""
+    try:
+        if not player.play_next():
+            messagebox.showinfo("Info", "There is no next song in the queue")
+    except Exception as e:
+        print(f"Error playing next song: {e}")
+        messagebox.showerror("Error", f"Could not play song: {e}")
 
 def play_previous_song():
-    """Placeholder for playing previous song"""
-    messagebox.showinfo("Info", "Previous song feature will be implemented with playlists")
+    """Play the previous song in the queue, or restart the current one"""
+    try:
+        if not player.play_previous():
+            messagebox.showinfo("Info", "There is no previous song in the queue")
+    except Exception as e:
+        print(f"Error playing previous song: {e}")
+        messagebox.showerror("Error", f"Could not play song: {e}")
 
 # ------------------- Navigation Functions -------------------
 def open_home_page():
     """Open the home page"""
     try:
-        subprocess.Popen(["python", "home.py"])
-        root.destroy()
+        router.show_page("home")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open home page: {e}")
 
 def open_search_page():
     """Open the search page"""
     try:
-        subprocess.Popen(["python", "search.py"])
-        root.destroy()
+        router.show_page("search")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open search page: {e}")
 
 def open_download_page():
     """Open the download page"""
     try:
-        subprocess.Popen(["python", "download.py"])
-        root.destroy()
+        router.show_page("download")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open download page: {e}")
 
 def open_recommend_page():
     """Open the recommendations page"""
     try:
-        subprocess.Popen(["python", "recommend.py"])
-        root.destroy()
+        router.show_page("recommend")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open recommendations page: {e}")
 
@@ -428,20 +323,20 @@ def open_login_page():
     """Logout and open the login page"""
     try:
         # Stop any playing music
-        if mixer.music.get_busy():
-            mixer.music.stop()
+        player.stop()
             
         # Remove current user file
         if os.path.exists("current_user.txt"):
             os.remove("current_user.txt")
             
-        subprocess.Popen(["python", "login.py"])
-        root.destroy()
+        router.show_page("login", reset=True)
     except Exception as e:
         messagebox.showerror("Error", f"Unable to logout: {e}")
 
 def open_playlist_songs(playlist_id, playlist_name):
     """Open a playlist to view its songs"""
+    global songs_list
+    
     # Clear the content frame
     for widget in content_frame.winfo_children():
         widget.destroy()
@@ -465,7 +360,7 @@ def open_playlist_songs(playlist_id, playlist_name):
     songs_frame = ctk.CTkFrame(content_frame, fg_color="#131B2E")
     songs_frame.pack(fill="both", expand=True, padx=20, pady=(20, 10))
     
-    # Get songs in this playlist
+    # Get the first page of songs in this playlist
     songs = get_playlist_songs(playlist_id)
     
     if not songs:
@@ -493,40 +388,55 @@ def open_playlist_songs(playlist_id, playlist_name):
         ctk.CTkLabel(header, text="DURATION", font=("Arial", 12, "bold"), text_color="#A0A0A0",
                    width=100).pack(side="left", padx=(10, 0))
         
-        # Songs list
-        songs_list_frame = ctk.CTkScrollableFrame(songs_frame, fg_color="#131B2E", 
-                                                height=400, corner_radius=0)
-        songs_list_frame.pack(fill="both", expand=True, pady=(0, 10))
-        
-        # Add songs to list
-        for i, song in enumerate(songs, 1):
-            song_row = ctk.CTkFrame(songs_list_frame, fg_color="#1A1A2E", corner_radius=5, height=40)
-            song_row.pack(fill="x", pady=2, padx=5)
-            
-            # Track number
-            ctk.CTkLabel(song_row, text=str(i), font=("Arial", 12), text_color="white",
-                       width=50).pack(side="left", padx=(10, 0))
-            
-            # Song title
-            ctk.CTkLabel(song_row, text=song["title"], font=("Arial", 12), text_color="white",
-                       width=250, anchor="w").pack(side="left", padx=(10, 0))
-            
-            # Artist name
-            ctk.CTkLabel(song_row, text=song["artist_name"], font=("Arial", 12), text_color="#A0A0A0",
-                       width=200, anchor="w").pack(side="left", padx=(10, 0))
-            
-            # Duration
-            ctk.CTkLabel(song_row, text=song["duration_formatted"], font=("Arial", 12), text_color="#A0A0A0",
-                       width=100, anchor="w").pack(side="left", padx=(10, 0))
-            
-            # Play button
-            play_btn = ctk.CTkButton(song_row, text="▶️", font=("Arial", 14), fg_color="#1A1A2E",
-                                   hover_color="#232342", width=30, height=30, 
-                                   command=lambda sid=song["song_id"]: play_song(sid))
-            play_btn.pack(side="right", padx=10)
-            
-            # Make row clickable
-            song_row.bind("<Button-1>", lambda e, sid=song["song_id"]: play_song(sid))
+        # Songs list; further pages load as the user scrolls
+        songs_list = song_list.SongList(
+            songs_frame, create_playlist_song_row, update_playlist_song_row, songs=songs,
+            fetch_page=lambda last_song, limit: get_playlist_songs(playlist_id, last_song, limit),
+            row_height=44, corner_radius=0
+        )
+        songs_list.pack(fill="both", expand=True, pady=(0, 10))
+
+def create_playlist_song_row(parent):
+    """Create a reusable row for the playlist songs list"""
+    song_row = ctk.CTkFrame(parent, fg_color="#1A1A2E", corner_radius=5, height=40)
+    row = {"frame": song_row}
+    
+    # Track number
+    row["number"] = ctk.CTkLabel(song_row, text="", font=("Arial", 12), text_color="white", width=50)
+    row["number"].pack(side="left", padx=(10, 0))
+    
+    # Song title
+    row["title"] = ctk.CTkLabel(song_row, text="", font=("Arial", 12), text_color="white",
+                              width=250, anchor="w")
+    row["title"].pack(side="left", padx=(10, 0))
+    
+    # Artist name
+    row["artist"] = ctk.CTkLabel(song_row, text="", font=("Arial", 12), text_color="#A0A0A0",
+                               width=200, anchor="w")
+    row["artist"].pack(side="left", padx=(10, 0))
+    
+    # Duration
+    row["duration"] = ctk.CTkLabel(song_row, text="", font=("Arial", 12), text_color="#A0A0A0",
+                                 width=100, anchor="w")
+    row["duration"].pack(side="left", padx=(10, 0))
+    
+    # Play button; rows are recycled, so look the song up when clicked
+    play_btn = ctk.CTkButton(song_row, text="▶️", font=("Arial", 14), fg_color="#1A1A2E",
+                           hover_color="#232342", width=30, height=30, 
+                           command=lambda: play_song(row["song"]["song_id"], songs_list) if row["song"] else None)
+    play_btn.pack(side="right", padx=10)
+    
+    # Make row clickable
+    song_row.bind("<Button-1>", lambda e: play_song(row["song"]["song_id"], songs_list) if row["song"] else None)
+    
+    return row
+
+def update_playlist_song_row(row, song, index):
+    """Show a song in a recycled playlist row"""
+    row["number"].configure(text=str(index + 1))
+    row["title"].configure(text=song["title"])
+    row["artist"].configure(text=song["artist_name"])
+    row["duration"].configure(text=song["duration_formatted"])
 
 def show_create_playlist_dialog():
     """Show dialog to create a new playlist"""
@@ -687,25 +597,28 @@ def create_playlists_content():
                            pname=playlist["name"]: open_playlist_songs(pid, pname))
 
 # ------------------- Initialize App -------------------
-try:
+WINDOW_TITLE = "Online Music System - Playlists"
+WINDOW_SIZE = "1000x600"
+
+def on_show():
+    """Refresh the player controls when returning to this page"""
+    player.sync_controls(now_playing_label, play_btn)
+
+def build_page(parent):
+    """Build the playlists page inside the app shell"""
+    global user, root, now_playing_label, play_btn, content_frame
+
     # Get current user info
     user = get_current_user()
     if not user:
         # Redirect to login if not logged in
         open_login_page()
-        exit()
-
-    # ---------------- Initialize App ----------------
-    ctk.set_appearance_mode("dark")  # Dark mode
-    ctk.set_default_color_theme("blue")  # Default theme
+        return False
 
-    root = ctk.CTk()
-    root.title("Online Music System - Playlists")
-    root.geometry("1000x600")  # Adjusted to match the image proportions
-    root.resizable(False, False)
+    root = router.root
 
     # ---------------- Main Frame ----------------
-    main_frame = ctk.CTkFrame(root, fg_color="#1E1E2E", corner_radius=15)
+    main_frame = ctk.CTkFrame(parent, fg_color="#1E1E2E", corner_radius=15)
     main_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
     # ---------------- Sidebar Navigation ----------------
@@ -785,12 +698,8 @@ try:
     # Create playlists content
     create_playlists_content()
 
-    # ---------------- Run Application ----------------
-    root.mainloop()
-    
-except Exception as e:
-    import traceback
-    print(f"Error in playlist.py: {e}")
-    traceback.print_exc()
-    messagebox.showerror("Error", f"An error occurred: {e}")
-    input("Press Enter to exit...")  # This keeps console open
\ No newline at end of file
+    return True
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    router.run("playlist")
@@ -1,7 +1,11 @@
 import customtkinter as ctk
 from tkinter import messagebox
 import mysql.connector
-import subprocess
+import db
+import catalogue
+import router
+import player
+import recommender
 import os
 import random
 from pygame import mixer
@@ -10,26 +14,14 @@ import io
 # Initialize mixer for music playback
 mixer.init()
 
-# Current song information
-current_song = {
-    "id": None,
-    "title": "No song playing",
-    "artist": "",
-    "playing": False,
-    "paused": False
-}
+# Current song information, shared with every other page
+current_song = player.current_song
 
 # ------------------- Database Functions -------------------
 def connect_db():
-    """Connect to the MySQL database"""
+    """Get a pooled connection to the MySQL database"""
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="new_password",
-            database="online_music_system"
-        )
-        return connection
+        return db.connect_db()
     except mysql.connector.Error as err:
         messagebox.showerror("Database Connection Error", 
                             f"Failed to connect to database: {err}")
@@ -69,8 +61,7 @@ def get_current_user():
         print(f"Error getting current user: {e}")
         return None
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 def get_user_listening_history(limit=5):
@@ -87,12 +78,10 @@ def get_user_listening_history(limit=5):
         cursor = connection.cursor(dictionary=True)
         
         query = """
-        SELECT s.song_id, s.title, a.name as artist_name, g.genre_id, g.name as genre_name,
+        SELECT s.song_id, s.title, s.artist_id, s.genre_id,
                COUNT(lh.history_id) as play_count
         FROM Listening_History lh
         JOIN Songs s ON lh.song_id = s.song_id
-        JOIN Artists a ON s.artist_id = a.artist_id
-        LEFT JOIN Genres g ON s.genre_id = g.genre_id
         WHERE lh.user_id = %s
         GROUP BY s.song_id
         ORDER BY lh.played_at DESC
@@ -102,178 +91,48 @@ def get_user_listening_history(limit=5):
         cursor.execute(query, (user_id, limit))
         history = cursor.fetchall()
         
-        return history
+        return catalogue.resolve(history)
         
     except Exception as e:
         print(f"Error getting listening history: {e}")
         return []
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
-def get_favorite_genres():
-    """Get user's favorite genres based on listening history"""
+def get_recommended_songs(limit=8, user_id=None):
+    """Get songs recommended from the precomputed song similarity model"""
     try:
-        # Get current user ID
-        with open("current_user.txt", "r") as f:
-            user_id = f.read().strip()
-            
-        connection = connect_db()
-        if not connection:
-            return []
-            
-        cursor = connection.cursor(dictionary=True)
-        
-        query = """
-        SELECT g.genre_id, g.name as genre_name, COUNT(lh.history_id) as count
-        FROM Listening_History lh
-        JOIN Songs s ON lh.song_id = s.song_id
-        JOIN Genres g ON s.genre_id = g.genre_id
-        WHERE lh.user_id = %s AND g.genre_id IS NOT NULL
-        GROUP BY g.genre_id
-        ORDER BY count DESC
-        LIMIT 3
-        """
+        # Default to the current user
+        if user_id is None:
+            with open("current_user.txt", "r") as f:
+                user_id = int(f.read().strip())
         
-        cursor.execute(query, (user_id,))
-        genres = cursor.fetchall()
+        # Ranked song IDs from a model lookup; no query over the catalogue
+        song_ids = recommender.recommend(user_id, limit)
         
-        return genres
-        
-    except Exception as e:
-        print(f"Error getting favorite genres: {e}")
-        return []
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
-
-def get_favorite_artists():
-    """Get user's favorite artists based on listening history"""
-    try:
-        # Get current user ID
-        with open("current_user.txt", "r") as f:
-            user_id = f.read().strip()
-            
-        connection = connect_db()
-        if not connection:
-            return []
-            
-        cursor = connection.cursor(dictionary=True)
-        
-        query = """
-        SELECT a.artist_id, a.name as artist_name, COUNT(lh.history_id) as count
-        FROM Listening_History lh
-        JOIN Songs s ON lh.song_id = s.song_id
-        JOIN Artists a ON s.artist_id = a.artist_id
-        WHERE lh.user_id = %s
-        GROUP BY a.artist_id
-        ORDER BY count DESC
-        LIMIT 3
-        """
-        
-        cursor.execute(query, (user_id,))
-        artists = cursor.fetchall()
-        
-        return artists
-        
-    except Exception as e:
-        print(f"Error getting favorite artists: {e}")
-        return []
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
-
-def get_recommended_songs(limit=8):
-    """Get songs recommended based on user's listening history"""
-    try:
-        # Get current user ID
-        with open("current_user.txt", "r") as f:
-            user_id = f.read().strip()
-        
-        # Get favorite genres and artists
-        favorite_genres = get_favorite_genres()
-        favorite_artists = get_favorite_artists()
-        
-        # No history yet, return random songs
-        if not favorite_genres and not favorite_artists:
+        # No model built yet, return random songs
+        if not song_ids:
             return get_random_songs(limit)
-            
-        connection = connect_db()
-        if not connection:
-            return []
-            
-        cursor = connection.cursor(dictionary=True)
         
-        # Get songs the user has already listened to
-        cursor.execute(
-            "SELECT song_id FROM Listening_History WHERE user_id = %s",
-            (user_id,)
+        placeholders = ", ".join(["%s"] * len(song_ids))
+        songs = db.fetch_all(
+            f"""
+            SELECT s.song_id, s.title, s.artist_id, s.genre_id
+            FROM Songs s
+            WHERE s.song_id IN ({placeholders})
+            """,
+            song_ids
         )
-        listened_songs = [row['song_id'] for row in cursor.fetchall()]
-        
-        # Build genre filter
-        genre_filter = ""
-        genre_params = []
-        if favorite_genres:
-            genre_ids = [g['genre_id'] for g in favorite_genres]
-            placeholders = ", ".join(["%s"] * len(genre_ids))
-            genre_filter = f"OR s.genre_id IN ({placeholders})"
-            genre_params = genre_ids
-        
-        # Build artist filter
-        artist_filter = ""
-        artist_params = []
-        if favorite_artists:
-            artist_ids = [a['artist_id'] for a in favorite_artists]
-            placeholders = ", ".join(["%s"] * len(artist_ids))
-            artist_filter = f"OR s.artist_id IN ({placeholders})"
-            artist_params = artist_ids
-        
-        # Exclude songs the user has already heard
-        exclusion_filter = ""
-        exclusion_params = []
-        if listened_songs:
-            placeholders = ", ".join(["%s"] * len(listened_songs))
-            exclusion_filter = f"AND s.song_id NOT IN ({placeholders})"
-            exclusion_params = listened_songs
-        
-        # If user hasn't listened to any songs, don't use the exclusion filter
-        if not listened_songs:
-            exclusion_filter = ""
-            exclusion_params = []
-        
-        # Query for recommendations based on genres and artists
-        query = f"""
-        SELECT s.song_id, s.title, a.name as artist_name, g.name as genre_name
-        FROM Songs s
-        JOIN Artists a ON s.artist_id = a.artist_id
-        LEFT JOIN Genres g ON s.genre_id = g.genre_id
-        WHERE 1=0 {genre_filter} {artist_filter} {exclusion_filter}
-        ORDER BY RAND()
-        LIMIT %s
-        """
+        catalogue.resolve(songs)
         
-        all_params = genre_params + artist_params + exclusion_params + [limit]
-        cursor.execute(query, all_params)
-        recommendations = cursor.fetchall()
+        # Keep the model's ranking; songs deleted since the build drop out
+        songs_by_id = {song['song_id']: song for song in songs}
+        recommendations = [songs_by_id[song_id] for song_id in song_ids if song_id in songs_by_id]
         
         # If we don't have enough recommendations, fill with random songs
         if len(recommendations) < limit:
-            remaining = limit - len(recommendations)
-            
-            # Get IDs of already recommended songs
-            recommended_ids = [song['song_id'] for song in recommendations]
-            
-            # Add listened songs to the exclusion list
-            excluded_songs = recommended_ids + listened_songs if listened_songs else recommended_ids
-            
-            # Get random songs excluding those already recommended or listened to
-            random_songs = get_random_songs(remaining, excluded_songs)
-            
-            # Combine recommendations
+            random_songs = get_random_songs(limit - len(recommendations), list(song_ids))
             recommendations.extend(random_songs)
         
         return recommendations
@@ -281,10 +140,6 @@ def get_recommended_songs(limit=8):
     except Exception as e:
         print(f"Error getting recommendations: {e}")
         return get_random_songs(limit)  # Fallback to random songs
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
 
 def get_random_songs(limit=8, exclude_ids=None):
     """Get random songs from the database"""
@@ -305,10 +160,8 @@ def get_random_songs(limit=8, exclude_ids=None):
             params = exclude_ids
         
         query = f"""
-        SELECT s.song_id, s.title, a.name as artist_name, g.name as genre_name
+        SELECT s.song_id, s.title, s.artist_id, s.genre_id
         FROM Songs s
-        JOIN Artists a ON s.artist_id = a.artist_id
-        LEFT JOIN Genres g ON s.genre_id = g.genre_id
         {exclusion_filter}
         ORDER BY RAND()
         LIMIT %s
@@ -316,7 +169,7 @@ def get_random_songs(limit=8, exclude_ids=None):
         
         params.append(limit)
         cursor.execute(query, params)
-        songs = cursor.fetchall()
+        songs = catalogue.resolve(cursor.fetchall())
         
         # If no songs in database yet, return dummy data
         if not songs:
@@ -336,118 +189,17 @@ def get_random_songs(limit=8, exclude_ids=None):
         print(f"Error getting random songs: {e}")
         return []
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
-
-def get_song_data(song_id):
-    """Get binary song data from database"""
-    try:
-        connection = connect_db()
-        if not connection:
-            return None
-            
-        cursor = connection.cursor()
-        
-        query = "SELECT file_data, file_type FROM Songs WHERE song_id = %s"
-        cursor.execute(query, (song_id,))
-        
-        result = cursor.fetchone()
-        if result:
-            return {'data': result[0], 'type': result[1]}
-        return None
-        
-    except mysql.connector.Error as e:
-        print(f"Error getting song data: {e}")
-        return None
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
-
-def record_listening_history(song_id):
-    """Record that the current user listened to a song"""
-    try:
-        # Get current user ID
-        with open("current_user.txt", "r") as f:
-            user_id = f.read().strip()
-            
-        connection = connect_db()
-        if not connection:
-            return
-            
-        cursor = connection.cursor()
-        
-        query = "INSERT INTO Listening_History (user_id, song_id) VALUES (%s, %s)"
-        cursor.execute(query, (user_id, song_id))
-        connection.commit()
-        
-    except Exception as e:
-        print(f"Error recording listening history: {e}")
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 # ------------------- Music Player Functions -------------------
-def play_song(song_id):
-    """Play a song from its binary data in the database"""
-    global current_song
-    
+def play_song(song_id, source=None):
+    """Play a song, queueing the list it was picked from after it"""
     try:
-        # Get song data from database
-        song_data = get_song_data(song_id)
-        if not song_data:
+        # The next songs are prefetched while this one plays
+        if not player.play_song(song_id, source):
             messagebox.showerror("Error", "Could not retrieve song data")
             return False
-            
-        # Get additional song info for display
-        connection = connect_db()
-        if connection:
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute(
-                "SELECT s.title, a.name as artist_name FROM Songs s JOIN Artists a ON s.artist_id = a.artist_id WHERE s.song_id = %s",
-                (song_id,)
-            )
-            song_info = cursor.fetchone()
-            cursor.close()
-            connection.close()
-        else:
-            song_info = {"title": "Unknown", "artist_name": "Unknown"}
-            
-        # Create a temporary file to play the song
-        temp_dir = "temp"
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        temp_file = os.path.join(temp_dir, f"song_{song_id}.{song_data['type']}")
-        
-        # Write binary data to temp file
-        with open(temp_file, 'wb') as f:
-            f.write(song_data['data'])
-            
-        # Load and play the song
-        mixer.music.load(temp_file)
-        mixer.music.play()
-        
-        # Update current song info
-        current_song = {
-            "id": song_id,
-            "title": song_info["title"],
-            "artist": song_info["artist_name"],
-            "playing": True,
-            "paused": False
-        }
-        
-        # Update UI elements
-        if 'now_playing_label' in globals():
-            now_playing_label.configure(text=f"Now Playing: {current_song['title']} - {current_song['artist']}")
-        
-        if 'play_btn' in globals():
-            play_btn.configure(text="⏸️")
-        
-        # Record in listening history
-        record_listening_history(song_id)
-        
         return True
         
     except Exception as e:
@@ -476,43 +228,49 @@ def toggle_play_pause():
         play_btn.configure(text="▶️")
 
 def play_next_song():
-    """Placeholder for playing next song"""
-    messagebox.showinfo("Info", "Next song feature will be implemented with playlists")
+    """Play the next song in the queue"""
+    try:
+        if not player.play_next():
+            messagebox.showinfo("Info", "There is no next song in the queue")
+    except Exception as e:
+        print(f"Error playing next song: {e}")
+        messagebox.showerror("Error", f"Could not play song: {e}")
 
 def play_previous_song():
-    """Placeholder for playing previous song"""
-    messagebox.showinfo("Info", "Previous song feature will be implemented with playlists")
+    """Play the previous song in the queue, or restart the current one"""
+    try:
+        if not player.play_previous():
+            messagebox.showinfo("Info", "There is no previous song in the queue")
+    except Exception as e:
+        print(f"Error playing previous song: {e}")
+        messagebox.showerror("Error", f"Could not play song: {e}")
 
 # ------------------- Navigation Functions -------------------
 def open_home_page():
     """Open the home page"""
     try:
-        subprocess.Popen(["python", "home.py"])
-        root.destroy()
+        router.show_page("home")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open home page: {e}")
 
 def open_search_page():
     """Open the search page"""
     try:
-        subprocess.Popen(["python", "search.py"])
-        root.destroy()
+        router.show_page("search")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open search page: {e}")
 
 def open_playlist_page():
     """Open the playlist page"""
     try:
-        subprocess.Popen(["python", "playlist.py"])
-        root.destroy()
+        router.show_page("playlist")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open playlist page: {e}")
 
 def open_download_page():
     """Open the download page"""
     try:
-        subprocess.Popen(["python", "download.py"])
-        root.destroy()
+        router.show_page("download")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open download page: {e}")
 
@@ -520,15 +278,13 @@ def open_login_page():
     """Logout and open the login page"""
     try:
         # Stop any playing music
-        if mixer.music.get_busy():
-            mixer.music.stop()
+        player.stop()
             
         # Remove current user file
         if os.path.exists("current_user.txt"):
             os.remove("current_user.txt")
             
-        subprocess.Popen(["python", "login.py"])
-        root.destroy()
+        router.show_page("login", reset=True)
     except Exception as e:
         messagebox.showerror("Error", f"Unable to logout: {e}")
 
@@ -549,6 +305,7 @@ def display_recommendations():
     """Display recommended songs in the UI"""
     # Get recommended songs
     recommended_songs = get_recommended_songs(8)
+    recommended_ids = [song["song_id"] for song in recommended_songs]
     
     # Display songs
     for song in recommended_songs:
@@ -573,33 +330,36 @@ def display_recommendations():
         play_btn = ctk.CTkButton(song_frame, text="▶️ Play", font=("Arial", 12), 
                                fg_color="#B146EC", hover_color="#9333EA", 
                                width=80, height=30,
-                               command=lambda sid=song["song_id"]: play_song(sid))
+                               command=lambda sid=song["song_id"]: play_song(sid, recommended_ids))
         play_btn.pack(side="right", padx=20)
         
         # Make frame clickable
-        song_frame.bind("<Button-1>", lambda e, sid=song["song_id"]: play_song(sid))
-        song_label.bind("<Button-1>", lambda e, sid=song["song_id"]: play_song(sid))
+        song_frame.bind("<Button-1>", lambda e, sid=song["song_id"]: play_song(sid, recommended_ids))
+        song_label.bind("<Button-1>", lambda e, sid=song["song_id"]: play_song(sid, recommended_ids))
 
 # ------------------- Initialize App -------------------
-try:
+WINDOW_TITLE = "Online Music System - Recommended Songs"
+WINDOW_SIZE = "1000x600"
+
+def on_show():
+    """Refresh the player controls when returning to this page"""
+    player.sync_controls(now_playing_label, play_btn)
+
+def build_page(parent):
+    """Build the recommendations page inside the app shell"""
+    global root, title_label, now_playing_label, play_btn, songs_frame, subtitle_label
+
     # Get current user info
     user = get_current_user()
     if not user:
         # Redirect to login if not logged in
         open_login_page()
-        exit()
-
-    # ---------------- Initialize App ----------------
-    ctk.set_appearance_mode("dark")  # Dark mode
-    ctk.set_default_color_theme("blue")  # Default theme
+        return False
 
-    root = ctk.CTk()
-    root.title("Online Music System - Recommended Songs")
-    root.geometry("1000x600")  # Adjusted to match the image proportions
-    root.resizable(False, False)
+    root = router.root
 
     # ---------------- Main Frame ----------------
-    main_frame = ctk.CTkFrame(root, fg_color="#1E1E2E", corner_radius=15)
+    main_frame = ctk.CTkFrame(parent, fg_color="#1E1E2E", corner_radius=15)
     main_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
     # ---------------- Sidebar Navigation ----------------
@@ -721,12 +481,8 @@ try:
                                   command=refresh_recommendations)
     refresh_button.pack()
 
-    # ---------------- Run Application ----------------
-    root.mainloop()
-    
-except Exception as e:
-    import traceback
-    print(f"Error in recommend.py: {e}")
-    traceback.print_exc()
-    messagebox.showerror("Error", f"An error occurred: {e}")
-    input("Press Enter to exit...")  # This keeps console open
\ No newline at end of file
+    return True
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    router.run("recommend")
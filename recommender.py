@@ -0,0 +1,263 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import mysql.connector
+import numpy as np
+
+import db
+
+# ------------------- Model Settings -------------------
+# The model is an item-item cosine similarity over who listened to what,
+# built offline from Listening_History and stored as a CSR-style top-K
+# neighbour table: for song index i, its neighbours are
+# neighbor_indices[offsets[i]:offsets[i + 1]] with matching neighbor_scores.
+MODEL_FILE = os.path.join("temp", "recommender_model.npz")
+NEIGHBORS_PER_SONG = 50
+MIN_CO_LISTENERS = 1  # Ignore song pairs shared by fewer users than this
+PAIR_BATCH = 5_000_000  # Song pairs expanded at a time while counting co-listeners
+SEED_PLAYS = 500  # Recent plays used to seed a user's recommendations
+MODEL_MAX_AGE = 24 * 60 * 60  # Rebuild at startup when older than this (seconds)
+
+_model = None
+_model_mtime = None
+_lock = threading.Lock()
+
+# ------------------- Building -------------------
+def _fetch_interactions():
+    """Get every distinct (user_id, song_id) pair in the listening history"""
+    # Plays from retired partitions live on in the daily rollups
+    rows = db.fetch_all(
+        """
+        SELECT user_id, song_id FROM Listening_History
+        UNION
+        SELECT user_id, song_id FROM Listening_History_Daily
+        """,
+        dictionary=False
+    )
+    if not rows:
+        return None
+    return np.array(rows, dtype=np.int64)
+
+def _song_pairs(songs, per_user, song_count):
+    """Encode every pair of different songs within each user's run as row * song_count + col"""
+    run_starts = np.cumsum(per_user) - per_user
+    entry_runs = np.repeat(per_user, per_user)  # Length of each entry's run
+    entry_starts = np.repeat(run_starts, per_user)
+
+    # Pair each entry with every entry of its run, in order
+    left = np.repeat(np.arange(len(songs)), entry_runs)
+    partner = np.arange(len(left)) - np.repeat(np.cumsum(entry_runs) - entry_runs, entry_runs)
+    right = np.repeat(entry_starts, entry_runs) + partner
+
+    rows, cols = songs[left], songs[right]
+    different = rows != cols
+    return rows[different] * song_count + cols[different]
+
+def _co_listener_counts(user_index, song_index, song_count):
+    """Count the listeners each ordered pair of different songs shares
+
+    Returns (rows, cols, counts) for every pair with a shared listener.
+    Users are expanded a batch at a time so that only about PAIR_BATCH
+    pairs are held at once, plus the counts found so far.
+    """
+    order = np.lexsort((song_index, user_index))
+    songs = song_index[order]
+    per_user = np.bincount(user_index)
+    run_ends = np.cumsum(per_user)
+    pairs_so_far = np.cumsum(per_user ** 2)
+
+    keys, counts = [], []
+    first = 0
+    while first < len(per_user):
+        done = pairs_so_far[first - 1] if first else 0
+        last = max(int(np.searchsorted(pairs_so_far, done + PAIR_BATCH, side="right")), first + 1)
+        start = run_ends[first - 1] if first else 0
+        batch_keys, batch_counts = np.unique(
+            _song_pairs(songs[start:run_ends[last - 1]], per_user[first:last], song_count),
+            return_counts=True
+        )
+        keys.append(batch_keys)
+        counts.append(batch_counts)
+        first = last
+
+    # A pair can turn up in several batches
+    keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    totals = np.bincount(inverse, weights=np.concatenate(counts)).astype(np.float32)
+    rows, cols = np.divmod(keys, song_count)
+    return rows, cols, totals
+
+def build_model():
+    """Build the similarity model from the listening history and save it"""
+    interactions = _fetch_interactions()
+    if interactions is None:
+        print("No listening history yet. Skipping recommendation model.")
+        return False
+
+    song_ids, song_index = np.unique(interactions[:, 1], return_inverse=True)
+    user_ids, user_index = np.unique(interactions[:, 0], return_inverse=True)
+
+    # Co-listener counts for every song pair, and cosine similarity from
+    # them; the pairs are distinct, so repeat plays are already ignored
+    rows, cols, shared = _co_listener_counts(user_index.ravel(), song_index.ravel(), len(song_ids))
+    listeners = np.bincount(song_index.ravel(), minlength=len(song_ids)).astype(np.float32)
+
+    keep = shared >= MIN_CO_LISTENERS
+    rows, cols = rows[keep], cols[keep]
+    scores = (shared[keep] / np.sqrt(listeners[rows] * listeners[cols])).astype(np.float32)
+
+    # Keep the best neighbours of each song: sort by (row, -score) and cut
+    # each row's run at NEIGHBORS_PER_SONG
+    order = np.lexsort((-scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    row_starts = np.searchsorted(rows, np.arange(len(song_ids)))
+    rank = np.arange(len(rows)) - row_starts[rows]
+    top = rank < NEIGHBORS_PER_SONG
+    rows, cols, scores = rows[top], cols[top], scores[top]
+
+    offsets = np.zeros(len(song_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(song_ids)), out=offsets[1:])
+
+    # Fallback ordering for new users: most listened-to songs first
+    popular = np.argsort(-listeners, kind="stable").astype(np.int32)
+
+    os.makedirs(os.path.dirname(MODEL_FILE), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(MODEL_FILE), suffix=".npz")
+    with os.fdopen(fd, "wb") as f:
+        np.savez(
+            f,
+            song_ids=song_ids.astype(np.int32),
+            offsets=offsets,
+            neighbor_indices=cols.astype(np.int32),
+            neighbor_scores=scores,
+            popular=popular
+        )
+    os.replace(temp_path, MODEL_FILE)
+
+    print(f"Built recommendation model for {len(song_ids)} songs and {len(user_ids)} listeners.")
+    return True
+
+def rebuild_if_stale():
+    """Rebuild the model when it is missing or older than MODEL_MAX_AGE"""
+    try:
+        age = time.time() - os.path.getmtime(MODEL_FILE)
+    except OSError:
+        age = None
+
+    if age is not None and age < MODEL_MAX_AGE:
+        return False
+
+    try:
+        return build_model()
+    except mysql.connector.Error as err:
+        print(f"Error building recommendation model: {err}")
+        return False
+
+# ------------------- Serving -------------------
+def load_model():
+    """Load the saved model, reloading it when the file has been rebuilt"""
+    global _model, _model_mtime
+
+    try:
+        mtime = os.path.getmtime(MODEL_FILE)
+    except OSError:
+        return None
+
+    with _lock:
+        if _model is None or mtime != _model_mtime:
+            with np.load(MODEL_FILE) as data:
+                model = {name: data[name] for name in data.files}
+            model["position"] = {int(song_id): i for i, song_id in enumerate(model["song_ids"])}
+            _model = model
+            _model_mtime = mtime
+        return _model
+
+def _user_plays(user_id):
+    """Get {song_id: play count} over the user's most recent plays"""
+    rows = db.fetch_all(
+        """
+        SELECT song_id, COUNT(*) as plays
+        FROM (
+            SELECT song_id FROM Listening_History
+            WHERE user_id = %s
+            ORDER BY played_at DESC
+            LIMIT %s
+        ) recent
+        GROUP BY song_id
+        """,
+        (user_id, SEED_PLAYS)
+    )
+    return {row["song_id"]: row["plays"] for row in rows}
+
+def _heard_songs(user_id):
+    """Get every song the user has ever played, including retired plays"""
+    rows = db.fetch_all(
+        """
+        SELECT song_id FROM Listening_History WHERE user_id = %s
+        UNION
+        SELECT song_id FROM Listening_History_Daily WHERE user_id = %s
+        """,
+        (user_id, user_id),
+        dictionary=False
+    )
+    return {row[0] for row in rows}
+
+def recommend(user_id, limit=8, exclude_ids=()):
+    """Get up to limit song IDs for a user, best first
+
+    Scores every neighbour of the songs the user played recently, weighted
+    by how often they played them, and skips every song they have ever
+    heard. Returns
+    an empty list when no model has been built yet.
+    """
+    model = load_model()
+    if model is None:
+        return []
+
+    plays = _user_plays(user_id)
+    position = model["position"]
+    offsets = model["offsets"]
+
+    seeds = [(position[song_id], count) for song_id, count in plays.items() if song_id in position]
+    excluded = {position[song_id] for song_id in _heard_songs(user_id) | set(exclude_ids) if song_id in position}
+
+    recommended = []
+    if seeds:
+        # Gather every seed's neighbour slice and sum scores per song
+        slices = [slice(offsets[i], offsets[i + 1]) for i, count in seeds]
+        candidates = np.concatenate([model["neighbor_indices"][s] for s in slices])
+        weights = np.concatenate([model["neighbor_scores"][s] * np.log1p(count)
+                                  for s, (i, count) in zip(slices, seeds)])
+
+        if len(candidates):
+            totals = np.bincount(candidates, weights=weights, minlength=len(model["song_ids"]))
+            if excluded:
+                totals[list(excluded)] = 0
+
+            # Only the scored songs need sorting, not the whole catalogue
+            scored = np.flatnonzero(totals)
+            best = scored[np.argsort(-totals[scored], kind="stable")[:limit]]
+            recommended = [int(i) for i in best]
+
+    # Top up with popular songs the user has not heard
+    if len(recommended) < limit:
+        taken = excluded | set(recommended)
+        for i in model["popular"]:
+            if len(recommended) >= limit:
+                break
+            if int(i) not in taken:
+                recommended.append(int(i))
+
+    return [int(model["song_ids"][i]) for i in recommended]
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the song recommendation model from listening history")
+    parser.parse_args()
+
+    try:
+        build_model()
+    except mysql.connector.Error as err:
+        print(f"Error building recommendation model: {err}")
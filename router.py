@@ -0,0 +1,98 @@
+import importlib
+
+import customtkinter as ctk
+from tkinter import messagebox
+
+# ------------------- Page Registry -------------------
+# Page name -> module that provides build_page(parent)
+PAGES = {
+    "login": "login",
+    "signup": "signup",
+    "home": "home",
+    "search": "search",
+    "playlist": "playlist",
+    "download": "download",
+    "recommend": "recommend",
+    "admin": "admin"
+}
+
+# The one application window shared by every page
+root = None
+
+# Built page frames, kept alive while hidden so switching back is instant
+_page_frames = {}
+_current_page = None
+
+# ------------------- Navigation -------------------
+def show_page(name, reset=False):
+    """Show a page, building its frame the first time it is opened
+
+    With reset=True every other cached page is destroyed, e.g. when the
+    logged-in user changes and the pages hold the old user's data.
+    """
+    global _current_page
+
+    module = importlib.import_module(PAGES[name])
+
+    frame = _page_frames.get(name)
+    if frame is None:
+        frame = ctk.CTkFrame(root, fg_color="transparent", corner_radius=0)
+
+        try:
+            built = module.build_page(frame)
+        except Exception as e:
+            import traceback
+            print(f"Error in {PAGES[name]}.py: {e}")
+            traceback.print_exc()
+            messagebox.showerror("Error", f"An error occurred: {e}")
+            built = False
+
+        # A page refuses to build when, for example, nobody is logged in;
+        # it has already navigated elsewhere in that case
+        if built is False:
+            frame.destroy()
+            return False
+
+        _page_frames[name] = frame
+    elif hasattr(module, "on_show"):
+        module.on_show()
+
+    # Swap the visible page
+    if _current_page and _current_page != name and _current_page in _page_frames:
+        _page_frames[_current_page].pack_forget()
+
+    ctk.set_appearance_mode(getattr(module, "APPEARANCE_MODE", "dark"))
+    root.title(module.WINDOW_TITLE)
+    root.geometry(module.WINDOW_SIZE)
+    resizable = getattr(module, "WINDOW_RESIZABLE", False)
+    root.resizable(resizable, resizable)
+
+    frame.pack(fill="both", expand=True)
+    _current_page = name
+
+    if reset:
+        reset_pages(keep=name)
+
+    return True
+
+def reset_pages(keep=None):
+    """Destroy cached page frames so they are rebuilt on next use"""
+    for name in list(_page_frames.keys()):
+        if name != keep:
+            _page_frames.pop(name).destroy()
+
+def current_page():
+    """Get the name of the page on screen"""
+    return _current_page
+
+# ------------------- Application Shell -------------------
+def run(start_page="login"):
+    """Create the application window and run it, starting on a page"""
+    global root
+
+    ctk.set_appearance_mode("dark")
+    ctk.set_default_color_theme("blue")
+
+    root = ctk.CTk()
+    show_page(start_page)
+    root.mainloop()
@@ -1,36 +1,30 @@
 import customtkinter as ctk
 from tkinter import messagebox
 import mysql.connector
-import subprocess
+import db
+import catalogue
+import router
+import player
+import search_index
+import song_list
 import os
 import io
 from pygame import mixer
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Initialize mixer for music playback
 mixer.init()
 
-# Current song information
-current_song = {
-    "id": None,
-    "title": "No song playing",
-    "artist": "",
-    "playing": False,
-    "paused": False
-}
+# Current song information, shared with every other page
+current_song = player.current_song
 
 # ------------------- Database Functions -------------------
 def connect_db():
-    """Connect to the MySQL database"""
+    """Get a pooled connection to the MySQL database"""
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="new_password",
-            database="online_music_system"
-        )
-        return connection
+        return db.connect_db()
     except mysql.connector.Error as err:
         messagebox.showerror("Database Connection Error", 
                             f"Failed to connect to database: {err}")
@@ -70,107 +64,32 @@ def get_current_user():
         print(f"Error getting current user: {e}")
         return None
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
-def search_songs(query, search_type="all"):
-    """Search for songs in the database"""
-    try:
-        if not query:
-            return []
-            
-        connection = connect_db()
-        if not connection:
-            return []
-            
-        cursor = connection.cursor(dictionary=True)
-        
-        search_param = f"%{query}%"
-        
-        # Different queries based on search type
-        if search_type == "song":
-            query = """
-            SELECT s.song_id, s.title, a.name as artist_name, al.title as album_name, 
-                   g.name as genre, s.duration
-            FROM Songs s
-            JOIN Artists a ON s.artist_id = a.artist_id
-            LEFT JOIN Albums al ON s.album_id = al.album_id
-            LEFT JOIN Genres g ON s.genre_id = g.genre_id
-            WHERE s.title LIKE %s
-            ORDER BY s.title
-            """
-            cursor.execute(query, (search_param,))
-        
-        elif search_type == "artist":
-            query = """
-            SELECT s.song_id, s.title, a.name as artist_name, al.title as album_name, 
-                   g.name as genre, s.duration
-            FROM Songs s
-            JOIN Artists a ON s.artist_id = a.artist_id
-            LEFT JOIN Albums al ON s.album_id = al.album_id
-            LEFT JOIN Genres g ON s.genre_id = g.genre_id
-            WHERE a.name LIKE %s
-            ORDER BY s.title
-            """
-            cursor.execute(query, (search_param,))
-            
-        elif search_type == "album":
-            query = """
-            SELECT s.song_id, s.title, a.name as artist_name, al.title as album_name, 
-                   g.name as genre, s.duration
-            FROM Songs s
-            JOIN Artists a ON s.artist_id = a.artist_id
-            LEFT JOIN Albums al ON s.album_id = al.album_id
-            LEFT JOIN Genres g ON s.genre_id = g.genre_id
-            WHERE al.title LIKE %s
-            ORDER BY s.title
-            """
-            cursor.execute(query, (search_param,))
-            
-        else:  # "all" - search everything
-            query = """
-            SELECT s.song_id, s.title, a.name as artist_name, al.title as album_name, 
-                   g.name as genre, s.duration
-            FROM Songs s
-            JOIN Artists a ON s.artist_id = a.artist_id
-            LEFT JOIN Albums al ON s.album_id = al.album_id
-            LEFT JOIN Genres g ON s.genre_id = g.genre_id
-            WHERE s.title LIKE %s OR a.name LIKE %s OR al.title LIKE %s
-            ORDER BY s.title
-            """
-            cursor.execute(query, (search_param, search_param, search_param))
-        
-        songs = cursor.fetchall()
-        
-        # Format durations to MM:SS
-        for song in songs:
-            minutes, seconds = divmod(song['duration'] or 0, 60)  # Handle None values
-            song['duration_formatted'] = f"{minutes}:{seconds:02d}"
-        
-        return songs
-        
-    except mysql.connector.Error as e:
-        print(f"Error searching songs: {e}")
+def search_songs(query, search_type="all", within=None):
+    """Search for songs using the in-memory search index"""
+    if not query:
         return []
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
 
-def get_recent_songs(limit=6):
-    """Get recently added songs"""
+    songs = search_index.search(query, search_type, within=within)
+    
+    # Format durations to MM:SS
+    for song in songs:
+        minutes, seconds = divmod(song['duration'] or 0, 60)  # Handle None values
+        song['duration_formatted'] = f"{minutes}:{seconds:02d}"
+    
+    return songs
+
+def fetch_recent_songs(limit=6):
+    """Get recently added songs, raising database errors so a worker thread can hand them back"""
+    connection = db.connect_db()
     try:
-        connection = connect_db()
-        if not connection:
-            return []
-            
         cursor = connection.cursor(dictionary=True)
         
         query = """
-        SELECT s.song_id, s.title, a.name as artist_name 
+        SELECT s.song_id, s.title, s.artist_id 
         FROM Songs s
-        JOIN Artists a ON s.artist_id = a.artist_id
         ORDER BY s.upload_date DESC
         LIMIT %s
         """
@@ -178,124 +97,27 @@ def get_recent_songs(limit=6):
         cursor.execute(query, (limit,))
         songs = cursor.fetchall()
         
-        return songs
-        
-    except mysql.connector.Error as e:
-        print(f"Error fetching recent songs: {e}")
-        return []
+        # Artist names come from the in-memory catalogue
+        return catalogue.resolve(songs)
     finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
+        connection.close()
 
-def get_song_data(song_id):
-    """Get binary song data from database"""
+def get_recent_songs(limit=6):
+    """Get recently added songs"""
     try:
-        connection = connect_db()
-        if not connection:
-            return None
-            
-        cursor = connection.cursor()
-        
-        query = "SELECT file_data, file_type FROM Songs WHERE song_id = %s"
-        cursor.execute(query, (song_id,))
-        
-        result = cursor.fetchone()
-        if result:
-            return {'data': result[0], 'type': result[1]}
-        return None
-        
+        return fetch_recent_songs(limit)
     except mysql.connector.Error as e:
-        print(f"Error getting song data: {e}")
-        return None
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
-
-def record_listening_history(song_id):
-    """Record that the current user listened to a song"""
-    try:
-        # Get current user ID
-        with open("current_user.txt", "r") as f:
-            user_id = f.read().strip()
-            
-        connection = connect_db()
-        if not connection:
-            return
-            
-        cursor = connection.cursor()
-        
-        query = "INSERT INTO Listening_History (user_id, song_id) VALUES (%s, %s)"
-        cursor.execute(query, (user_id, song_id))
-        connection.commit()
-        
-    except Exception as e:
-        print(f"Error recording listening history: {e}")
-    finally:
-        if 'connection' in locals() and connection and connection.is_connected():
-            cursor.close()
-            connection.close()
+        messagebox.showerror("Database Error", f"Failed to load recent songs: {e}")
+        return []
 
 # ------------------- Music Player Functions -------------------
-def play_song(song_id):
-    """Play a song from its binary data in the database"""
-    global current_song
-    
+def play_song(song_id, source=None):
+    """Play a song, queueing the list it was picked from after it"""
     try:
-        # Get song data from database
-        song_data = get_song_data(song_id)
-        if not song_data:
+        # The next songs are prefetched while this one plays
+        if not player.play_song(song_id, source):
             messagebox.showerror("Error", "Could not retrieve song data")
             return False
-            
-        # Get additional song info for display
-        connection = connect_db()
-        if connection:
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute(
-                "SELECT s.title, a.name as artist_name FROM Songs s JOIN Artists a ON s.artist_id = a.artist_id WHERE s.song_id = %s",
-                (song_id,)
-            )
-            song_info = cursor.fetchone()
-            cursor.close()
-            connection.close()
-        else:
-            song_info = {"title": "Unknown", "artist_name": "Unknown"}
-            
-        # Create a temporary file to play the song
-        temp_dir = "temp"
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        temp_file = os.path.join(temp_dir, f"song_{song_id}.{song_data['type']}")
-        
-        # Write binary data to temp file
-        with open(temp_file, 'wb') as f:
-            f.write(song_data['data'])
-            
-        # Load and play the song
-        mixer.music.load(temp_file)
-        mixer.music.play()
-        
-        # Update current song info
-        current_song = {
-            "id": song_id,
-            "title": song_info["title"],
-            "artist": song_info["artist_name"],
-            "playing": True,
-            "paused": False
-        }
-        
-        # Update UI elements
-        if 'now_playing_label' in globals():
-            now_playing_label.configure(text=f"Now Playing: {current_song['title']} - {current_song['artist']}")
-        
-        if 'play_btn' in globals():
-            play_btn.configure(text="⏸️")
-        
-        # Record in listening history
-        record_listening_history(song_id)
-        
         return True
         
     except Exception as e:
@@ -324,43 +146,49 @@ def toggle_play_pause():
         play_btn.configure(text="▶️")
 
 def play_next_song():
-    """Placeholder for playing next song"""
-    messagebox.showinfo("Info", "Next song feature will be implemented with playlists")
+    """Play the next song in the queue"""
+    try:
+        if not player.play_next():
+            messagebox.showinfo("Info", "There is no next song in the queue")
+    except Exception as e:
+        print(f"Error playing next song: {e}")
+        messagebox.showerror("Error", f"Could not play song: {e}")
 
 def play_previous_song():
-    """Placeholder for playing previous song"""
-    messagebox.showinfo("Info", "Previous song feature will be implemented with playlists")
+    """Play the previous song in the queue, or restart the current one"""
+    try:
+        if not player.play_previous():
+            messagebox.showinfo("Info", "There is no previous song in the queue")
+    except Exception as e:
+        print(f"Error playing previous song: {e}")
+        messagebox.showerror("Error", f"Could not play song: {e}")
 
 # ------------------- Navigation Functions -------------------
 def open_home_page():
     """Open the home page"""
     try:
-        subprocess.Popen(["python", "home.py"])
-        root.destroy()
+        router.show_page("home")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open home page: {e}")
 
 def open_playlist_page():
     """Open the playlist page"""
     try:
-        subprocess.Popen(["python", "playlist.py"])
-        root.destroy()
+        router.show_page("playlist")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open playlist page: {e}")
 
 def open_download_page():
     """Open the download page"""
     try:
-        subprocess.Popen(["python", "download.py"])
-        root.destroy()
+        router.show_page("download")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open download page: {e}")
 
 def open_recommend_page():
     """Open the recommendations page"""
     try:
-        subprocess.Popen(["python", "recommend.py"])
-        root.destroy()
+        router.show_page("recommend")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open recommendations page: {e}")
 
@@ -368,40 +196,130 @@ def open_login_page():
     """Logout and open the login page"""
     try:
         # Stop any playing music
-        if mixer.music.get_busy():
-            mixer.music.stop()
+        player.stop()
             
         # Remove current user file
         if os.path.exists("current_user.txt"):
             os.remove("current_user.txt")
             
-        subprocess.Popen(["python", "login.py"])
-        root.destroy()
+        router.show_page("login", reset=True)
     except Exception as e:
         messagebox.showerror("Error", f"Unable to logout: {e}")
 
+# ------------------- Search As You Type -------------------
+SEARCH_DEBOUNCE_MS = 80  # Wait for a pause in typing before searching
+SEARCH_POLL_MS = 15  # How often the UI checks for a finished search
+
+# One worker, so searches never pile up behind each other. It is started
+# with the first search and shut down when the page frame is destroyed.
+search_executor = None
+
+search_state = {
+    "generation": 0,  # Bumped by every new search; older results are dropped
+    "after_id": None,
+    "future": None,
+    "last_query": None,
+    "last_type": None,
+    "last_results": None
+}
+
+def get_search_executor():
+    """Get the search worker, starting it if needed"""
+    global search_executor
+    if search_executor is None:
+        search_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search")
+    return search_executor
+
+def shutdown_search(event=None):
+    """Stop the search worker, dropping searches that have not started"""
+    global search_executor
+    search_state["generation"] += 1  # Results still on their way are stale
+    if search_executor is not None:
+        search_executor.shutdown(wait=False, cancel_futures=True)
+        search_executor = None
+
+def schedule_search(event=None):
+    """Restart the debounce timer after a keystroke"""
+    if search_state["after_id"]:
+        root.after_cancel(search_state["after_id"])
+    search_state["after_id"] = root.after(SEARCH_DEBOUNCE_MS, perform_search)
+
 def perform_search(event=None):
-    """Search for songs and update the search results"""
+    """Search for songs on the worker thread and show the results when done"""
+    if search_state["after_id"]:
+        root.after_cancel(search_state["after_id"])
+        search_state["after_id"] = None
+    
+    # Get search query
+    query = search_entry.get().strip()
+    search_type = search_type_var.get()
+    
+    if query == search_state["last_query"] and search_type == search_state["last_type"]:
+        return  # Results on screen are already current
+    
+    # Cancel the search in flight, if it has not started yet
+    search_state["generation"] += 1
+    generation = search_state["generation"]
+    if search_state["future"]:
+        search_state["future"].cancel()
+    
+    # Refine the previous results when the user extends the query, since
+    # every match of the longer query is also a match of the shorter one
+    within = None
+    previous = search_state["last_results"]
+    if (previous is not None and query and search_state["last_query"]
+            and search_type == search_state["last_type"]
+            and query.startswith(search_state["last_query"])
+            and len(previous) < search_index.MAX_RESULTS):
+        within = [song["song_id"] for song in previous]
+    
+    if query:
+        future = get_search_executor().submit(search_songs, query, search_type, within)
+    else:
+        # If no query, just show recent songs
+        future = get_search_executor().submit(fetch_recent_songs)
+    search_state["future"] = future
+    
+    root.after(SEARCH_POLL_MS, lambda: finish_search(generation, future, query, search_type))
+
+def finish_search(generation, future, query, search_type):
+    """Show a finished search on the UI thread, unless a newer one replaced it"""
+    if generation != search_state["generation"]:
+        return  # Stale search
+    
+    if not future.done():
+        root.after(SEARCH_POLL_MS, lambda: finish_search(generation, future, query, search_type))
+        return
+    
+    try:
+        search_results = future.result()
+    except mysql.connector.Error as err:
+        # Raised on the worker, shown here on the UI thread
+        messagebox.showerror("Database Error", f"Failed to search songs: {err}")
+        search_results = []
+    except Exception as e:
+        print(f"Error searching songs: {e}")
+        search_results = []
+    
+    search_state["future"] = None
+    search_state["last_query"] = query
+    search_state["last_type"] = search_type
+    search_state["last_results"] = search_results if query else None
+    
     # Clear previous search results
     for widget in songs_section.winfo_children():
         if widget != songs_title:  # Keep the section title
             widget.destroy()
     
-    # Get search query
-    query = search_entry.get()
-    
     if not query:
-        # If no query, just show recent songs
-        display_songs(get_recent_songs(), "Recent Songs")
+        display_songs(search_results, "Recent Songs")
         return
     
-    # Perform the search
-    search_results = search_songs(query)
-    
     # Display results
     if search_results:
         display_songs(search_results, f"Search Results for '{query}'")
     else:
+        songs_title.configure(text=f"🔍 Search Results for '{query}'")
         no_results_label = ctk.CTkLabel(
             songs_section, 
             text=f"No songs found for '{query}'", 
@@ -412,6 +330,8 @@ def perform_search(event=None):
 
 def display_songs(songs, section_subtitle=None):
     """Display songs in the search results section"""
+    global results_list
+    
     # Update section subtitle if provided
     if section_subtitle:
         songs_title.configure(text=f"🔍 {section_subtitle}")
@@ -426,69 +346,79 @@ def display_songs(songs, section_subtitle=None):
         no_songs_label.pack(pady=20)
         return
     
-    # Create song rows
-    for song in songs:
-        # Create a frame for each song row
-        song_frame = ctk.CTkFrame(songs_section, fg_color="#1A1A2E", corner_radius=10, height=50)
-        song_frame.pack(fill="x", pady=5)
-        
-        # Format the song display text
-        if "album_name" in song and song["album_name"]:
-            display_text = f"🎵 {song['artist_name']} - {song['title']} ({song['album_name']})"
-        else:
-            display_text = f"🎵 {song['artist_name']} - {song['title']}"
-        
-        # Add duration if available
-        if "duration_formatted" in song:
-            display_text += f" ({song['duration_formatted']})"
-        
-        # Song name and info
-        song_label = ctk.CTkLabel(
-            song_frame, 
-            text=display_text, 
-            font=("Arial", 14), 
-            text_color="white",
-            anchor="w"
-        )
-        song_label.pack(side="left", padx=15, fill="y")
-        
-        # Play button
-        play_icon = ctk.CTkLabel(
-            song_frame, 
-            text="▶️", 
-            font=("Arial", 16), 
-            text_color="#22C55E"
-        )
-        play_icon.pack(side="right", padx=15)
-        
-        # Add play song command
-        song_id = song["song_id"]
-        
-        # Make the whole row clickable
-        song_frame.bind("<Button-1>", lambda e, sid=song_id: play_song(sid))
-        song_label.bind("<Button-1>", lambda e, sid=song_id: play_song(sid))
-        play_icon.bind("<Button-1>", lambda e, sid=song_id: play_song(sid))
+    # Only the visible rows get widgets, however many songs there are
+    results_list = song_list.SongList(songs_section, create_song_row, update_song_row, songs=songs)
+    results_list.pack(fill="both", expand=True)
+
+def create_song_row(parent):
+    """Create a reusable song row for the results list"""
+    song_frame = ctk.CTkFrame(parent, fg_color="#1A1A2E", corner_radius=10, height=50)
+    row = {"frame": song_frame}
+    
+    # Song name and info
+    song_label = ctk.CTkLabel(
+        song_frame, 
+        text="", 
+        font=("Arial", 14), 
+        text_color="white",
+        anchor="w"
+    )
+    song_label.pack(side="left", padx=15, fill="y")
+    
+    # Play button
+    play_icon = ctk.CTkLabel(
+        song_frame, 
+        text="▶️", 
+        font=("Arial", 16), 
+        text_color="#22C55E"
+    )
+    play_icon.pack(side="right", padx=15)
+    
+    # Make the whole row clickable; the row shows a different song as it is recycled
+    for widget in (song_frame, song_label, play_icon):
+        widget.bind("<Button-1>", lambda e: play_song(row["song"]["song_id"], results_list) if row["song"] else None)
+    
+    row["label"] = song_label
+    return row
+
+def update_song_row(row, song, index):
+    """Show a song in a recycled results row"""
+    # Format the song display text
+    if "album_name" in song and song["album_name"]:
+        display_text = f"🎵 {song['artist_name']} - {song['title']} ({song['album_name']})"
+    else:
+        display_text = f"🎵 {song['artist_name']} - {song['title']}"
+    
+    # Add duration if available
+    if "duration_formatted" in song:
+        display_text += f" ({song['duration_formatted']})"
+    
+    row["label"].configure(text=display_text)
 
 # ------------------- Initialize App -------------------
-try:
+WINDOW_TITLE = "Online Music System - Search Songs"
+WINDOW_SIZE = "1000x600"
+
+def on_show():
+    """Refresh the player controls when returning to this page"""
+    player.sync_controls(now_playing_label, play_btn)
+
+def build_page(parent):
+    """Build the search page inside the app shell"""
+    global root, now_playing_label, play_btn, search_entry, search_type_var, songs_section, songs_title
+
     # Get current user info
     user = get_current_user()
     if not user:
         # Redirect to login if not logged in
         open_login_page()
-        exit()
-
-    # ---------------- Initialize App ----------------
-    ctk.set_appearance_mode("dark")  # Dark mode
-    ctk.set_default_color_theme("blue")  # Default theme
+        return False
 
-    root = ctk.CTk()
-    root.title("Online Music System - Search Songs")
-    root.geometry("1000x600")  # Adjusted to match the image proportions
-    root.resizable(False, False)
+    root = router.root
+    parent.bind("<Destroy>", shutdown_search)  # Logout or closing the window
 
     # ---------------- Main Frame ----------------
-    main_frame = ctk.CTkFrame(root, fg_color="#1E1E2E", corner_radius=15)
+    main_frame = ctk.CTkFrame(parent, fg_color="#1E1E2E", corner_radius=15)
     main_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
     # ---------------- Sidebar Navigation ----------------
@@ -595,6 +525,7 @@ try:
         text="All", 
         variable=search_type_var, 
         value="all",
+        command=perform_search,
         fg_color="#B146EC",
         text_color="#A0A0A0"
     )
@@ -605,6 +536,7 @@ try:
         text="Songs", 
         variable=search_type_var, 
         value="song",
+        command=perform_search,
         fg_color="#B146EC",
         text_color="#A0A0A0"
     )
@@ -615,6 +547,7 @@ try:
         text="Artists", 
         variable=search_type_var, 
         value="artist",
+        command=perform_search,
         fg_color="#B146EC",
         text_color="#A0A0A0"
     )
@@ -625,6 +558,7 @@ try:
         text="Albums", 
         variable=search_type_var, 
         value="album",
+        command=perform_search,
         fg_color="#B146EC",
         text_color="#A0A0A0"
     )
@@ -638,7 +572,8 @@ try:
                               height=45, corner_radius=10)
     search_entry.pack(side="left", fill="x", expand=True)
     
-    # Bind Enter key to search
+    # Search as the user types; Enter searches immediately
+    search_entry.bind("<KeyRelease>", schedule_search)
     search_entry.bind("<Return>", perform_search)
     
     # Search button
@@ -667,12 +602,8 @@ try:
     # Show recent songs on initial load
     display_songs(get_recent_songs(), "Recent Songs")
 
-    # ---------------- Run Application ----------------
-    root.mainloop()
-    
-except Exception as e:
-    import traceback
-    print(f"Error in search.py: {e}")
-    traceback.print_exc()
-    messagebox.showerror("Error", f"An error occurred: {e}")
-    input("Press Enter to exit...")  # This keeps console open
\ No newline at end of file
+    return True
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    router.run("search")
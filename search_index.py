@@ -0,0 +1,256 @@
+import bisect
+import re
+import threading
+import time
+import unicodedata
+
+import mysql.connector
+
+import catalogue
+import db
+
+# ------------------- Index Settings -------------------
+# Relevance weight of a match in each field
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "artist": 2.0,
+    "album": 1.0
+}
+PREFIX_MATCH_FACTOR = 0.5  # A prefix match counts half as much as a whole word
+REFRESH_INTERVAL = 60  # Seconds between checks for songs added elsewhere
+MAX_RESULTS = 1000
+
+# Names are filled in from the catalogue cache rather than joined
+SONG_QUERY = """
+SELECT s.song_id, s.title, s.artist_id, s.album_id, s.genre_id, s.duration
+FROM Songs s
+"""
+
+# song_id -> song row as returned by SONG_QUERY
+_songs = {}
+# token -> {song_id: {field, ...}}
+_postings = {}
+# Every indexed token, sorted, for prefix lookups
+_tokens = []
+_last_song_id = 0
+_last_refresh = 0.0
+_built = False
+_lock = threading.RLock()
+
+# ------------------- Tokenization -------------------
+def fold(text):
+    """Lowercase text and strip accents so 'Beyoncé' matches 'beyonce'"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+def tokenize(text):
+    """Split text into folded word tokens"""
+    return re.findall(r"\w+", fold(text))
+
+def _song_fields(song):
+    """Get the searchable text of a song by field"""
+    return {
+        "title": song["title"],
+        "artist": song["artist_name"],
+        "album": song["album_name"]
+    }
+
+# ------------------- Index Maintenance -------------------
+def _index_song(song):
+    """Add a song row to the index, replacing any previous version"""
+    global _last_song_id
+
+    song_id = song["song_id"]
+    if song_id in _songs:
+        _unindex_song(song_id)
+
+    _songs[song_id] = song
+    _last_song_id = max(_last_song_id, song_id)
+
+    for field, text in _song_fields(song).items():
+        for token in tokenize(text):
+            postings = _postings.get(token)
+            if postings is None:
+                postings = _postings[token] = {}
+                bisect.insort(_tokens, token)
+            postings.setdefault(song_id, set()).add(field)
+
+def _unindex_song(song_id):
+    """Remove a song from the index"""
+    song = _songs.pop(song_id, None)
+    if song is None:
+        return
+
+    for text in _song_fields(song).values():
+        for token in tokenize(text):
+            postings = _postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(song_id, None)
+            if not postings:
+                del _postings[token]
+                del _tokens[bisect.bisect_left(_tokens, token)]
+
+def _fetch_songs(where="", params=()):
+    """Fetch song rows for indexing"""
+    return catalogue.resolve(db.fetch_all(SONG_QUERY + where, params))
+
+def build():
+    """Build the index from the whole Songs table"""
+    global _built, _last_refresh, _last_song_id, _tokens
+
+    songs = _fetch_songs()
+
+    with _lock:
+        _songs.clear()
+        _postings.clear()
+        _tokens = []
+
+        for song in songs:
+            song_id = song["song_id"]
+            _songs[song_id] = song
+            for field, text in _song_fields(song).items():
+                for token in tokenize(text):
+                    _postings.setdefault(token, {}).setdefault(song_id, set()).add(field)
+
+        # Sorting once is much cheaper than insort per token on a big catalogue
+        _tokens = sorted(_postings)
+        _last_song_id = max(_songs, default=0)
+        _last_refresh = time.time()
+        _built = True
+
+def refresh():
+    """Index songs added since the last build, e.g. by another process"""
+    global _last_refresh
+
+    with _lock:
+        last_song_id = _last_song_id
+
+    songs = _fetch_songs("WHERE s.song_id > %s", (last_song_id,))
+
+    with _lock:
+        for song in songs:
+            _index_song(song)
+        _last_refresh = time.time()
+
+def _ensure_current():
+    """Build the index on first use and pick up new songs periodically"""
+    if not _built:
+        build()
+    elif time.time() - _last_refresh > REFRESH_INTERVAL:
+        refresh()
+
+def add_song(song_id):
+    """Index or re-index one song, e.g. right after it was uploaded"""
+    if not _built:
+        return  # It will be picked up when the index is first built
+
+    try:
+        songs = _fetch_songs("WHERE s.song_id = %s", (song_id,))
+    except mysql.connector.Error as e:
+        # The periodic refresh will pick the song up instead
+        print(f"Error indexing song {song_id}: {e}")
+        return
+
+    with _lock:
+        if songs:
+            _index_song(songs[0])
+        else:
+            _unindex_song(song_id)
+
+def remove_song(song_id):
+    """Drop a deleted song from the index"""
+    with _lock:
+        _unindex_song(song_id)
+
+# ------------------- Searching -------------------
+def _matching_tokens(term):
+    """Get index tokens equal to or starting with a query term"""
+    start = bisect.bisect_left(_tokens, term)
+    end = start
+    while end < len(_tokens) and _tokens[end].startswith(term):
+        end += 1
+    return _tokens[start:end]
+
+def _score_song(song, terms, fields):
+    """Score one song against query terms, or None if a term does not match"""
+    # Same weighting as the postings: token -> total weight of its fields
+    token_weights = {}
+    for field, text in _song_fields(song).items():
+        if field in fields:
+            for token in set(tokenize(text)):
+                token_weights[token] = token_weights.get(token, 0) + FIELD_WEIGHTS[field]
+
+    score = 0
+    for term in terms:
+        best = 0
+        for token, weight in token_weights.items():
+            if token.startswith(term):
+                factor = 1.0 if token == term else PREFIX_MATCH_FACTOR
+                best = max(best, factor * weight)
+        if not best:
+            return None
+        score += best
+    return score
+
+def search(query, search_type="all", limit=MAX_RESULTS, within=None):
+    """Search songs by title, artist or album, best matches first
+
+    Every query word must match (as a whole word or a word prefix) in one
+    of the searched fields. search_type is "all", "song", "artist" or
+    "album". within restricts the search to the given song IDs, which is
+    much cheaper when refining a previous result set.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return []
+
+    if search_type == "song":
+        fields = {"title"}
+    elif search_type in ("artist", "album"):
+        fields = {search_type}
+    else:
+        fields = set(FIELD_WEIGHTS)
+
+    try:
+        _ensure_current()
+    except mysql.connector.Error as e:
+        print(f"Error building search index: {e}")
+        return []
+
+    with _lock:
+        if within is not None:
+            scores = {}
+            for song_id in within:
+                song = _songs.get(song_id)
+                score = song and _score_song(song, terms, fields)
+                if score:
+                    scores[song_id] = score
+            return _ranked(scores, limit)
+
+        scores = None
+        for term in terms:
+            term_scores = {}
+            for token in _matching_tokens(term):
+                factor = 1.0 if token == term else PREFIX_MATCH_FACTOR
+                for song_id, song_fields in _postings[token].items():
+                    weight = sum(FIELD_WEIGHTS[f] for f in song_fields & fields)
+                    if weight and factor * weight > term_scores.get(song_id, 0):
+                        term_scores[song_id] = factor * weight
+
+            # Keep only songs matching every term so far
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {song_id: score + term_scores[song_id]
+                          for song_id, score in scores.items() if song_id in term_scores}
+
+            if not scores:
+                return []
+
+        return _ranked(scores, limit)
+
+def _ranked(scores, limit):
+    """Get copies of the best scoring songs, ties broken by title"""
+    ranked = sorted(scores, key=lambda song_id: (-scores[song_id], fold(_songs[song_id]["title"]), song_id))
+    return [dict(_songs[song_id]) for song_id in ranked[:limit]]
@@ -1,21 +1,16 @@
 import customtkinter as ctk
 from tkinter import messagebox
 import mysql.connector
+import db
+import router
 import hashlib
-import subprocess  # To open login.py
 import os
 
 # ------------------- Database Connection -------------------
 def connect_db():
-    """Connect to the MySQL database"""
+    """Get a pooled connection to the MySQL database"""
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",  # Replace with your MySQL username
-            password="new_password",  # Replace with your MySQL password
-            database="online_music_system"  # Replace with your database name
-        )
-        return connection
+        return db.connect_db()
     except mysql.connector.Error as err:
         messagebox.showerror("Database Connection Error", 
                             f"Failed to connect to database: {err}")
@@ -110,16 +105,14 @@ def signup_user():
     except mysql.connector.Error as err:
         messagebox.showerror("Database Error", str(err))
     finally:
-        if connection and connection.is_connected():
-            cursor.close()
+        if 'connection' in locals() and connection:
             connection.close()
 
 # ------------------- Open Login Page -------------------
 def open_login_page():
     """Open the login page and close the signup page"""
     try:
-        subprocess.Popen(["python", "login.py"])  # Open login.py after successful signup
-        root.destroy()  # Close the current signup window
+        router.show_page("login")
     except Exception as e:
         messagebox.showerror("Error", f"Unable to open login page: {e}")
 
@@ -198,21 +191,24 @@ def adjust_layout_for_resolution(event=None):
     content_frame.pack_configure(padx=int(40 * width_scale), pady=int(40 * height_scale))
 
 # ----------------- Setup UI -----------------
-try:
+WINDOW_TITLE = "Online Music System - Sign Up"
+WINDOW_SIZE = "700x500"  # Default starting size
+WINDOW_RESIZABLE = True
+APPEARANCE_MODE = "light"
+
+def build_page(parent):
+    """Build the sign up page inside the app shell"""
+    global root, left_frame, title_label, desc_label, bird_label, right_frame, content_frame, right_title_label, subtitle_label, fullname_entry, email_entry, password_entry, confirm_password_entry
+
     # Create temp directory for temporary files if it doesn't exist
     os.makedirs("temp", exist_ok=True)
     
-    ctk.set_appearance_mode("light")  # Light Mode
-    ctk.set_default_color_theme("blue")
-
     # Main window
-    root = ctk.CTk()
-    root.title("Online Music System - Sign Up")
-    root.geometry("700x500")  # Default starting size
+    root = router.root
     root.minsize(500, 400)    # Minimum functional size
     
     # Main Frame with rounded corners
-    main_frame = ctk.CTkFrame(root, corner_radius=20)
+    main_frame = ctk.CTkFrame(parent, corner_radius=20)
     main_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
     # Left Side - Branding with purple color
@@ -353,17 +349,14 @@ try:
     login_label.bind("<Button-1>", lambda e: open_login_page())
     
     # Set up the window resize event binding
-    root.bind("<Configure>", adjust_layout_for_resolution)
+    parent.bind("<Configure>", adjust_layout_for_resolution)
     
     # Initial layout adjustment after rendering
     root.update_idletasks()
     adjust_layout_for_resolution()
 
-    # Run the application
-    root.mainloop()
-    
-except Exception as e:
-    import traceback
-    print(f"Error: {e}")
-    traceback.print_exc()
-    input("Press Enter to exit...")  # This keeps the console open
\ No newline at end of file
+    return True
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    router.run("signup")
@@ -0,0 +1,137 @@
+import hashlib
+import os
+
+import mutagen
+from mutagen.mp3 import MP3
+from mutagen.flac import FLAC
+from mutagen.wave import WAVE
+
+import audio_store
+import db
+
+# ------------------- Streaming Settings -------------------
+# Audio is read in fixed-size pieces so memory stays flat however large the
+# song is. Legacy songs whose audio is still in Songs.file_data are read
+# with ranged SUBSTRING queries; each piece must fit in max_allowed_packet.
+CHUNK_SIZE = audio_store.CHUNK_SIZE
+
+SOURCE_QUERY = """
+SELECT s.song_id, s.title, a.name as artist_name, s.audio_key, s.file_type,
+       LENGTH(s.file_data) as blob_size
+FROM Songs s
+LEFT JOIN Artists a ON s.artist_id = a.artist_id
+WHERE s.song_id = %s
+"""
+
+# Mutagen parser for each known file type; others are sniffed by mutagen.File
+PROBES = {
+    "mp3": MP3,
+    "flac": FLAC,
+    "wav": WAVE,
+    "wave": WAVE
+}
+
+# Where each song field lives: Vorbis comment name (FLAC) or ID3 frame (MP3, WAV)
+TAG_KEYS = {
+    "title": ("title", "TIT2"),
+    "artist": ("artist", "TPE1"),
+    "album": ("album", "TALB"),
+    "genre": ("genre", "TCON")
+}
+
+# ------------------- Reading -------------------
+def get_song_source(song_id):
+    """Get where a song's audio lives, without fetching the audio itself"""
+    return db.fetch_one(SOURCE_QUERY, (song_id,))
+
+def iter_chunks(source, chunk_size=CHUNK_SIZE):
+    """Yield a song's audio in chunks, from the audio store or the database"""
+    if source["audio_key"]:
+        with audio_store.open_audio(source["audio_key"]) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    # Not yet migrated: read the blob a range at a time on one connection
+    with db.pooled_connection() as connection:
+        query = "SELECT SUBSTRING(file_data, %s, %s) FROM Songs WHERE song_id = %s"
+        cursor = db.prepared_cursor(connection, query, dictionary=False)
+        for offset in range(0, source["blob_size"] or 0, chunk_size):
+            cursor.execute(query, (offset + 1, chunk_size, source["song_id"]))
+            chunk = cursor.fetchone()[0]
+            if not chunk:
+                return
+            yield bytes(chunk)
+
+def copy_to(source, target):
+    """Stream a song into a writable binary file, returning (size, sha256)"""
+    sha256 = hashlib.sha256()
+    size = 0
+
+    for chunk in iter_chunks(source):
+        target.write(chunk)
+        sha256.update(chunk)
+        size += len(chunk)
+
+    return size, sha256.hexdigest()
+
+# ------------------- Ingesting -------------------
+def probe_audio(source, file_type):
+    """Parse an audio file's metadata with mutagen, or None if it cannot be read"""
+    probe = PROBES.get(file_type, mutagen.File)
+    try:
+        return probe(source)
+    except Exception as e:
+        print(f"Error reading audio metadata: {e}")
+        return None
+
+def read_tags(audio):
+    """Get the title, artist, album and genre tags a probed file has"""
+    tags = {}
+    if audio is None or not audio.tags:
+        return tags
+
+    for field, keys in TAG_KEYS.items():
+        for key in keys:
+            value = audio.tags.get(key)
+            if value is None:
+                continue
+            # ID3 frames hold a list in .text (genres decoded in .genres),
+            # Vorbis comments are a plain list
+            value = getattr(value, "genres", None) or getattr(value, "text", value)
+            if isinstance(value, list):
+                value = value[0] if value else ""
+            value = str(value).strip()
+            if value:
+                tags[field] = value
+                break
+
+    return tags
+
+def ingest_file(file_path):
+    """Copy an audio file into the store in one streaming pass
+
+    The file is opened once: mutagen reads the headers it needs for the
+    duration, then the handle is rewound and streamed into the store chunk
+    by chunk while it is hashed. Returns a dict with audio_key, file_size,
+    file_type, duration and whatever tags the file has. Only CHUNK_SIZE bytes
+    are held in memory at a time, however large the file is.
+    """
+    file_type = os.path.splitext(file_path)[1][1:].lower()  # Extension without dot
+
+    with open(file_path, "rb") as source:
+        audio = probe_audio(source, file_type)
+        duration = int(audio.info.length) if audio is not None and audio.info else 0
+
+        source.seek(0)
+        audio_key, file_size = audio_store.put_chunks(iter(lambda: source.read(CHUNK_SIZE), b""))
+
+    return {
+        "audio_key": audio_key,
+        "file_size": file_size,
+        "file_type": file_type,
+        "duration": duration,
+        "tags": read_tags(audio)
+    }
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+
+import catalogue
+import db
+import playback_cache
+import song_audio
+
+# ------------------- Handle Settings -------------------
+# A song handle is one dict with everything needed to show and play a
+# song: its display metadata plus where its audio lives (the same fields
+# song_audio.get_song_source() returns). Handles are cached by song_id, so
+# playing a song already seen costs no query at all, and the audio is only
+# read when the playback cache misses.
+MAX_HANDLES = 2000
+HANDLE_TTL = 300  # Seconds before a handle is re-read, for edits made elsewhere
+
+HANDLE_QUERY = """
+SELECT s.song_id, s.title, s.artist_id, s.genre_id, s.duration,
+       s.audio_key, s.file_type, LENGTH(s.file_data) as blob_size
+FROM Songs s
+WHERE s.song_id = %s
+"""
+
+# song_id -> (loaded_at, handle), least recently used first
+_handles = OrderedDict()
+_lock = threading.Lock()
+
+# ------------------- Handles -------------------
+def get_song(song_id):
+    """Get a song's handle, querying the database only when it is not cached"""
+    now = time.monotonic()
+
+    with _lock:
+        cached = _handles.get(song_id)
+        if cached is not None and now - cached[0] < HANDLE_TTL:
+            _handles.move_to_end(song_id)
+            return cached[1]
+
+    song = db.fetch_one(HANDLE_QUERY, (song_id,))
+    if song is None:
+        invalidate(song_id)
+        return None
+    catalogue.resolve([song])
+
+    with _lock:
+        _handles[song_id] = (now, song)
+        _handles.move_to_end(song_id)
+        while len(_handles) > MAX_HANDLES:
+            _handles.popitem(last=False)
+
+    return song
+
+def invalidate(song_id, audio_changed=False):
+    """Forget a song's handle after it was edited, and its cached audio too if that changed"""
+    with _lock:
+        _handles.pop(song_id, None)
+
+    if audio_changed:
+        playback_cache.invalidate(song_id)
+
+def clear():
+    """Forget every cached handle"""
+    with _lock:
+        _handles.clear()
+
+# ------------------- Audio -------------------
+def song_file(song):
+    """Get a playable file for a song handle, streaming the audio only on a cache miss
+
+    A miss returns once the cache file is complete; player.py loads queued
+    tracks on its prefetch worker so that wait overlaps the current song.
+    """
+    # A cached copy of different audio than the handle names is a miss
+    song_file = playback_cache.lookup(song["song_id"], song["audio_key"])
+    if song_file:
+        return song_file
+
+    return playback_cache.put_stream(song["song_id"], song["file_type"],
+                                     song_audio.iter_chunks(song), song["audio_key"])
@@ -0,0 +1,145 @@
+import math
+import tkinter as tk
+
+import customtkinter as ctk
+
+# ------------------- List Settings -------------------
+ROW_HEIGHT = 50
+PAGE_SIZE = 50  # Rows fetched per lazy page
+PREFETCH_ROWS = 20  # Fetch the next page when this close to the end
+SCROLL_STEP = 3  # Rows moved per mouse wheel notch
+
+class SongList(ctk.CTkFrame):
+    """Scrollable song list that only creates widgets for the visible rows
+
+    Row widgets are pooled and recycled while scrolling, so a list of
+    thousands of songs costs the same as a screenful. The page supplies:
+
+    - create_row(parent) -> dict with at least a "frame" widget
+    - update_row(row, song, index) to show a song in a recycled row;
+      row["song"] and row["index"] are set before it is called
+    - fetch_page(last_song, limit), optional, to load further songs
+      lazily; last_song is the last loaded song (None for the first page)
+      so the query can continue with keyset pagination
+    """
+
+    def __init__(self, parent, create_row, update_row, songs=None, fetch_page=None,
+                 row_height=ROW_HEIGHT, page_size=PAGE_SIZE, fg_color="#131B2E", **kwargs):
+        super().__init__(parent, fg_color=fg_color, **kwargs)
+
+        self.create_row = create_row
+        self.update_row = update_row
+        self.row_height = row_height
+        self.page_size = page_size
+
+        self.songs = []
+        self.fetch_page = None
+        self.has_more = False
+        self.rows = []  # Pooled row widgets
+
+        # Scroll in pixels so rows can be placed at exact offsets
+        self.canvas = tk.Canvas(self, bg=self._apply_appearance_mode(self.cget("fg_color")),
+                                highlightthickness=0, bd=0, yscrollincrement=1)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.on_scrollbar)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        self.canvas.bind("<Configure>", lambda e: self.render())
+        self.bind_scroll(self.canvas)
+
+        self.set_songs(songs or [], fetch_page)
+
+    # ---------------- Data ----------------
+    def set_songs(self, songs, fetch_page=None):
+        """Replace the list contents, optionally loading further pages lazily"""
+        self.songs = list(songs)
+        self.fetch_page = fetch_page
+        self.has_more = fetch_page is not None
+
+        if fetch_page is not None and not self.songs:
+            self.load_more()
+
+        self.canvas.yview_moveto(0)
+        self.render()
+
+    def load_more(self):
+        """Fetch the next page of songs, if there is one"""
+        if not self.has_more:
+            return
+
+        last_song = self.songs[-1] if self.songs else None
+        page = self.fetch_page(last_song, self.page_size)
+
+        self.songs.extend(page)
+        self.has_more = len(page) == self.page_size
+
+    def refresh(self):
+        """Redraw the visible rows, e.g. after a selection change"""
+        self.render(force=True)
+
+    # ---------------- Scrolling ----------------
+    def bind_scroll(self, widget):
+        """Scroll the list with the mouse wheel over a widget"""
+        widget.bind("<MouseWheel>", lambda e: self.scroll_rows(-SCROLL_STEP if e.delta > 0 else SCROLL_STEP))
+        widget.bind("<Button-4>", lambda e: self.scroll_rows(-SCROLL_STEP))
+        widget.bind("<Button-5>", lambda e: self.scroll_rows(SCROLL_STEP))
+
+    def scroll_rows(self, rows):
+        """Scroll by a number of rows"""
+        self.canvas.yview_scroll(rows * self.row_height, "units")
+        self.render()
+
+    def on_scrollbar(self, *args):
+        """Handle the scrollbar being dragged or clicked"""
+        self.canvas.yview(*args)
+        self.render()
+
+    # ---------------- Rendering ----------------
+    def render(self, force=False):
+        """Place pooled rows over the songs currently in view"""
+        height = max(self.canvas.winfo_height(), self.row_height)
+        width = self.canvas.winfo_width()
+
+        # A placeholder row at the end shows there is more to load
+        total_rows = len(self.songs) + (1 if self.has_more else 0)
+        total_height = total_rows * self.row_height
+        self.canvas.configure(scrollregion=(0, 0, width, total_height))
+
+        top = self.canvas.canvasy(0)
+        first_index = max(0, int(top // self.row_height))
+        visible_rows = math.ceil(height / self.row_height) + 1
+
+        # Load the next page before the user reaches the end
+        if self.has_more and first_index + visible_rows + PREFETCH_ROWS >= len(self.songs):
+            self.load_more()
+            total_rows = len(self.songs) + (1 if self.has_more else 0)
+            self.canvas.configure(scrollregion=(0, 0, width, total_rows * self.row_height))
+
+        # Grow the pool to cover the viewport; it never needs more rows than that
+        while len(self.rows) < visible_rows:
+            row = self.create_row(self.canvas)
+            row["song"] = None
+            row["index"] = None
+            row["window"] = self.canvas.create_window(0, 0, window=row["frame"], anchor="nw",
+                                                      height=self.row_height - 4, state="hidden")
+            for widget in [row["frame"]] + row["frame"].winfo_children():
+                self.bind_scroll(widget)
+            self.rows.append(row)
+
+        for offset, row in enumerate(self.rows):
+            index = first_index + offset
+            if offset >= visible_rows or index >= len(self.songs):
+                self.canvas.itemconfigure(row["window"], state="hidden")
+                row["song"] = None
+                row["index"] = None
+                continue
+
+            self.canvas.coords(row["window"], 0, index * self.row_height + 2)
+            self.canvas.itemconfigure(row["window"], width=width, state="normal")
+
+            song = self.songs[index]
+            if force or row["song"] is not song:
+                row["song"] = song
+                row["index"] = index
+                self.update_row(row, song, index)
@@ -0,0 +1,362 @@
+import datetime
+import functools
+import re
+import sqlite3
+
+import mysql.connector
+
+# ------------------- SQLite Settings -------------------
+# An embedded alternative to the MySQL server for single-user and offline
+# installs (set MUSIC_DB_BACKEND=sqlite, see db.py). The app's queries are
+# written for MySQL, so this module hands out connections that look like
+# mysql.connector ones: %s placeholders, dictionary cursors, and
+# mysql.connector errors. It also translates the few MySQL-only constructs
+# the queries use. Audio already lives outside the database in the on-disk
+# audio store, so it needs nothing here.
+#
+# Setup-time code that reads information_schema, partitions or takes
+# server locks stays MySQL-only; create_schema() builds the equivalent
+# tables, with every migrated index, in one step instead. The same goes
+# for the maintenance tools: generate_data.py, benchmark.py and
+# migrate_audio.py refuse to run (db.require_mysql()), and migrations.py
+# and history_retention.py have nothing to do.
+DATABASE_FILE = "online_music_system.db"
+BUSY_TIMEOUT = 5.0  # Seconds a writer waits for another connection's lock
+
+# Store and read timestamps as the 'YYYY-MM-DD HH:MM:SS' local time MySQL uses
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" ", "seconds"))
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DATE", lambda value: datetime.date.fromisoformat(value.decode()))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    first_name VARCHAR(50) NOT NULL,
+    last_name VARCHAR(50) NOT NULL,
+    email VARCHAR(100) NOT NULL UNIQUE COLLATE NOCASE,
+    password VARCHAR(64) NOT NULL,
+    is_admin BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS Artists (
+    artist_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL,
+    bio TEXT,
+    image_url VARCHAR(255)
+);
+
+CREATE TABLE IF NOT EXISTS Albums (
+    album_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title VARCHAR(100) NOT NULL,
+    artist_id INT REFERENCES Artists(artist_id) ON DELETE SET NULL,
+    release_year INT,
+    cover_art BLOB
+);
+
+CREATE TABLE IF NOT EXISTS Genres (
+    genre_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(50) NOT NULL UNIQUE COLLATE NOCASE
+);
+
+CREATE TABLE IF NOT EXISTS Songs (
+    song_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title VARCHAR(100) NOT NULL,
+    artist_id INT REFERENCES Artists(artist_id) ON DELETE SET NULL,
+    album_id INT REFERENCES Albums(album_id) ON DELETE SET NULL,
+    genre_id INT REFERENCES Genres(genre_id) ON DELETE SET NULL,
+    audio_key CHAR(64),
+    duration INT,
+    file_data BLOB,
+    file_type VARCHAR(10) NOT NULL,
+    file_size INT NOT NULL,
+    upload_date TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_songs_audio_key ON Songs (audio_key);
+CREATE INDEX IF NOT EXISTS idx_songs_upload_date ON Songs (upload_date);
+
+CREATE TABLE IF NOT EXISTS Audio_Objects (
+    audio_key CHAR(64) PRIMARY KEY,
+    size BIGINT NOT NULL,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_audio_objects_ref_count ON Audio_Objects (ref_count);
+
+CREATE TABLE IF NOT EXISTS Playlists (
+    playlist_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NULL REFERENCES Users(user_id) ON DELETE CASCADE,
+    name VARCHAR(100) NOT NULL,
+    description TEXT,
+    is_system BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS Playlist_Songs (
+    playlist_id INT NOT NULL REFERENCES Playlists(playlist_id) ON DELETE CASCADE,
+    song_id INT NOT NULL REFERENCES Songs(song_id) ON DELETE CASCADE,
+    position INT NOT NULL,
+    added_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    PRIMARY KEY (playlist_id, song_id)
+);
+CREATE INDEX IF NOT EXISTS idx_playlist_songs_position ON Playlist_Songs (playlist_id, position, song_id);
+
+CREATE TABLE IF NOT EXISTS User_Favorites (
+    user_id INT NOT NULL REFERENCES Users(user_id) ON DELETE CASCADE,
+    song_id INT NOT NULL REFERENCES Songs(song_id) ON DELETE CASCADE,
+    added_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    PRIMARY KEY (user_id, song_id)
+);
+
+CREATE TABLE IF NOT EXISTS Listening_History (
+    history_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL REFERENCES Users(user_id) ON DELETE CASCADE,
+    song_id INT NOT NULL REFERENCES Songs(song_id) ON DELETE CASCADE,
+    played_at TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_listening_history_played_at ON Listening_History (played_at, song_id);
+CREATE INDEX IF NOT EXISTS idx_listening_history_user_played ON Listening_History (user_id, played_at, song_id);
+CREATE INDEX IF NOT EXISTS idx_listening_history_song_played ON Listening_History (song_id, played_at);
+
+CREATE TABLE IF NOT EXISTS Listening_History_Daily (
+    user_id INT NOT NULL,
+    song_id INT NOT NULL,
+    play_date DATE NOT NULL,
+    plays INT NOT NULL,
+    last_played_at TIMESTAMP NULL,
+    PRIMARY KEY (user_id, song_id, play_date)
+);
+CREATE INDEX IF NOT EXISTS idx_listening_daily_song ON Listening_History_Daily (song_id, play_date);
+
+CREATE TABLE IF NOT EXISTS Song_Play_Counts (
+    song_id INTEGER PRIMARY KEY REFERENCES Songs(song_id) ON DELETE CASCADE,
+    total_plays INT NOT NULL DEFAULT 0,
+    plays_1d INT NOT NULL DEFAULT 0,
+    plays_7d INT NOT NULL DEFAULT 0,
+    plays_30d INT NOT NULL DEFAULT 0,
+    last_played_at TIMESTAMP NULL
+);
+CREATE INDEX IF NOT EXISTS idx_play_counts_total ON Song_Play_Counts (total_plays DESC, song_id);
+CREATE INDEX IF NOT EXISTS idx_play_counts_1d ON Song_Play_Counts (plays_1d DESC, song_id);
+CREATE INDEX IF NOT EXISTS idx_play_counts_7d ON Song_Play_Counts (plays_7d DESC, song_id);
+CREATE INDEX IF NOT EXISTS idx_play_counts_30d ON Song_Play_Counts (plays_30d DESC, song_id);
+
+-- See system_stats.py; SQLite runs triggers for cascaded deletes too
+CREATE TABLE IF NOT EXISTS System_Counters (
+    name VARCHAR(32) PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO System_Counters (name, value) SELECT 'users', COUNT(*) FROM Users;
+INSERT OR IGNORE INTO System_Counters (name, value) SELECT 'songs', COUNT(*) FROM Songs;
+INSERT OR IGNORE INTO System_Counters (name, value) SELECT 'playlists', COUNT(*) FROM Playlists;
+INSERT OR IGNORE INTO System_Counters (name, value) SELECT 'plays', COALESCE(SUM(total_plays), 0) FROM Song_Play_Counts;
+CREATE TRIGGER IF NOT EXISTS trg_users_count_insert AFTER INSERT ON Users BEGIN
+    UPDATE System_Counters SET value = value + 1 WHERE name = 'users';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_users_count_delete AFTER DELETE ON Users BEGIN
+    UPDATE System_Counters SET value = value - 1 WHERE name = 'users';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_songs_count_insert AFTER INSERT ON Songs BEGIN
+    UPDATE System_Counters SET value = value + 1 WHERE name = 'songs';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_songs_count_delete BEFORE DELETE ON Songs BEGIN
+    UPDATE System_Counters SET value = value - 1 WHERE name = 'songs';
+    UPDATE System_Counters
+    SET value = value - COALESCE((SELECT total_plays FROM Song_Play_Counts WHERE song_id = OLD.song_id), 0)
+    WHERE name = 'plays';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_playlists_count_insert AFTER INSERT ON Playlists BEGIN
+    UPDATE System_Counters SET value = value + 1 WHERE name = 'playlists';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_playlists_count_delete AFTER DELETE ON Playlists BEGIN
+    UPDATE System_Counters SET value = value - 1 WHERE name = 'playlists';
+END;
+"""
+
+# ------------------- SQL Translation -------------------
+_INTERVAL_UNITS = {"SECOND": "seconds", "MINUTE": "minutes", "HOUR": "hours", "DAY": "days", "MONTH": "months"}
+_NOW_MINUS_INTERVAL = re.compile(r"NOW\(\)\s*-\s*INTERVAL\s+(%s|\d+)\s+(SECOND|MINUTE|HOUR|DAY|MONTH)\b", re.IGNORECASE)
+_UPSERT = re.compile(r"ON\s+DUPLICATE\s+KEY\s+UPDATE", re.IGNORECASE)
+_UPSERT_VALUES = re.compile(r"VALUES\((\w+)\)", re.IGNORECASE)
+
+def _replace_concat(sql):
+    """Rewrite CONCAT(a, b, ...) as (a || b || ...)"""
+    while True:
+        match = re.search(r"\bCONCAT\(", sql, re.IGNORECASE)
+        if match is None:
+            return sql
+
+        # Split the arguments on top-level commas
+        depth, quote, args, start = 1, None, [], match.end()
+        for i in range(match.end(), len(sql)):
+            char = sql[i]
+            if quote:
+                if char == quote:
+                    quote = None
+            elif char in "'\"":
+                quote = char
+            elif char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+                if depth == 0:
+                    args.append(sql[start:i].strip())
+                    break
+            elif char == "," and depth == 1:
+                args.append(sql[start:i].strip())
+                start = i + 1
+        sql = f"{sql[:match.start()]}({' || '.join(args)}){sql[i + 1:]}"
+
+@functools.lru_cache(maxsize=512)
+def translate(sql):
+    """Turn a MySQL query from this app into its SQLite equivalent"""
+    sql = re.sub(r"\s+FOR\s+UPDATE\b", "", sql, flags=re.IGNORECASE)
+    sql = _NOW_MINUS_INTERVAL.sub(
+        lambda m: f"datetime('now', 'localtime', '-' || {m.group(1)} || ' {_INTERVAL_UNITS[m.group(2).upper()]}')", sql
+    )
+    sql = re.sub(r"\bNOW\(\)", "datetime('now', 'localtime')", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bRAND\(\)", "RANDOM()", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bGREATEST\(", "MAX(", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bLEAST\(", "MIN(", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bINSERT\s+IGNORE\b", "INSERT OR IGNORE", sql, flags=re.IGNORECASE)
+    sql = _replace_concat(sql)
+
+    # ON DUPLICATE KEY UPDATE c = VALUES(c) -> ON CONFLICT DO UPDATE SET c = excluded.c
+    upsert = _UPSERT.search(sql)
+    if upsert:
+        sql = (sql[:upsert.start()] + "ON CONFLICT DO UPDATE SET"
+               + _UPSERT_VALUES.sub(r"excluded.\1", sql[upsert.end():]))
+
+    return sql.replace("%s", "?")
+
+# ------------------- Connections -------------------
+def _mysql_error(err):
+    """Re-raise a sqlite3 error as the mysql.connector error callers catch"""
+    if isinstance(err, sqlite3.IntegrityError):
+        error_class = mysql.connector.IntegrityError
+    elif isinstance(err, sqlite3.OperationalError):
+        error_class = mysql.connector.OperationalError
+    elif isinstance(err, sqlite3.ProgrammingError):
+        error_class = mysql.connector.ProgrammingError
+    else:
+        error_class = mysql.connector.DatabaseError
+    return error_class(msg=str(err))
+
+class SQLiteCursor:
+    """Cursor with the parts of the mysql.connector cursor API the app uses"""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def execute(self, operation, params=(), *args, **kwargs):
+        try:
+            self._cursor.execute(translate(operation), tuple(params or ()))
+        except sqlite3.Error as err:
+            raise _mysql_error(err) from err
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        try:
+            self._cursor.executemany(translate(operation), [tuple(params) for params in seq_params])
+        except sqlite3.Error as err:
+            raise _mysql_error(err) from err
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return (self._row(row) for row in self._cursor)
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    @property
+    def with_rows(self):
+        return self._cursor.description is not None
+
+    def close(self):
+        self._cursor.close()
+
+class SQLiteConnection:
+    """Connection with the parts of the mysql.connector connection API the app uses"""
+
+    def __init__(self, path):
+        try:
+            self._connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, detect_types=sqlite3.PARSE_DECLTYPES,
+                                               check_same_thread=False)
+            self._connection.execute("PRAGMA foreign_keys = ON")
+            self._connection.execute("PRAGMA synchronous = NORMAL")  # Safe with WAL, far fewer fsyncs
+        except sqlite3.Error as err:
+            raise _mysql_error(err) from err
+        self._open = True
+
+    def cursor(self, dictionary=False, prepared=False, **kwargs):
+        return SQLiteCursor(self._connection.cursor(), dictionary)
+
+    def commit(self):
+        try:
+            self._connection.commit()
+        except sqlite3.Error as err:
+            raise _mysql_error(err) from err
+
+    def rollback(self):
+        try:
+            self._connection.rollback()
+        except sqlite3.Error as err:
+            raise _mysql_error(err) from err
+
+    def is_connected(self):
+        return self._open
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        pass
+
+    def close(self):
+        if self._open:
+            self._open = False
+            self._connection.close()
+
+def connect():
+    """Open a connection to the SQLite database file"""
+    return SQLiteConnection(DATABASE_FILE)
+
+def create_schema():
+    """Create every table and index, and switch the file to WAL mode
+
+    WAL lets the UI read while the history writer commits. The setting is
+    stored in the file, so it only needs setting once.
+    """
+    connection = sqlite3.connect(DATABASE_FILE)
+    try:
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.executescript(SCHEMA)
+        connection.commit()
+    except sqlite3.Error as err:
+        raise _mysql_error(err) from err
+    finally:
+        connection.close()
@@ -0,0 +1,143 @@
+import argparse
+import threading
+import time
+
+import mysql.connector
+
+import db
+
+# ------------------- Stats Settings -------------------
+# The admin dashboard shows how many users, songs, playlists and plays
+# there are. Counting those rows scans a whole index each time, and
+# Listening_History only grows, so System_Counters keeps one running total
+# per figure instead. Triggers update the row counts on every insert and
+# delete, whichever process makes it. Plays are added per flushed batch by
+# play_counts.record_plays() and reset by play_counts.rebuild(). They
+# count every play ever made, including months already rolled up by
+# history_retention. Each process keeps the figures for CACHE_TTL
+# seconds, so the dashboard costs at most one primary-key read per TTL.
+CACHE_TTL = 10
+
+# counter name -> key in the dashboard's stats dict
+COUNTERS = {
+    "users": "total_users",
+    "songs": "total_songs",
+    "playlists": "total_playlists",
+    "plays": "total_downloads"
+}
+
+# MySQL runs no triggers for rows removed by a cascade, so deleting a user
+# also takes away their playlists here, and deleting a song takes away its
+# plays before Song_Play_Counts loses its row
+TRIGGERS = {
+    "trg_users_count_insert": "AFTER INSERT ON Users FOR EACH ROW "
+                              "UPDATE System_Counters SET value = value + 1 WHERE name = 'users'",
+    "trg_users_count_delete": """BEFORE DELETE ON Users FOR EACH ROW BEGIN
+        UPDATE System_Counters SET value = value - 1 WHERE name = 'users';
+        UPDATE System_Counters SET value = value - (SELECT COUNT(*) FROM Playlists WHERE user_id = OLD.user_id)
+        WHERE name = 'playlists';
+    END""",
+    "trg_songs_count_insert": "AFTER INSERT ON Songs FOR EACH ROW "
+                              "UPDATE System_Counters SET value = value + 1 WHERE name = 'songs'",
+    "trg_songs_count_delete": """BEFORE DELETE ON Songs FOR EACH ROW BEGIN
+        UPDATE System_Counters SET value = value - 1 WHERE name = 'songs';
+        UPDATE System_Counters
+        SET value = value - COALESCE((SELECT total_plays FROM Song_Play_Counts WHERE song_id = OLD.song_id), 0)
+        WHERE name = 'plays';
+    END""",
+    "trg_playlists_count_insert": "AFTER INSERT ON Playlists FOR EACH ROW "
+                                  "UPDATE System_Counters SET value = value + 1 WHERE name = 'playlists'",
+    "trg_playlists_count_delete": "AFTER DELETE ON Playlists FOR EACH ROW "
+                                  "UPDATE System_Counters SET value = value - 1 WHERE name = 'playlists'"
+}
+
+COUNT_QUERIES = {
+    "users": "SELECT COUNT(*) FROM Users",
+    "songs": "SELECT COUNT(*) FROM Songs",
+    "playlists": "SELECT COUNT(*) FROM Playlists",
+    "plays": "SELECT COALESCE(SUM(total_plays), 0) FROM Song_Play_Counts"
+}
+
+_stats = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+# ------------------- Schema -------------------
+def _trigger_exists(cursor, name):
+    """Check whether a trigger of this name exists"""
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.TRIGGERS
+        WHERE TRIGGER_SCHEMA = %s AND TRIGGER_NAME = %s
+        """,
+        (db.DB_NAME, name)
+    )
+    return cursor.fetchone()[0] > 0
+
+def create_table(cursor):
+    """Create System_Counters with the triggers that maintain it, seeded from exact counts"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS System_Counters (
+        name VARCHAR(32) PRIMARY KEY,
+        value BIGINT NOT NULL DEFAULT 0
+    )
+    """)
+    cursor.executemany(
+        "INSERT IGNORE INTO System_Counters (name) VALUES (%s)",
+        [(name,) for name in COUNTERS]
+    )
+
+    for name, definition in TRIGGERS.items():
+        if not _trigger_exists(cursor, name):
+            cursor.execute(f"CREATE TRIGGER {name} {definition}")
+
+    recount(cursor)
+
+def recount(cursor):
+    """Reset every counter from an exact count of its table
+
+    Only needed if rows were changed without firing the triggers, e.g.
+    by TRUNCATE.
+    """
+    for name, query in COUNT_QUERIES.items():
+        cursor.execute(f"UPDATE System_Counters SET value = ({query}) WHERE name = %s", (name,))
+
+# ------------------- Lookups -------------------
+def get_stats():
+    """Get the dashboard counters, read from System_Counters at most every CACHE_TTL"""
+    global _stats, _loaded_at
+
+    with _lock:
+        now = time.monotonic()
+        if _stats is None or now - _loaded_at >= CACHE_TTL:
+            values = dict(db.fetch_all("SELECT name, value FROM System_Counters", dictionary=False))
+            _stats = {key: int(values.get(name, 0)) for name, key in COUNTERS.items()}
+            _loaded_at = now
+        return dict(_stats)
+
+def invalidate():
+    """Read the counters again on the next lookup"""
+    global _stats
+
+    with _lock:
+        _stats = None
+
+# ------------------- Main Entry Point -------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show or recount the admin dashboard counters")
+    parser.add_argument("--recount", action="store_true", help="reset the counters from exact row counts")
+    args = parser.parse_args()
+
+    try:
+        if args.recount:
+            with db.pooled_connection() as connection:
+                cursor = connection.cursor()
+                try:
+                    recount(cursor)
+                    connection.commit()
+                finally:
+                    cursor.close()
+        for key, value in get_stats().items():
+            print(f"{key}: {value}")
+    except mysql.connector.Error as err:
+        print(f"Error reading system stats: {err}")
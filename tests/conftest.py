@@ -0,0 +1,70 @@
+import os
+import sys
+from collections import OrderedDict
+
+# The tests run against the embedded SQLite backend in a fresh directory,
+# so they need no MySQL server and never touch a real install
+os.environ["MUSIC_DB_BACKEND"] = "sqlite"
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.pop("MUSIC_QUERY_STATS", None)  # No stats dump into the checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import audio_objects
+import audio_store
+import catalogue
+import db
+import playback_cache
+import song_handles
+import sqlite_backend
+import system_stats
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """An empty database, audio store and temp directory for one test"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db, "SLOW_LOG_FILE", str(tmp_path / "temp" / "slow_queries.log"))
+    monkeypatch.setattr(playback_cache, "_entries", OrderedDict())
+    monkeypatch.setattr(playback_cache, "_loaded", False)
+    sqlite_backend.create_schema()
+    catalogue.invalidate()
+    song_handles.clear()
+    system_stats.invalidate()
+    yield tmp_path
+    catalogue.invalidate()
+    song_handles.clear()
+    system_stats.invalidate()
+
+@pytest.fixture
+def seed(database):
+    """Two listeners, an admin, two artists and three stored songs"""
+    users = [
+        db.execute(
+            "INSERT INTO Users (first_name, last_name, email, password, is_admin) VALUES (%s, %s, %s, %s, %s)",
+            (first, "Test", f"{first.lower()}@example.com", "x", is_admin)
+        )
+        for first, is_admin in (("Admin", 1), ("Ann", 0), ("Bob", 0))
+    ]
+    genre = db.execute("INSERT INTO Genres (name) VALUES (%s)", ("Pop",))
+    artists = [db.execute("INSERT INTO Artists (name) VALUES (%s)", (name,)) for name in ("Dua Lipa", "Ed Sheeran")]
+
+    songs = []
+    for i, (title, artist) in enumerate((("Levitating", 0), ("Shape of You", 1), ("Perfect", 1))):
+        audio_key, size = audio_store.put_bytes(f"RIFF song {i}".encode() * 64)
+        with db.pooled_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(
+                """
+                INSERT INTO Songs (title, artist_id, genre_id, duration, audio_key, file_type, file_size)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """,
+                (title, artists[artist], genre, 180 + i, audio_key, "wav", size)
+            )
+            songs.append(cursor.lastrowid)
+            audio_objects.add_reference(cursor, audio_key, size)
+            connection.commit()
+            cursor.close()
+
+    catalogue.invalidate()
+    return {"admin": users[0], "users": users[1:], "genre": genre, "artists": artists, "songs": songs}
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+import audio_objects
+import audio_store
+import db
+
+@pytest.fixture
+def shared_song(seed):
+    """A second song pointing at Levitating's audio"""
+    song = db.fetch_one("SELECT audio_key, file_size FROM Songs WHERE song_id = %s", (seed["songs"][0],))
+    with db.pooled_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute(
+            "INSERT INTO Songs (title, artist_id, audio_key, file_type, file_size) VALUES (%s, %s, %s, %s, %s)",
+            ("Levitating (Copy)", seed["artists"][0], song["audio_key"], "mp3", song["file_size"])
+        )
+        audio_objects.add_reference(cursor, song["audio_key"], song["file_size"])
+        connection.commit()
+        cursor.close()
+    return song["audio_key"]
+
+def _ref_count(audio_key):
+    row = db.fetch_one("SELECT ref_count FROM Audio_Objects WHERE audio_key = %s", (audio_key,))
+    return None if row is None else row["ref_count"]
+
+def test_audio_is_removed_with_its_last_song(seed, shared_song, monkeypatch):
+    monkeypatch.setattr(audio_objects, "DELETE_GRACE", 0)
+    assert _ref_count(shared_song) == 2
+
+    assert audio_objects.delete_song(seed["songs"][0])
+    assert _ref_count(shared_song) == 1
+    assert audio_store.has_audio(shared_song)
+
+    copy = db.fetch_one("SELECT song_id FROM Songs WHERE audio_key = %s", (shared_song,))["song_id"]
+    assert audio_objects.delete_song(copy)
+    assert _ref_count(shared_song) is None
+    assert not audio_store.has_audio(shared_song)
+
+    assert not audio_objects.delete_song(copy)
+
+def test_recently_stored_audio_waits_for_the_sweep(seed, monkeypatch):
+    audio_key = db.fetch_one("SELECT audio_key FROM Songs WHERE song_id = %s", (seed["songs"][1],))["audio_key"]
+
+    audio_objects.delete_song(seed["songs"][1])
+
+    assert _ref_count(audio_key) == 0
+    assert audio_store.has_audio(audio_key)
+
+    monkeypatch.setattr(audio_objects, "DELETE_GRACE", 0)
+    with db.pooled_connection() as connection:
+        cursor = connection.cursor()
+        freed = audio_objects.sweep(cursor)
+        connection.commit()
+        cursor.close()
+
+    assert freed > 0
+    assert _ref_count(audio_key) is None
+    assert not audio_store.has_audio(audio_key)
+
+def test_rebuild_counts_matches_the_songs_table(seed, shared_song):
+    with db.pooled_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("UPDATE Audio_Objects SET ref_count = 7")
+        audio_objects.rebuild_counts(cursor)
+        connection.commit()
+        cursor.close()
+
+    counts = db.fetch_all("SELECT ref_count FROM Audio_Objects ORDER BY ref_count")
+    assert [row["ref_count"] for row in counts] == [1, 1, 2]
+    assert os.path.exists(audio_store.path_for(shared_song))
@@ -0,0 +1,35 @@
+import hashlib
+import os
+
+import audio_store
+
+def test_audio_is_stored_by_content_hash(database):
+    data = b"RIFF" + bytes(range(256)) * 10
+
+    audio_key, size = audio_store.put_bytes(data)
+
+    assert audio_key == hashlib.sha256(data).hexdigest()
+    assert size == len(data)
+    assert audio_store.path_for(audio_key) == os.path.join("audio_store", audio_key[:2], audio_key[2:4], audio_key)
+    assert audio_store.has_audio(audio_key)
+    assert audio_store.read_audio(audio_key) == data
+
+def test_chunks_and_files_land_on_the_same_object(database, monkeypatch):
+    monkeypatch.setattr(audio_store, "CHUNK_SIZE", 7)
+    data = b"0123456789" * 5
+    with open("song.wav", "wb") as f:
+        f.write(data)
+
+    from_chunks = audio_store.put_chunks([data[:13], data[13:]])
+    from_file = audio_store.put_file("song.wav")
+
+    assert from_chunks == from_file == (hashlib.sha256(data).hexdigest(), len(data))
+    assert os.listdir(os.path.join("audio_store", "tmp")) == []  # No staging files left behind
+
+def test_delete_audio(database):
+    audio_key, size = audio_store.put_bytes(b"gone soon")
+
+    assert audio_store.delete_audio(audio_key)
+    assert not audio_store.has_audio(audio_key)
+    assert not audio_store.delete_audio(audio_key)
+    assert not audio_store.has_audio(None)
@@ -0,0 +1,47 @@
+import itertools
+
+import mysql.connector
+import pytest
+
+import benchmark
+
+def _results(p95s):
+    return {"runs": [{"dataset": {"Listening_History": 1000},
+                      "cases": {name: {"p95_ms": p95} for name, p95 in p95s.items()}}]}
+
+def test_compare_flags_only_p95_growth_past_the_ratio():
+    baseline = _results({"search": 10.0, "home": 4.0, "recommend": 2.0})
+    results = _results({"search": 12.0, "home": 6.0, "recommend": 1.0, "new_case": 50.0})
+
+    regressions = benchmark.compare(results, baseline)
+
+    assert regressions == [("home", 1000, 1.5)]
+
+class _StatusCursor:
+    """Stands in for SHOW GLOBAL STATUS, with counters rising 10 rows per read"""
+
+    def __init__(self):
+        self.reads = itertools.count()
+
+    def execute(self, query):
+        assert query == benchmark.STATUS_QUERY
+        self.value = next(self.reads) * 10
+
+    def fetchall(self):
+        return [("Innodb_rows_read", str(self.value)), ("Bytes_sent", str(self.value * 2))]
+
+def test_measure_reports_per_call_server_work_without_its_own_reads():
+    cursor = _StatusCursor()
+    overhead = benchmark._status_overhead(cursor)
+    calls = []
+
+    result = benchmark.measure(lambda: calls.append(1) or [1, 2, 3], cursor, overhead, iterations=4)
+
+    assert len(calls) == benchmark.WARMUP_CALLS + 4
+    assert result["iterations"] == 4 and result["rows_returned"] == 3
+    assert result["rows_read"] == 0 and result["bytes_sent"] == 0
+    assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+
+def test_benchmark_refuses_the_sqlite_backend(database):
+    with pytest.raises(mysql.connector.NotSupportedError, match="benchmark.py needs the MySQL backend"):
+        benchmark.benchmark()
@@ -0,0 +1,40 @@
+import catalogue
+import db
+
+def test_resolve_fills_names_from_ids(seed):
+    album_id = db.execute("INSERT INTO Albums (title, artist_id) VALUES (%s, %s)", ("Divide", seed["artists"][1]))
+    songs = [
+        {"artist_id": seed["artists"][1], "genre_id": seed["genre"], "album_id": album_id},
+        {"artist_id": None, "genre_id": None},
+        {"artist_id": seed["artists"][0]}
+    ]
+
+    assert catalogue.resolve(songs) is songs
+    assert songs == [
+        {"artist_id": seed["artists"][1], "genre_id": seed["genre"], "album_id": album_id,
+         "artist_name": "Ed Sheeran", "genre_name": "Pop", "album_name": "Divide"},
+        {"artist_id": None, "genre_id": None, "artist_name": catalogue.UNKNOWN_ARTIST, "genre_name": None},
+        {"artist_id": seed["artists"][0], "artist_name": "Dua Lipa"}
+    ]
+
+def test_new_artists_are_seen_before_the_check_interval(seed, monkeypatch):
+    catalogue.refresh(force=True)
+    monkeypatch.setattr(catalogue, "CHECK_INTERVAL", 3600)
+    artist_id = db.execute("INSERT INTO Artists (name) VALUES (%s)", ("Adele",))
+
+    assert catalogue.resolve([{"artist_id": artist_id}])[0]["artist_name"] == "Adele"
+
+def test_renames_are_picked_up_after_invalidate(seed, monkeypatch):
+    catalogue.refresh(force=True)
+    monkeypatch.setattr(catalogue, "CHECK_INTERVAL", 3600)
+    db.execute("UPDATE Genres SET name = %s WHERE genre_id = %s", ("Pop Music", seed["genre"]))
+
+    assert catalogue.genres()[seed["genre"]] == "Pop"
+    catalogue.invalidate()
+    assert catalogue.genres()[seed["genre"]] == "Pop Music"
+
+def test_sorted_rows_ignore_case(seed):
+    db.execute("INSERT INTO Artists (name) VALUES (%s)", ("adele",))
+    catalogue.invalidate()
+
+    assert [row["name"] for row in catalogue.sorted_rows("artists")] == ["adele", "Dua Lipa", "Ed Sheeran"]
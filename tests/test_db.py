@@ -0,0 +1,78 @@
+import mysql.connector
+
+import db
+import download
+
+class _RecordingConnection:
+    """Stands in for a pooled mysql.connector connection"""
+
+    def __init__(self, in_transaction):
+        self.in_transaction = in_transaction
+        self.calls = []
+
+    def rollback(self):
+        self.calls.append("rollback")
+        self.in_transaction = False
+
+    def close(self):
+        self.calls.append("close")
+
+def test_returned_connection_ends_its_read_snapshot():
+    raw = _RecordingConnection(in_transaction=True)
+    db.PooledConnection(raw).close()
+    assert raw.calls == ["rollback", "close"]
+
+def test_idle_connection_is_returned_without_a_round_trip():
+    raw = _RecordingConnection(in_transaction=False)
+    db.PooledConnection(raw).close()
+    assert raw.calls == ["close"]
+
+def test_raw_connection_unwraps_every_layer():
+    raw = _RecordingConnection(in_transaction=False)
+    assert db._raw_connection(db.InstrumentedConnection(db.PooledConnection(raw))) is raw
+
+def test_query_helpers_round_trip(database):
+    user_id = db.execute(
+        "INSERT INTO Users (first_name, last_name, email, password) VALUES (%s, %s, %s, %s)",
+        ("Ann", "Lee", "ann@example.com", "x")
+    )
+    db.execute_many("INSERT INTO Genres (name) VALUES (%s)", [("Pop",), ("Rock",)])
+
+    assert db.fetch_one("SELECT first_name FROM Users WHERE user_id = %s", (user_id,)) == {"first_name": "Ann"}
+    assert db.fetch_all("SELECT name FROM Genres ORDER BY name", dictionary=False) == [("Pop",), ("Rock",)]
+    assert db.fetch_one("SELECT user_id FROM Users WHERE user_id = %s", (user_id + 1,)) is None
+    assert db.check_health() is None
+
+def test_closing_twice_hands_the_connection_back_once():
+    raw = _RecordingConnection(in_transaction=True)
+    connection = db.PooledConnection(raw)
+    connection.close()
+    connection.close()
+    assert raw.calls == ["rollback", "close"]
+
+class _BrokenConnection(_RecordingConnection):
+    """A connection that dropped mid-query"""
+
+    def cursor(self, *args, **kwargs):
+        return self
+
+    def execute(self, *args):
+        raise mysql.connector.OperationalError(msg="Lost connection to MySQL server during query")
+
+    def is_connected(self):
+        return False
+
+def test_pages_hand_back_connections_that_broke(monkeypatch):
+    raw = _BrokenConnection(in_transaction=False)
+    monkeypatch.setattr(download, "connect_db", lambda: raw)
+
+    assert download.get_popular_songs() == []
+    assert raw.calls == ["close"]
+
+def test_check_health_returns_the_error(monkeypatch):
+    def unreachable():
+        raise mysql.connector.InterfaceError(msg="Can't connect to MySQL server")
+
+    monkeypatch.setattr(db, "connect_db", unreachable)
+
+    assert "Can't connect" in str(db.check_health())
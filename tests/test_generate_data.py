@@ -0,0 +1,33 @@
+import mysql.connector
+import numpy as np
+import pytest
+
+import generate_data
+
+def test_streams_repeat_for_a_seed_and_differ_per_phase():
+    first = [rng.random(3).tolist() for rng in generate_data._streams(7, 2)]
+    again = [rng.random(3).tolist() for rng in generate_data._streams(7, 2)]
+
+    assert first == again
+    assert first[0] != first[1]
+
+def test_zipf_samples_favour_the_top_ranks():
+    cdf = generate_data._zipf_cdf(100, generate_data.SONG_EXPONENT)
+    ranks = generate_data._sample(np.random.default_rng(1), cdf, 20_000)
+
+    assert cdf[-1] == pytest.approx(1.0) and np.all(np.diff(cdf) > 0)
+    assert ranks.min() >= 0 and ranks.max() <= 99
+    counts = np.bincount(ranks, minlength=100)
+    assert counts[0] == counts.max()
+    assert counts[0] > 5 * counts[50]
+
+def test_names_are_distinct_and_repeatable():
+    names = generate_data._names(np.random.default_rng(3), ["Red", "Blue"], ["Sky", "Sea"], 10)
+
+    assert len(set(names)) == 10
+    assert names == generate_data._names(np.random.default_rng(3), ["Red", "Blue"], ["Sky", "Sea"], 10)
+    assert sum(name.count(" ") == 2 for name in names) >= 6  # Only four unnumbered pairs exist
+
+def test_generate_refuses_the_sqlite_backend(database):
+    with pytest.raises(mysql.connector.NotSupportedError, match="generate_data.py needs the MySQL backend"):
+        generate_data.generate(users=1, artists=1, songs=1, plays=1)
@@ -0,0 +1,127 @@
+import datetime
+import gzip
+
+import db
+import history_retention
+import play_counts
+
+def test_months_wrap_across_years():
+    month = history_retention._month_start(datetime.date(2025, 11, 17))
+
+    assert month == datetime.date(2025, 11, 1)
+    assert history_retention._add_months(month, 3) == datetime.date(2026, 2, 1)
+    assert history_retention._add_months(month, -11) == datetime.date(2024, 12, 1)
+
+def test_partition_names_round_trip():
+    month = datetime.date(2025, 12, 1)
+    name = history_retention._partition_name(month)
+
+    assert name == "p202512"
+    assert history_retention._partition_month(name) == month
+    assert history_retention._partition_month("pmax") is None
+    assert history_retention._partition_definition(month) == \
+        "PARTITION p202512 VALUES LESS THAN (UNIX_TIMESTAMP('2026-01-01'))"
+
+class _Cursor:
+    """Answers the partition listing and archive reads, recording the rest"""
+
+    def __init__(self, names=(), rows=()):
+        self.names = list(names)
+        self.rows = list(rows)
+        self.statements = []
+
+    def execute(self, query, params=()):
+        self.statements.append(" ".join(query.split()))
+
+    def fetchall(self):
+        return [(name,) for name in self.names]
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        pass
+
+class _Connection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+def test_ensure_partitions_splits_future_months_out_of_pmax():
+    this_month = history_retention._month_start(datetime.date.today())
+    cursor = _Cursor([history_retention._partition_name(this_month), "pmax"])
+
+    assert history_retention.ensure_partitions(cursor, months_ahead=2) == 2
+
+    reorganize = cursor.statements[-1]
+    assert reorganize.startswith("ALTER TABLE Listening_History REORGANIZE PARTITION pmax INTO (")
+    for ahead in (1, 2):
+        assert history_retention._partition_name(history_retention._add_months(this_month, ahead)) in reorganize
+    assert reorganize.endswith("PARTITION pmax VALUES LESS THAN MAXVALUE )")
+
+    cursor.names = [history_retention._partition_name(history_retention._add_months(this_month, 2)), "pmax"]
+    assert history_retention.ensure_partitions(cursor, months_ahead=2) == 0
+
+def test_archive_is_written_once_in_batches(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(history_retention, "ARCHIVE_BATCH", 2)
+    played_at = datetime.datetime(2024, 1, 5, 8, 30)
+    cursor = _Cursor(rows=[(i, 1, 10 + i, played_at) for i in range(1, 4)])
+
+    path = history_retention._archive_partition(_Connection(cursor), "p202401")
+    assert history_retention._archive_partition(_Connection(cursor), "p202401") == path
+
+    with gzip.open(path, "rt") as f:
+        assert f.read().splitlines() == [
+            "history_id,user_id,song_id,played_at",
+            "1,1,11,2024-01-05 08:30:00",
+            "2,1,12,2024-01-05 08:30:00",
+            "3,1,13,2024-01-05 08:30:00"
+        ]
+    assert len(cursor.statements) == 1
+    assert list(tmp_path.joinpath(history_retention.ARCHIVE_DIR).iterdir()) == [tmp_path / path]
+
+def test_sqlite_keeps_every_play(seed):
+    assert history_retention.apply_retention(keep_months=0) == []
+
+def test_rolled_up_plays_still_count_towards_totals(seed):
+    ann, levitating = seed["users"][0], seed["songs"][0]
+    db.execute(
+        "INSERT INTO Listening_History_Daily (user_id, song_id, play_date, plays, last_played_at) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        (ann, levitating, datetime.date(2020, 3, 1), 4, datetime.datetime(2020, 3, 1, 22, 0))
+    )
+    play_counts.record_play(ann, levitating)
+
+    play_counts.rebuild()
+
+    counts = db.fetch_one("SELECT total_plays, plays_30d FROM Song_Play_Counts WHERE song_id = %s", (levitating,))
+    assert counts == {"total_plays": 5, "plays_30d": 1}
+
+def test_deleting_a_user_takes_their_plays_and_rollups(seed):
+    ann, bob = seed["users"]
+    song = seed["songs"][0]
+    db.execute_many("INSERT INTO Listening_History (user_id, song_id) VALUES (%s, %s)", [(ann, song), (bob, song)])
+    db.execute_many(
+        "INSERT INTO Listening_History_Daily (user_id, song_id, play_date, plays) VALUES (%s, %s, %s, %s)",
+        [(ann, song, "2025-01-01", 3), (bob, song, "2025-01-01", 1)]
+    )
+
+    assert history_retention.delete_user(ann)
+    assert not history_retention.delete_user(ann)
+
+    for table in ("Listening_History", "Listening_History_Daily"):
+        assert db.fetch_all(f"SELECT DISTINCT user_id FROM {table}", dictionary=False) == [(bob,)]
+
+def test_old_plays_still_seed_recommendations(seed):
+    import recommend
+    ann = seed["users"][0]
+    db.execute("INSERT INTO Listening_History (user_id, song_id, played_at) VALUES (%s, %s, %s)",
+               (ann, seed["songs"][0], "2024-01-01 10:00:00"))
+    with open("current_user.txt", "w") as f:
+        f.write(str(ann))
+
+    assert [song["title"] for song in recommend.get_user_listening_history()] == ["Levitating"]
@@ -0,0 +1,65 @@
+import json
+import os
+
+import db
+import history_writer
+
+def _reset(monkeypatch):
+    """Start from the module state of a freshly started process"""
+    monkeypatch.setattr(history_writer, "_journal", None)
+    monkeypatch.setattr(history_writer, "_pending", [])
+    monkeypatch.setattr(history_writer, "_segments", {})
+    monkeypatch.setattr(history_writer, "start", lambda: None)  # No background flushes
+
+def _write_leftover_journal(plays):
+    os.makedirs(history_writer.JOURNAL_DIR, exist_ok=True)
+    with open(history_writer.ACTIVE_JOURNAL, "w") as f:
+        for play in plays:
+            f.write(json.dumps(play) + "\n")
+        f.write('{"user_id": 2, "song')  # Torn by the crash
+
+def _history():
+    return db.fetch_all("SELECT user_id, song_id FROM Listening_History ORDER BY history_id", dictionary=False)
+
+def test_flush_replays_journal_left_by_a_crash(seed, monkeypatch):
+    user, song = seed["users"][0], seed["songs"][0]
+    _write_leftover_journal([
+        {"user_id": user, "song_id": song, "played_at": "2026-01-02 03:04:05"},
+        {"user_id": user, "song_id": seed["songs"][1], "played_at": "2026-01-02 03:08:05"}
+    ])
+    _reset(monkeypatch)
+
+    assert history_writer.flush()
+
+    assert _history() == [(user, song), (user, seed["songs"][1])]
+    assert os.listdir(history_writer.JOURNAL_DIR) == []
+
+def test_new_plays_do_not_hide_the_leftover_journal(seed, monkeypatch):
+    user = seed["users"][0]
+    _write_leftover_journal([{"user_id": user, "song_id": seed["songs"][0], "played_at": "2026-01-02 03:04:05"}])
+    _reset(monkeypatch)
+
+    assert history_writer.record_play(seed["songs"][2], user_id=user)
+    assert history_writer.flush()
+
+    assert _history() == [(user, seed["songs"][0]), (user, seed["songs"][2])]
+
+def test_plays_of_a_deleted_song_are_dropped_alone(seed, monkeypatch):
+    user = seed["users"][0]
+    _reset(monkeypatch)
+
+    history_writer.record_play(seed["songs"][0], user_id=user)
+    history_writer.record_play(9999, user_id=user)
+
+    assert history_writer.flush()
+    assert _history() == [(user, seed["songs"][0])]
+
+def test_empty_session_file_means_nobody_is_logged_in(seed, monkeypatch):
+    _reset(monkeypatch)
+    monkeypatch.setattr(history_writer, "_user_cache", {"mtime": None, "user_id": None})
+    with open("current_user.txt", "w") as f:
+        f.write("\n")  # What logging out leaves behind
+
+    assert history_writer.current_user_id() is None
+    assert not history_writer.record_play(seed["songs"][0])
+    assert _history() == []
@@ -0,0 +1,69 @@
+import os
+import sys
+import wave
+
+import db
+import library_import
+
+def _write_wav(path, seconds, frame=b"\x00\x01"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(8000)
+        f.writeframes(frame * 8000 * seconds)
+
+def test_import_library_skips_duplicates_and_unreadable_files(seed):
+    _write_wav(os.path.join("music", "a", "Intro.wav"), 1)
+    _write_wav(os.path.join("music", "a", "Outro.wav"), 2)
+    _write_wav(os.path.join("music", "b", "Intro copy.wav"), 1)
+    with open(os.path.join("music", "b", "notes.txt"), "w") as f:
+        f.write("not audio")
+    progress = []
+
+    counts = library_import.import_library("music", workers=2, batch_size=2,
+                                            progress=lambda *args: progress.append(args))
+
+    assert counts == {"files": 3, "imported": 2, "duplicates": 1, "failed": 0}
+    assert progress == [(2, 3, 2), (3, 3, 2)]
+    songs = db.fetch_all("""
+    SELECT s.title, s.duration, a.name as artist, o.ref_count
+    FROM Songs s JOIN Artists a ON s.artist_id = a.artist_id JOIN Audio_Objects o ON s.audio_key = o.audio_key
+    WHERE s.song_id > %s ORDER BY s.song_id
+    """, (seed["songs"][-1],))
+    assert songs == [
+        {"title": "Intro", "duration": 1, "artist": "Unknown Artist", "ref_count": 1},
+        {"title": "Outro", "duration": 2, "artist": "Unknown Artist", "ref_count": 1}
+    ]
+
+def test_insert_batch_reuses_artists_and_creates_albums_once(seed):
+    songs = [
+        {"audio_key": f"{i:064x}", "file_size": 10, "file_type": "mp3", "duration": 60,
+         "title": title, "artist": artist, "album": album, "genre": genre}
+        for i, (title, artist, album, genre) in enumerate([
+            ("Don't Start Now", "Dua Lipa", "Future Nostalgia", "Pop"),
+            ("Physical", "Dua Lipa", "Future Nostalgia", "Dance"),
+            ("Heat Waves", "Glass Animals", None, None)
+        ])
+    ]
+    caches = {"artists": {}, "genres": {}, "albums": {}}
+
+    with db.pooled_connection() as connection:
+        assert library_import.insert_batch(connection, songs, caches) == 3
+        assert library_import.insert_batch(connection, songs, caches) == 0
+
+    assert caches["artists"]["dua lipa"] == seed["artists"][0]
+    assert caches["genres"]["pop"] == seed["genre"]
+    assert db.fetch_one("SELECT COUNT(*) as albums FROM Albums") == {"albums": 1}
+    assert db.fetch_one("SELECT COUNT(*) as artists FROM Artists") == {"artists": 3}
+
+def test_admin_import_runs_the_script_with_this_interpreter(monkeypatch):
+    import admin
+    launched = []
+    monkeypatch.setattr(admin.filedialog, "askdirectory", lambda **kwargs: "music")
+    monkeypatch.setattr(admin.messagebox, "showinfo", lambda *args: None)
+    monkeypatch.setattr(admin.subprocess, "Popen", launched.append)
+
+    admin.open_import_library()
+
+    assert launched == [[sys.executable, os.path.abspath(library_import.__file__), "music"]]
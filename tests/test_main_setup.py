@@ -0,0 +1,41 @@
+import db
+import main
+import playlist
+
+def _setup():
+    for step in (main.add_default_users, main.add_default_genres, main.add_default_artists,
+                 main.add_default_albums, main.add_dummy_songs, main.add_default_playlists,
+                 main.add_sample_listening_history):
+        assert step()
+
+def _count(table):
+    return db.fetch_one(f"SELECT COUNT(*) FROM {table}", dictionary=False)[0]
+
+def test_setup_seeds_every_table_and_is_repeatable(database):
+    _setup()
+    counts = {table: _count(table) for table in ("Users", "Songs", "Playlists", "Playlist_Songs", "Listening_History")}
+    assert all(counts.values())
+
+    _setup()
+
+    assert {table: _count(table) for table in counts} == counts
+
+def test_system_playlists_have_no_owner(database):
+    _setup()
+
+    playlists = playlist.get_system_playlists()
+
+    assert {p["name"] for p in playlists} == {"Top Hits", "Chill Vibes", "Workout Mix"}
+    owners = db.fetch_all("SELECT DISTINCT user_id, is_system FROM Playlists WHERE name = %s", ("Top Hits",),
+                          dictionary=False)
+    assert owners == [(None, 1)]
+
+def test_missing_system_playlists_are_created_without_an_owner(seed):
+    db.execute("DELETE FROM Users WHERE is_admin = 1")
+    db.execute("INSERT INTO Playlists (user_id, name) VALUES (%s, %s)", (seed["users"][0], "Ann's diary"))
+
+    playlists = playlist.get_system_playlists()
+
+    assert {p["name"] for p in playlists} == {"Coding", "LoFi", "Bass"}
+    assert db.fetch_all("SELECT DISTINCT user_id FROM Playlists WHERE is_system = 1", dictionary=False) == [(None,)]
+    assert len(playlist.get_system_playlists()) == 3
@@ -0,0 +1,108 @@
+import mysql.connector
+import pytest
+
+import migrations
+
+class _Server:
+    """Just enough of MySQL for the migration runner: the lock, Schema_Version, indexes and columns"""
+
+    def __init__(self, versions=(), indexes=(), columns=(), lock_free=True):
+        self.versions = set(versions)
+        self.indexes = set(indexes)
+        self.columns = set(columns)
+        self.lock_free = lock_free
+        self.lock_held = False
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+class _Cursor:
+    def __init__(self, server):
+        self.server = server
+        self.rows = []
+
+    def execute(self, query, params=()):
+        server = self.server
+        if "GET_LOCK" in query:
+            server.lock_held = server.lock_free
+            self.rows = [(1 if server.lock_free else 0,)]
+        elif "RELEASE_LOCK" in query:
+            server.lock_held = False
+            self.rows = [(1,)]
+        elif "SELECT version FROM Schema_Version" in query:
+            self.rows = [(version,) for version in server.versions]
+        elif "INSERT INTO Schema_Version" in query:
+            server.versions.add(params[0])
+        elif "information_schema.STATISTICS" in query:
+            self.rows = [(int((params[1], params[2]) in server.indexes),)]
+        elif "information_schema.COLUMNS" in query:
+            self.rows = [(int((params[1], params[2]) in server.columns),)]
+        elif "CREATE TABLE" not in query:
+            server.statements.append(" ".join(query.split()))
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def steps(monkeypatch):
+    ran = []
+    monkeypatch.setattr(migrations, "MIGRATIONS", [
+        (version, f"Step {version}", lambda cursor, version=version: ran.append(version))
+        for version in (1, 2, 3)
+    ])
+    return ran
+
+def test_only_pending_migrations_run_in_order(steps):
+    server = _Server(versions={2})
+
+    assert migrations.migrate(server) == 2
+    assert steps == [1, 3]
+    assert server.versions == {1, 2, 3}
+    assert server.commits == 2
+    assert not server.lock_held
+
+    assert migrations.migrate(server) == 0
+    assert steps == [1, 3]
+
+def test_migrate_waits_for_the_other_process(steps):
+    server = _Server(lock_free=False)
+
+    with pytest.raises(mysql.connector.Error, match="Timed out"):
+        migrations.migrate(server)
+    assert steps == []
+
+def test_add_index_is_online_and_skips_existing_indexes():
+    server = _Server(indexes={("Songs", "idx_songs_upload_date")})
+    cursor = server.cursor()
+
+    migrations.add_index(cursor, "Songs", "idx_songs_upload_date", "upload_date")
+    migrations.add_index(cursor, "Songs", "idx_songs_title", "title")
+
+    assert server.statements == [
+        "ALTER TABLE Songs ADD INDEX idx_songs_title (title), ALGORITHM=INPLACE, LOCK=NONE"
+    ]
+
+def test_versions_are_unique_and_ascending():
+    versions = [version for version, description, step in migrations.MIGRATIONS]
+    assert versions == sorted(set(versions))
+
+def test_system_playlists_lose_their_borrowed_owner_once():
+    for columns in ((), {("Playlists", "is_system")}):
+        server = _Server(columns=columns)
+
+        migrations._ownerless_system_playlists(server.cursor())
+
+        altered = [statement for statement in server.statements if statement.startswith("ALTER TABLE Playlists")]
+        assert len(altered) == (0 if columns else 1)
+        assert server.statements[-1].startswith("UPDATE Playlists p JOIN Users u")
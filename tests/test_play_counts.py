@@ -0,0 +1,76 @@
+import datetime
+import threading
+
+import pytest
+
+import db
+import play_counts
+
+def _counts(song_id):
+    return db.fetch_one(
+        "SELECT total_plays, plays_1d, plays_7d, plays_30d FROM Song_Play_Counts WHERE song_id = %s",
+        (song_id,), dictionary=False
+    )
+
+def _ago(**delta):
+    return (datetime.datetime.now() - datetime.timedelta(**delta)).replace(microsecond=0)
+
+def test_record_plays_counts_each_play_in_the_windows_it_falls_in(seed):
+    user, song = seed["users"][0], seed["songs"][0]
+    played = [_ago(minutes=5), _ago(days=3), _ago(days=20), _ago(days=100)]
+
+    play_counts.record_plays([(user, song, played_at) for played_at in played])
+
+    assert _counts(song) == (4, 1, 2, 3)
+    assert db.fetch_one("SELECT COUNT(*) FROM Listening_History", dictionary=False) == (4,)
+    last = db.fetch_one("SELECT last_played_at FROM Song_Play_Counts WHERE song_id = %s", (song,))
+    assert last["last_played_at"] == played[0]
+
+def test_record_plays_adds_to_existing_counters(seed):
+    user, song = seed["users"][0], seed["songs"][1]
+
+    play_counts.record_play(user, song)
+    play_counts.record_plays([(user, song, _ago(hours=2)), (user, seed["songs"][2], _ago(days=10))])
+
+    assert _counts(song) == (2, 2, 2, 2)
+    assert _counts(seed["songs"][2]) == (1, 0, 0, 1)
+
+def test_refresh_windows_ages_plays_out(seed):
+    user, song = seed["users"][0], seed["songs"][0]
+    play_counts.record_plays([(user, song, _ago(hours=2)), (user, song, _ago(days=5))])
+    db.execute("UPDATE Listening_History SET played_at = %s WHERE played_at >= %s", (_ago(days=2), _ago(days=1)))
+
+    play_counts.refresh_windows()
+
+    assert _counts(song) == (2, 0, 2, 2)
+
+def test_rebuild_recounts_from_history(seed):
+    user, song = seed["users"][0], seed["songs"][0]
+    play_counts.record_plays([(user, song, _ago(hours=1))] * 3)
+    db.execute("DELETE FROM Song_Play_Counts")
+
+    play_counts.rebuild()
+
+    assert _counts(song) == (3, 3, 3, 3)
+
+def test_refresher_runs_in_the_background(monkeypatch):
+    refreshed = threading.Event()
+    monkeypatch.setattr(play_counts, "refresh_windows", refreshed.set)
+    monkeypatch.setattr(play_counts, "_refresher", None)
+
+    play_counts.start_refresher()
+
+    assert refreshed.wait(5)
+
+def test_refresher_survives_unexpected_errors(monkeypatch):
+    class Stop(Exception):
+        pass
+    def broken_refresh():
+        raise KeyError("window")
+    def sleep(seconds):
+        raise Stop
+    monkeypatch.setattr(play_counts, "refresh_windows", broken_refresh)
+    monkeypatch.setattr(play_counts.time, "sleep", sleep)
+
+    with pytest.raises(Stop):  # Reached the next pass instead of dying
+        play_counts._refresh_loop()
@@ -0,0 +1,56 @@
+import hashlib
+import os
+
+import playback_cache
+
+def test_put_and_lookup_round_trip(database):
+    path = playback_cache.put(1, "wav", b"first song")
+
+    assert playback_cache.lookup(1) == path
+    with open(path, "rb") as f:
+        assert f.read() == b"first song"
+    assert playback_cache.lookup(2) is None
+
+def test_changed_content_is_a_miss(database):
+    playback_cache.put(1, "wav", b"old audio")
+
+    assert playback_cache.lookup(1, content_hash=hashlib.sha256(b"new audio").hexdigest()) is None
+    assert playback_cache.total_bytes() == 0
+
+def test_damaged_file_is_a_miss(database):
+    path = playback_cache.put(1, "wav", b"intact audio")
+    with open(path, "wb") as f:
+        f.write(b"truncat")
+
+    assert playback_cache.lookup(1) is None
+    assert not os.path.exists(path)
+
+def test_least_recently_used_songs_are_evicted(database, monkeypatch):
+    monkeypatch.setattr(playback_cache, "CACHE_MAX_BYTES", 25)
+    playback_cache.put(1, "wav", b"a" * 10)
+    playback_cache.put(2, "wav", b"b" * 10)
+    playback_cache.lookup(1)  # Song 2 is now the least recently used
+
+    playback_cache.put(3, "wav", b"c" * 10)
+
+    assert playback_cache.lookup(2) is None
+    assert playback_cache.lookup(1) and playback_cache.lookup(3)
+    assert playback_cache.total_bytes() == 20
+
+def test_index_survives_a_restart(database, monkeypatch):
+    path = playback_cache.put_stream(7, "mp3", [b"chunk one, ", b"chunk two"])
+    monkeypatch.setattr(playback_cache, "_entries", type(playback_cache._entries)())
+    monkeypatch.setattr(playback_cache, "_loaded", False)
+
+    assert playback_cache.lookup(7) == path
+    assert playback_cache.total_bytes() == len(b"chunk one, chunk two")
+
+def test_invalidate_and_clear(database):
+    playback_cache.put(1, "wav", b"one")
+    playback_cache.put(2, "wav", b"two")
+
+    playback_cache.invalidate(1)
+    assert playback_cache.lookup(1) is None
+
+    playback_cache.clear()
+    assert playback_cache.total_bytes() == 0
@@ -0,0 +1,129 @@
+import types
+
+import pytest
+
+import history_writer
+import player
+import router
+
+class _Music:
+    """Records what the player asks pygame's mixer to do"""
+
+    def __init__(self):
+        self.calls = []
+        self.pos = 0
+        self.busy = True
+
+    def load(self, file):
+        self.calls.append(("load", file))
+
+    def play(self):
+        self.calls.append(("play",))
+
+    def queue(self, file):
+        self.calls.append(("queue", file))
+
+    def stop(self):
+        self.calls.append(("stop",))
+
+    def get_pos(self):
+        return self.pos
+
+    def get_busy(self):
+        return self.busy
+
+class _Root:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append(callback)
+
+@pytest.fixture
+def music(database, monkeypatch):
+    music = _Music()
+    plays = []
+    monkeypatch.setattr(player, "mixer", types.SimpleNamespace(music=music))
+    monkeypatch.setattr(history_writer, "record_play", plays.append)
+    monkeypatch.setattr(router, "root", _Root())
+    monkeypatch.setattr(router, "current_page", lambda: None)
+    music.plays = plays
+    yield music
+    player.stop()
+    player._mixer_state["polling"] = False
+
+def _wait_for_prefetch():
+    for future in list(player._tracks.values()):
+        future.result()
+
+def test_next_track_is_prefetched_and_queued_in_the_mixer(seed, music):
+    levitating, shape, perfect = seed["songs"]
+
+    assert player.play_song(levitating, [levitating, shape, perfect])
+    _wait_for_prefetch()
+    player._queue_next_in_mixer()
+
+    load, play, queued = music.calls
+    assert load[0] == "load" and queued[0] == "queue" and load[1] != queued[1]
+    assert set(player._tracks) == {levitating, shape, perfect}
+    assert player.current_song["title"] == "Levitating" and player.current_song["artist"] == "Dua Lipa"
+
+    # pygame switching to the queued track restarts get_pos() from zero
+    music.pos = 5000
+    router.root.scheduled.pop()()
+    music.pos = 10
+    router.root.scheduled.pop()()
+
+    assert player.queue["index"] == 1
+    assert player.current_song["title"] == "Shape of You"
+    assert music.plays == [levitating, shape]
+    assert music.calls.count(("load", load[1])) == 1
+
+def test_previous_restarts_a_track_after_the_threshold(seed, music):
+    levitating, shape, perfect = seed["songs"]
+    player.play_song(shape, [levitating, shape, perfect])
+
+    music.pos = player.RESTART_THRESHOLD_MS + 1
+    player.play_previous()
+    assert player.current_song["id"] == shape
+
+    music.pos = 0
+    player.play_previous()
+    assert player.current_song["id"] == levitating
+
+def test_queue_pulls_later_pages_from_the_song_list(seed, music):
+    levitating, shape, perfect = seed["songs"]
+    pages = [[shape], [perfect]]
+
+    def load_more():
+        view.songs.extend({"song_id": song_id} for song_id in pages.pop(0))
+        view.has_more = bool(pages)
+
+    view = types.SimpleNamespace(songs=[{"song_id": levitating}], has_more=True, load_more=load_more)
+
+    player.play_song(levitating, view)
+    assert player.queue["song_ids"] == [levitating, shape]
+
+    assert player.play_next()
+    assert player.queue["song_ids"] == [levitating, shape, perfect]
+    assert player.play_next()
+    assert not player.play_next()
+    assert player.current_song["id"] == perfect
+
+def test_queued_track_still_starts_after_its_load_is_dropped(seed, music):
+    levitating, shape, perfect = seed["songs"]
+    player.play_song(levitating, [levitating, shape, perfect])
+    _wait_for_prefetch()
+    player._queue_next_in_mixer()
+
+    # The queued track's load fails after pygame already has the file
+    failed = player._prefetch_executor.submit(lambda: 1 / 0)
+    player._tracks[shape] = failed
+    music.pos = 5000
+    router.root.scheduled.pop()()
+    music.pos = 10
+    router.root.scheduled.pop()()
+
+    assert player.queue["index"] == 1
+    assert player.current_song["id"] == shape and player.current_song["title"] == "Shape of You"
+    assert music.plays == [levitating, shape]
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+import db
+
+@pytest.fixture
+def stats(database, monkeypatch):
+    monkeypatch.setattr(db, "_explained_at", {})
+    monkeypatch.setattr(db, "_explain_connection", None)
+    db.reset_query_stats()
+    yield
+    if db._explain_connection is not None:
+        db._explain_connection.close()
+    db.reset_query_stats()
+
+def test_fingerprints_collapse_literals_and_lists():
+    assert db.fingerprint("SELECT *  FROM Songs\n WHERE title = 'It''s' AND song_id IN (%s, %s, %s) LIMIT 20") == \
+        "SELECT * FROM Songs WHERE title = ? AND song_id IN (...) LIMIT ?"
+    assert db.fingerprint("INSERT INTO Genres (name) VALUES (%s), (%s), (%s)") == \
+        db.fingerprint("INSERT INTO Genres (name) VALUES (%s), (%s)") == \
+        "INSERT INTO Genres (name) VALUES (...)"
+
+def test_statements_are_grouped_by_fingerprint(seed, stats):
+    for song_id in seed["songs"]:
+        db.fetch_one(f"SELECT title FROM Songs WHERE song_id = {song_id}")
+    db.fetch_all("SELECT title FROM Songs ORDER BY song_id")
+
+    report = {entry["fingerprint"]: entry for entry in db.query_stats()}
+
+    lookup = report["SELECT title FROM Songs WHERE song_id = ?"]
+    assert lookup["count"] == 3 and lookup["rows"] == 3
+    assert sum(lookup["histogram"]) == 3
+    assert lookup["p50_ms"] <= lookup["p99_ms"] and lookup["mean_ms"] <= lookup["max_ms"]
+    listing = report["SELECT title FROM Songs ORDER BY song_id"]
+    assert listing["rows"] == 3 and listing["bytes"] == len("Levitating" "Shape of You" "Perfect")
+
+def test_slow_selects_are_logged_with_their_plan(seed, stats, monkeypatch):
+    monkeypatch.setattr(db, "SLOW_QUERY_MS", 0)
+
+    db.fetch_all("SELECT title FROM Songs WHERE song_id = %s", (seed["songs"][0],))
+    db.fetch_all("SELECT title FROM Songs WHERE song_id = %s", (seed["songs"][1],))
+    db._explain_executor.submit(lambda: None).result()
+
+    with open(db.SLOW_LOG_FILE, encoding="utf-8") as f:
+        first, second = [json.loads(line) for line in f]
+    assert first["fingerprint"] == second["fingerprint"] == "SELECT title FROM Songs WHERE song_id = %s"
+    assert first["rows"] == 1 and first["explain"]
+    assert "explain" not in second  # Explained at most once per EXPLAIN_INTERVAL
+
+def test_stats_are_dumped_at_exit_only_when_asked(seed, stats, monkeypatch, tmp_path):
+    stats_file = tmp_path / "temp" / "query_stats.json"
+    monkeypatch.setattr(db, "STATS_FILE", str(stats_file))
+    db.fetch_all("SELECT title FROM Songs")
+
+    monkeypatch.setattr(db, "WRITE_STATS_AT_EXIT", False)
+    db._write_stats()
+    assert not stats_file.exists()
+
+    monkeypatch.setattr(db, "WRITE_STATS_AT_EXIT", True)
+    db._write_stats()
+    with open(stats_file, encoding="utf-8") as f:
+        assert [entry["fingerprint"] for entry in json.load(f)] == ["SELECT title FROM Songs"]
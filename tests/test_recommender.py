@@ -0,0 +1,89 @@
+import datetime
+
+import numpy as np
+import pytest
+
+import play_counts
+import recommend
+import recommender
+
+@pytest.fixture(autouse=True)
+def fresh_model(monkeypatch):
+    monkeypatch.setattr(recommender, "_model", None)
+    monkeypatch.setattr(recommender, "_model_mtime", None)
+
+def _listen(user, songs):
+    now = datetime.datetime.now().replace(microsecond=0)
+    play_counts.record_plays([(user, song_id, now) for song_id in songs])
+
+def test_no_model_means_no_recommendations(seed):
+    assert recommender.recommend(seed["users"][0]) == []
+    assert not recommender.build_model()  # No history to build from
+
+def test_recommends_songs_co_listened_with_the_users_plays(seed):
+    ann, bob = seed["users"]
+    levitating, shape, perfect = seed["songs"]
+    _listen(ann, [levitating, shape])
+    _listen(bob, [levitating, shape, perfect])
+
+    assert recommender.build_model()
+
+    assert recommender.recommend(ann, limit=1) == [perfect]
+    assert recommender.recommend(bob, limit=3) == []  # Bob has heard everything
+    assert recommender.recommend(ann, limit=2, exclude_ids=[perfect]) == []
+
+def test_new_listeners_get_the_most_popular_songs(seed):
+    ann, bob = seed["users"]
+    levitating, shape, perfect = seed["songs"]
+    _listen(ann, [shape])
+    _listen(bob, [shape, perfect])
+
+    recommender.build_model()
+
+    assert recommender.recommend(seed["admin"], limit=2) == [shape, perfect]
+
+def test_rebuild_if_stale_only_rebuilds_an_old_model(seed, monkeypatch):
+    _listen(seed["users"][0], seed["songs"])
+
+    assert recommender.rebuild_if_stale()
+    assert not recommender.rebuild_if_stale()
+
+    monkeypatch.setattr(recommender, "MODEL_MAX_AGE", -1)
+    assert recommender.rebuild_if_stale()
+
+def test_recommendations_page_keeps_the_model_ranking(seed):
+    ann, bob = seed["users"]
+    levitating, shape, perfect = seed["songs"]
+    _listen(ann, [levitating])
+    _listen(bob, [levitating, perfect])
+    recommender.build_model()
+
+    songs = recommend.get_recommended_songs(2, user_id=ann)
+
+    assert songs[0]["song_id"] == perfect and songs[0]["artist_name"] == "Ed Sheeran"
+    assert len(songs) == 2 and songs[1]["song_id"] != perfect  # Topped up with another song
+
+def test_co_listener_counts_match_the_listening_matrix(monkeypatch):
+    rng = np.random.default_rng(7)
+    listened = rng.random((40, 25)) < 0.2
+    user_index, song_index = np.nonzero(listened)
+    monkeypatch.setattr(recommender, "PAIR_BATCH", 30)  # Several batches
+
+    rows, cols, counts = recommender._co_listener_counts(user_index, song_index, listened.shape[1])
+
+    expected = listened.T.astype(int) @ listened.astype(int)
+    np.fill_diagonal(expected, 0)
+    found = np.zeros_like(expected)
+    found[rows, cols] = counts
+    assert (found == expected).all()
+
+def test_songs_heard_long_ago_are_never_recommended(seed):
+    ann, bob = seed["users"]
+    levitating, shape, perfect = seed["songs"]
+    long_ago = datetime.datetime.now().replace(microsecond=0) - datetime.timedelta(days=400)
+    play_counts.record_plays([(ann, perfect, long_ago)])
+    _listen(ann, [levitating])
+    _listen(bob, [levitating, perfect])
+    recommender.build_model()
+
+    assert perfect not in recommender.recommend(ann, limit=3)
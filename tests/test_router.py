@@ -0,0 +1,60 @@
+import importlib
+import sys
+import tkinter
+import types
+
+import customtkinter as ctk
+import pytest
+
+import router
+
+@pytest.mark.parametrize("name", sorted(router.PAGES))
+def test_every_registered_page_can_be_built_by_the_shell(name):
+    module = importlib.import_module(router.PAGES[name])
+
+    assert callable(module.build_page)
+    assert module.WINDOW_TITLE and module.WINDOW_SIZE
+
+@pytest.fixture
+def shell(monkeypatch):
+    """A real window with two stand-in pages registered"""
+    try:
+        root = ctk.CTk()
+    except tkinter.TclError:
+        pytest.skip("no display")
+
+    built, shown = [], []
+    for name in ("first", "second"):
+        page = types.ModuleType(f"page_{name}")
+        page.WINDOW_TITLE, page.WINDOW_SIZE = name.title(), "400x300"
+        page.build_page = lambda parent, name=name: built.append(name)
+        page.on_show = lambda name=name: shown.append(name)
+        monkeypatch.setitem(sys.modules, page.__name__, page)
+        monkeypatch.setitem(router.PAGES, name, page.__name__)
+
+    monkeypatch.setattr(router, "root", root)
+    monkeypatch.setattr(router, "_page_frames", {})
+    monkeypatch.setattr(router, "_current_page", None)
+    yield built, shown
+    root.destroy()
+
+def test_pages_are_built_once_and_shown_again_in_place(shell):
+    built, shown = shell
+
+    assert router.show_page("first")
+    assert router.show_page("second")
+    assert router.show_page("first")
+
+    assert built == ["first", "second"]
+    assert shown == ["first"]
+    assert router.current_page() == "first"
+    assert router.root.title() == "First"
+
+def test_reset_rebuilds_the_other_pages(shell):
+    built, shown = shell
+
+    router.show_page("first")
+    router.show_page("second", reset=True)
+    router.show_page("first")
+
+    assert built == ["first", "second", "first"]
@@ -0,0 +1,55 @@
+import db
+import search_index
+
+def _titles(songs):
+    return [song["title"] for song in songs]
+
+def test_search_ranks_title_matches_and_matches_prefixes(seed):
+    search_index.build()
+
+    assert _titles(search_index.search("shape")) == ["Shape of You"]
+    assert _titles(search_index.search("sheeran")) == ["Perfect", "Shape of You"]
+    assert _titles(search_index.search("lev")) == ["Levitating"]
+    assert _titles(search_index.search("ed perf")) == ["Perfect"]
+    assert search_index.search("levitating", search_type="artist") == []
+
+def test_search_folds_case_and_accents(seed):
+    db.execute("UPDATE Songs SET title = %s WHERE song_id = %s", ("Café Élan", seed["songs"][0]))
+    search_index.build()
+
+    assert _titles(search_index.search("CAFE elan")) == ["Café Élan"]
+
+def test_refresh_picks_up_songs_added_elsewhere(seed):
+    search_index.build()
+    db.execute(
+        "INSERT INTO Songs (title, artist_id, file_type, file_size) VALUES (%s, %s, %s, %s)",
+        ("Bad Habits", seed["artists"][1], "wav", 10)
+    )
+
+    search_index.refresh()
+
+    assert _titles(search_index.search("habits")) == ["Bad Habits"]
+
+def test_add_song_indexes_an_upload_with_its_names(seed):
+    search_index.build()
+    song_id = db.execute(
+        "INSERT INTO Songs (title, artist_id, genre_id, file_type, file_size) VALUES (%s, %s, %s, %s, %s)",
+        ("Physical", seed["artists"][0], seed["genre"], "wav", 10)
+    )
+
+    search_index.add_song(song_id)
+
+    [song] = search_index.search("physical")
+    assert song["song_id"] == song_id
+    assert song["artist_name"] == "Dua Lipa"
+    assert _titles(search_index.search("dua")) == ["Levitating", "Physical"]
+
+def test_add_song_of_a_deleted_song_and_remove_song_unindex_it(seed):
+    search_index.build()
+    db.execute("DELETE FROM Songs WHERE song_id = %s", (seed["songs"][0],))
+
+    search_index.add_song(seed["songs"][0])
+    search_index.remove_song(seed["songs"][1])
+
+    assert search_index.search("levitating") == []
+    assert _titles(search_index.search("sheeran")) == ["Perfect"]
@@ -0,0 +1,123 @@
+import threading
+import time
+
+import mysql.connector
+import pytest
+
+import search
+import search_index
+
+class _Root:
+    """Runs the page's after() callbacks when asked, like a Tk event loop"""
+
+    def __init__(self):
+        self.callbacks = {}
+        self.next_id = 0
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.callbacks[self.next_id] = callback
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        self.callbacks.pop(after_id, None)
+
+    def run(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.callbacks and time.monotonic() < deadline:
+            after_id = min(self.callbacks)
+            self.callbacks.pop(after_id)()
+            time.sleep(0.001)
+
+class _Value:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def configure(self, **kwargs):
+        pass
+
+    def winfo_children(self):
+        return []
+
+def _page(monkeypatch, query, search_type="all"):
+    """Stand in for the widgets perform_search() and finish_search() use"""
+    root, entry, shown = _Root(), _Value(query), []
+    monkeypatch.setattr(search, "root", root, raising=False)
+    monkeypatch.setattr(search, "search_entry", entry, raising=False)
+    monkeypatch.setattr(search, "search_type_var", _Value(search_type), raising=False)
+    monkeypatch.setattr(search, "songs_section", _Value(None), raising=False)
+    monkeypatch.setattr(search, "songs_title", _Value(None), raising=False)
+    monkeypatch.setattr(search, "display_songs", lambda songs, subtitle=None: shown.append((subtitle, songs)))
+    monkeypatch.setattr(search, "search_state", dict(search.search_state, generation=0, after_id=None, future=None,
+                                                    last_query=None, last_type=None, last_results=None))
+    return root, entry, shown
+
+def test_typing_debounces_into_one_search(seed, monkeypatch):
+    search_index.build()
+    root, entry, shown = _page(monkeypatch, "sh")
+
+    search.schedule_search()
+    entry.value = "shape"
+    search.schedule_search()
+    root.run()
+
+    assert [(subtitle, [song["title"] for song in songs]) for subtitle, songs in shown] == \
+        [("Search Results for 'shape'", ["Shape of You"])]
+
+def test_a_newer_search_replaces_one_in_flight(seed, monkeypatch):
+    search_index.build()
+    root, entry, shown = _page(monkeypatch, "levitating")
+
+    search.perform_search()
+    entry.value = "perfect"
+    search.perform_search()
+    root.run()
+
+    assert [[song["title"] for song in songs] for subtitle, songs in shown] == [["Perfect"]]
+
+def test_extending_a_query_refines_the_previous_results(seed, monkeypatch):
+    search_index.build()
+    root, entry, shown = _page(monkeypatch, "sheeran")
+    calls = []
+    real_search_songs = search.search_songs
+    monkeypatch.setattr(search, "search_songs", lambda *args: calls.append(args) or real_search_songs(*args))
+
+    search.perform_search()
+    root.run()
+    entry.value = "sheeran sha"
+    search.perform_search()
+    root.run()
+
+    assert calls[0] == ("sheeran", "all", None)
+    assert calls[1][0] == "sheeran sha" and sorted(calls[1][2]) == sorted(seed["songs"][1:])
+    assert [song["title"] for song in shown[-1][1]] == ["Shape of You"]
+
+def test_database_errors_on_the_worker_are_shown_on_the_ui_thread(seed, monkeypatch):
+    root, entry, shown = _page(monkeypatch, "")
+    errors = []
+    def broken_connect():
+        raise mysql.connector.errors.InterfaceError("Can't connect")
+    monkeypatch.setattr(search.db, "connect_db", broken_connect)
+    monkeypatch.setattr(search.messagebox, "showerror",
+                        lambda title, message: errors.append(threading.current_thread() is threading.main_thread()))
+
+    search.perform_search()
+    root.run()
+
+    assert errors == [True]
+    assert shown == [("Recent Songs", [])]
+
+def test_destroying_the_page_stops_the_search_worker(seed, monkeypatch):
+    root, entry, shown = _page(monkeypatch, "")
+    search.perform_search()
+    root.run()
+    executor = search.search_executor
+
+    search.shutdown_search()
+
+    assert search.search_executor is None
+    with pytest.raises(RuntimeError):
+        executor.submit(lambda: None)
@@ -0,0 +1,47 @@
+import hashlib
+import io
+
+import audio_store
+import db
+import song_audio
+
+def test_stored_audio_streams_in_fixed_size_chunks(seed):
+    source = song_audio.get_song_source(seed["songs"][0])
+    data = audio_store.read_audio(source["audio_key"])
+
+    chunks = list(song_audio.iter_chunks(source, chunk_size=100))
+
+    assert b"".join(chunks) == data
+    assert {len(chunk) for chunk in chunks[:-1]} == {100}
+    assert source["artist_name"] == "Dua Lipa"
+
+def test_legacy_blobs_stream_in_ranges(seed):
+    data = bytes(range(256)) * 3
+    song_id = db.execute(
+        "INSERT INTO Songs (title, artist_id, file_data, file_type, file_size) VALUES (%s, %s, %s, %s, %s)",
+        ("Old Upload", seed["artists"][0], data, "wav", len(data))
+    )
+    source = song_audio.get_song_source(song_id)
+
+    chunks = list(song_audio.iter_chunks(source, chunk_size=200))
+
+    assert [len(chunk) for chunk in chunks] == [200, 200, 200, 168]
+    assert b"".join(chunks) == data
+
+def test_copy_to_hashes_while_it_writes(seed):
+    source = song_audio.get_song_source(seed["songs"][1])
+    target = io.BytesIO()
+
+    size, sha256 = song_audio.copy_to(source, target)
+
+    assert size == len(target.getvalue())
+    assert sha256 == hashlib.sha256(target.getvalue()).hexdigest() == source["audio_key"]
+
+def test_songs_keep_their_audio_after_the_artist_is_deleted(seed):
+    song_id = seed["songs"][0]
+    db.execute("DELETE FROM Artists WHERE artist_id = %s", (seed["artists"][0],))
+
+    source = song_audio.get_song_source(song_id)
+
+    assert source["artist_name"] is None
+    assert b"".join(song_audio.iter_chunks(source)) == audio_store.read_audio(source["audio_key"])
@@ -0,0 +1,68 @@
+import db
+import song_audio
+import song_handles
+
+def _count_queries(monkeypatch):
+    queries = []
+    fetch_one = db.fetch_one
+
+    def counting_fetch_one(query, *args, **kwargs):
+        if query == song_handles.HANDLE_QUERY:
+            queries.append(args[0])
+        return fetch_one(query, *args, **kwargs)
+
+    monkeypatch.setattr(db, "fetch_one", counting_fetch_one)
+    return queries
+
+def test_handles_are_cached_until_invalidated(seed, monkeypatch):
+    queries = _count_queries(monkeypatch)
+    levitating = seed["songs"][0]
+
+    song = song_handles.get_song(levitating)
+    assert song_handles.get_song(levitating) is song
+    assert song["artist_name"] == "Dua Lipa" and song["genre_name"] == "Pop"
+    assert len(queries) == 1
+
+    db.execute("UPDATE Songs SET title = %s WHERE song_id = %s", ("Levitating (Remix)", levitating))
+    song_handles.invalidate(levitating)
+
+    assert song_handles.get_song(levitating)["title"] == "Levitating (Remix)"
+    assert len(queries) == 2
+
+def test_least_recently_used_handles_are_evicted(seed, monkeypatch):
+    monkeypatch.setattr(song_handles, "MAX_HANDLES", 2)
+    queries = _count_queries(monkeypatch)
+    levitating, shape, perfect = seed["songs"]
+
+    for song_id in (levitating, shape, levitating, perfect):
+        song_handles.get_song(song_id)
+    assert len(queries) == 4 - 1
+
+    song_handles.get_song(levitating)
+    song_handles.get_song(shape)
+    assert queries[-1] == (shape,) and len(queries) == 4
+
+def test_stale_handles_are_read_again(seed, monkeypatch):
+    monkeypatch.setattr(song_handles, "HANDLE_TTL", 0)
+    queries = _count_queries(monkeypatch)
+
+    song_handles.get_song(seed["songs"][0])
+    song_handles.get_song(seed["songs"][0])
+
+    assert len(queries) == 2
+
+def test_missing_songs_have_no_handle(database):
+    assert song_handles.get_song(12345) is None
+
+def test_song_file_streams_audio_only_on_a_cache_miss(seed, monkeypatch):
+    song = song_handles.get_song(seed["songs"][1])
+    first = song_handles.song_file(song)
+
+    def no_streaming(*args, **kwargs):
+        raise AssertionError("audio streamed again")
+
+    monkeypatch.setattr(song_audio, "iter_chunks", no_streaming)
+
+    assert song_handles.song_file(song) == first
+    with open(first, "rb") as f:
+        assert len(f.read()) > 0
@@ -0,0 +1,42 @@
+import types
+
+import db
+import download
+import play_counts
+import playlist
+import song_list
+
+def _load_all(fetch_page, page_size):
+    """Drive SongList's lazy loading the way scrolling to the end does"""
+    songs_list = types.SimpleNamespace(songs=[], fetch_page=fetch_page, has_more=True, page_size=page_size)
+    pages = 0
+    while songs_list.has_more:
+        song_list.SongList.load_more(songs_list)
+        pages += 1
+    return songs_list.songs, pages
+
+def test_playlist_pages_continue_after_the_last_song(seed):
+    playlist_id = db.execute("INSERT INTO Playlists (user_id, name) VALUES (%s, %s)", (seed["users"][0], "Mix"))
+    # Two songs share a position, so the song_id tie-break matters
+    db.execute_many(
+        "INSERT INTO Playlist_Songs (playlist_id, song_id, position) VALUES (%s, %s, %s)",
+        [(playlist_id, seed["songs"][2], 1), (playlist_id, seed["songs"][0], 2), (playlist_id, seed["songs"][1], 2)]
+    )
+
+    songs, pages = _load_all(lambda last, limit: playlist.get_playlist_songs(playlist_id, last, limit), 2)
+
+    assert [song["song_id"] for song in songs] == [seed["songs"][2], seed["songs"][0], seed["songs"][1]]
+    assert pages == 2
+    assert songs[0]["artist_name"] == "Ed Sheeran" and songs[0]["duration_formatted"] == "3:02"
+
+def test_popular_song_pages_follow_play_counts(seed):
+    user = seed["users"][0]
+    for song_id, plays in zip(seed["songs"], (1, 3, 1)):
+        for _ in range(plays):
+            play_counts.record_play(user, song_id)
+
+    songs, pages = _load_all(lambda last, limit: download.get_popular_songs(limit, last), 1)
+
+    assert [(song["song_id"], song["play_count"]) for song in songs] == \
+        [(seed["songs"][1], 3), (seed["songs"][0], 1), (seed["songs"][2], 1)]
+    assert pages == 4  # The last, empty page ends the list
@@ -0,0 +1,132 @@
+import datetime
+import re
+import sqlite3
+
+import mysql.connector
+import pytest
+
+import audio_objects
+import benchmark
+import db
+import generate_data
+import sqlite_backend
+
+def test_translate_rewrites_mysql_only_syntax():
+    translate = sqlite_backend.translate
+
+    assert translate("SELECT * FROM Songs WHERE song_id = %s FOR UPDATE") == "SELECT * FROM Songs WHERE song_id = ?"
+    assert translate("INSERT IGNORE INTO Genres (name) VALUES (%s)") == "INSERT OR IGNORE INTO Genres (name) VALUES (?)"
+    assert translate("SELECT CONCAT(first_name, ' ', last_name) FROM Users") == \
+        "SELECT (first_name || ' ' || last_name) FROM Users"
+    assert translate("SELECT GREATEST(a, LEAST(b, c)), RAND()") == "SELECT MAX(a, MIN(b, c)), RANDOM()"
+    assert translate("WHERE played_at >= NOW() - INTERVAL %s DAY") == \
+        "WHERE played_at >= datetime('now', 'localtime', '-' || ? || ' days')"
+    assert translate("INSERT INTO T (k, v) VALUES (%s, %s) ON DUPLICATE KEY UPDATE v = v + VALUES(v)") == \
+        "INSERT INTO T (k, v) VALUES (?, ?) ON CONFLICT DO UPDATE SET v = v + excluded.v"
+
+def test_rows_look_like_mysql_connector_rows(seed):
+    with db.pooled_connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT title, upload_date FROM Songs WHERE song_id = %s", (seed["songs"][0],))
+        assert cursor.column_names == ("title", "upload_date")
+        row = cursor.fetchone()
+        cursor.close()
+
+    assert row["title"] == "Levitating"
+    assert isinstance(row["upload_date"], datetime.datetime)
+
+def test_errors_are_raised_as_mysql_connector_errors(seed):
+    with pytest.raises(mysql.connector.IntegrityError):
+        db.execute("INSERT INTO Genres (name) VALUES (%s)", ("pop",))  # Names are case-insensitive
+    with pytest.raises(mysql.connector.IntegrityError):
+        db.execute("INSERT INTO Playlists (user_id, name) VALUES (%s, %s)", (9999, "Orphan"))
+    with pytest.raises(mysql.connector.Error):
+        db.fetch_all("SELECT * FROM No_Such_Table")
+
+def test_commit_errors_are_raised_as_mysql_connector_errors(seed):
+    connection = sqlite_backend.connect()
+    cursor = connection.cursor()
+    cursor.execute("PRAGMA defer_foreign_keys = ON")  # The orphan is only caught at commit
+    cursor.execute("INSERT INTO Playlists (user_id, name) VALUES (%s, %s)", (9999, "Orphan"))
+
+    with pytest.raises(mysql.connector.IntegrityError):
+        connection.commit()
+    connection.rollback()
+    connection.close()
+
+def test_create_schema_is_repeatable(seed):
+    sqlite_backend.create_schema()
+    assert db.fetch_one("SELECT COUNT(*) FROM Songs", dictionary=False) == (3,)
+
+def test_mysql_only_tools_refuse_to_run(database):
+    with pytest.raises(mysql.connector.NotSupportedError, match="generate_data.py"):
+        generate_data.generate(users=1, artists=1, songs=1, plays=1)
+    with pytest.raises(mysql.connector.NotSupportedError, match="benchmark.py"):
+        benchmark.benchmark()
+
+def test_dedupe_runs_without_the_blob_migration(seed):
+    db.execute("UPDATE Audio_Objects SET ref_count = 0")
+    audio_objects.dedupe()
+    assert db.fetch_all("SELECT ref_count FROM Audio_Objects", dictionary=False) == [(1,)] * 3
+
+class _DDLServer:
+    """An empty MySQL server that keeps every statement it is sent"""
+
+    def __init__(self):
+        self.statements = []
+        self.row = None
+
+    def cursor(self, *args, **kwargs):
+        return self
+
+    def execute(self, query, params=()):
+        self.statements.append(query)
+        self.row = (1,) if "GET_LOCK" in query else (None,) if "MIN(" in query else (0,)
+
+    def executemany(self, query, rows):
+        self.statements.append(query)
+
+    def fetchone(self):
+        return self.row
+
+    def fetchall(self):
+        return []
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+_NOT_COLUMNS = {"PRIMARY", "FOREIGN", "INDEX", "KEY", "UNIQUE", "CONSTRAINT", ")", ""}
+
+def _mysql_columns(statements):
+    """Get {table: columns} from CREATE TABLE and ALTER TABLE ... ADD COLUMN statements"""
+    tables = {}
+    for sql in statements:
+        lines = sql.strip().splitlines()
+        create = re.match(r"CREATE TABLE IF NOT EXISTS (\w+) \($", lines[0].strip())
+        if create:
+            words = (line.strip().split(" ")[0] for line in lines[1:])
+            tables[create.group(1)] = {word for word in words if word not in _NOT_COLUMNS}
+        for table, column in re.findall(r"ALTER TABLE (\w+) .*ADD COLUMN (\w+)", " ".join(sql.split())):
+            tables[table].add(column)
+    return tables
+
+def test_sqlite_schema_matches_the_mysql_ddl(database, monkeypatch):
+    import main
+    server = _DDLServer()
+    monkeypatch.setattr(db, "DB_BACKEND", "mysql")
+    monkeypatch.setattr(main, "connect_db_server", lambda: server)
+    monkeypatch.setattr(main.history_retention, "ensure_partitions", lambda cursor: None)
+    monkeypatch.setattr(main.play_counts, "rebuild", lambda: None)
+    assert main.create_database()
+
+    with sqlite3.connect(sqlite_backend.DATABASE_FILE) as connection:
+        names = [row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        sqlite_tables = {name: {row[1] for row in connection.execute(f"PRAGMA table_info({name})")} for name in names}
+
+    mysql_tables = _mysql_columns(server.statements)
+    del mysql_tables["Schema_Version"]  # Migration bookkeeping; SQLite starts fully migrated
+    assert sqlite_tables == mysql_tables
@@ -0,0 +1,45 @@
+import audio_objects
+import db
+import play_counts
+import system_stats
+
+def _fresh_stats():
+    system_stats.invalidate()
+    return system_stats.get_stats()
+
+def test_counters_follow_inserts_and_deletes(seed):
+    ann, bob = seed["users"]
+    assert _fresh_stats() == {"total_users": 3, "total_songs": 3, "total_playlists": 0, "total_downloads": 0}
+
+    db.execute_many("INSERT INTO Playlists (user_id, name) VALUES (%s, %s)", [(ann, "Mix"), (bob, "Gym"), (bob, "Run")])
+    play_counts.record_plays([(ann, song_id, play_counts.datetime.datetime.now()) for song_id in seed["songs"]])
+    play_counts.record_play(bob, seed["songs"][0])
+    assert _fresh_stats() == {"total_users": 3, "total_songs": 3, "total_playlists": 3, "total_downloads": 4}
+
+    # Bob's playlists go with him, and Levitating's two plays with it
+    db.execute("DELETE FROM Users WHERE user_id = %s", (bob,))
+    audio_objects.delete_song(seed["songs"][0])
+    assert _fresh_stats() == {"total_users": 2, "total_songs": 2, "total_playlists": 1, "total_downloads": 2}
+
+def test_counters_are_read_at_most_once_per_ttl(seed, monkeypatch):
+    first = _fresh_stats()
+    db.execute(
+        "INSERT INTO Songs (title, artist_id, file_type, file_size) VALUES (%s, %s, %s, %s)",
+        ("New", seed["artists"][0], "mp3", 0)
+    )
+
+    assert system_stats.get_stats() == first
+
+    monkeypatch.setattr(system_stats, "CACHE_TTL", 0)
+    assert system_stats.get_stats()["total_songs"] == first["total_songs"] + 1
+
+def test_recount_repairs_drifted_counters(seed):
+    db.execute("UPDATE System_Counters SET value = 99")
+
+    with db.pooled_connection() as connection:
+        cursor = connection.cursor()
+        system_stats.recount(cursor)
+        connection.commit()
+        cursor.close()
+
+    assert _fresh_stats() == {"total_users": 3, "total_songs": 3, "total_playlists": 0, "total_downloads": 0}
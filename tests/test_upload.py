@@ -0,0 +1,60 @@
+import hashlib
+import wave
+
+import pytest
+
+import db
+import download
+import search_index
+import song_audio
+
+def _write_wav(path, seconds):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(8000)
+        f.writeframes(b"\x00\x01" * 8000 * seconds)
+
+def test_ingest_file_probes_and_stores_in_one_pass(database, monkeypatch):
+    monkeypatch.setattr(song_audio, "CHUNK_SIZE", 1000)
+    _write_wav("take.wav", 2)
+    with open("take.wav", "rb") as f:
+        data = f.read()
+
+    audio = song_audio.ingest_file("take.wav")
+
+    assert audio == {
+        "audio_key": hashlib.sha256(data).hexdigest(),
+        "file_size": len(data),
+        "file_type": "wav",
+        "duration": 2,
+        "tags": {}
+    }
+
+def test_unreadable_audio_is_stored_without_a_duration(database):
+    with open("notes.mp3", "wb") as f:
+        f.write(b"not really an mp3")
+
+    audio = song_audio.ingest_file("notes.mp3")
+
+    assert audio["duration"] == 0 and audio["file_size"] == 17
+
+@pytest.fixture
+def quiet_dialogs(monkeypatch):
+    shown = []
+    monkeypatch.setattr(download.messagebox, "showinfo", lambda *args: shown.append(args))
+    monkeypatch.setattr(download.messagebox, "showerror", lambda *args: shown.append(args))
+    return shown
+
+def test_upload_song_registers_a_searchable_song(seed, quiet_dialogs):
+    search_index.build()
+    _write_wav("upload.wav", 3)
+
+    song_id = download.upload_song("upload.wav", "Houdini", seed["artists"][0], seed["genre"])
+
+    song = db.fetch_one("SELECT title, duration, audio_key, file_size FROM Songs WHERE song_id = %s", (song_id,))
+    assert song["title"] == "Houdini" and song["duration"] == 3
+    assert db.fetch_one("SELECT ref_count FROM Audio_Objects WHERE audio_key = %s", (song["audio_key"],)) == \
+        {"ref_count": 1}
+    assert [found["song_id"] for found in search_index.search("houdini")] == [song_id]
+    assert quiet_dialogs == [("Success", "Song 'Houdini' uploaded successfully!")]